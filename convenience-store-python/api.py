@@ -8,32 +8,119 @@ modeli RetailNet i PersonalityNet.
 
 Główne funkcje:
 - Obsługa endpointu /predict dla żądań POST.
-- Logowanie danych wejściowych i wyjściowych do pliku game_logs.log.
-- Ładowanie i uruchamianie modeli sieci neuronowych.
+- Obsługa endpointu /predict_batch (cała lista zakupów NPC w jednym żądaniu).
+- Kanał WebSocket /ws/predict: stałe połączenie, binarne ramki (wire_protocol.py)
+  i wiele przewidywań w toku jednocześnie (pipelining).
+- Opcjonalne mikro-paczkowanie współbieżnych żądań /predict (MICROBATCH=1).
+- Wybór backendu inferencji: PyTorch (domyślnie), NumPy (INFERENCE_BACKEND=numpy)
+  lub zoptymalizowane artefakty TorchScript/INT8 (INFERENCE_BACKEND=torchscript/int8).
+- Pamięć podręczna LRU/TTL wyników RetailNet (base_buy_prob).
+- Krzywa odpowiedzi na cenę (/price_curve) dla edytora cen, z cache do zmiany pogody lub modelu.
+- Opcjonalna tablica przeglądowa (LUT) zamiast PersonalityNet (PERSONALITY_LUT).
+- Przeładowanie modeli bez restartu: wersje z rejestru (model_registry.py),
+  aktywacja i wycofanie przez /admin/* lub zmianę registry.json (każdy proces
+  śledzi plik), z atomową podmianą - żądania w toku kończą się na starym modelu.
+- Asynchroniczne logowanie żądań (JSONL, jeden rekord na żądanie) do game_logs.jsonl.
+- Ładowanie i uruchamianie modeli sieci neuronowych w tle przy starcie serwera
+  (równoległe ładowanie checkpointów, rozgrzewka, endpoint /ready).
+- Metryki w formacie Prometheus (/metrics): opóźnienia etapów (parsowanie,
+  RetailNet, PersonalityNet, log), liczba żądań, żądania w toku, rozmiary paczek, błędy.
 """
-from fastapi import FastAPI
-from pydantic import BaseModel
-import torch
-import torch.nn.functional as F
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import Annotated, Any, List, NamedTuple, Optional, Tuple
+
+from fastapi import Depends, FastAPI, HTTPException, Request, WebSocket
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
 import numpy as np
-from network import model, FEATURE_COLUMNS, device, PersonalityNet, PERSONALITY_COLUMNS
 
-import logging
-import json
+from features import FEATURE_COLUMNS
+from batching import MicroBatcher
+from cache import LRUTTLCache
+from catalog import load_catalog, catalog_categories
+from metrics import Registry, MetricsMiddleware, CONTENT_TYPE, SIZE_BUCKETS
+from model_registry import ModelRegistry, DEFAULT_REGISTRY_DIR
+from personality_lut import PersonalityLUT, parse_grid, DEFAULT_GRID
+from request_log import RequestLogger, DEFAULT_LOG_PATH
+from wire_protocol import (FrameError, TRAIT_COLUMNS, STATUS_OK, STATUS_INVALID, STATUS_NOT_READY,
+                           decode_requests, encode_responses, frame_request_ids)
+
+# Czas importu modułu - punkt odniesienia dla pomiaru zimnego startu
+IMPORT_TIME = time.perf_counter()
+
+# Konfiguracja dziennika żądań (zapis w wątku w tle, rotacja po rozmiarze)
+REQUEST_LOG_ENABLED = os.environ.get("REQUEST_LOG", "1") == "1"
+request_log = RequestLogger(
+    path=os.environ.get("REQUEST_LOG_PATH", DEFAULT_LOG_PATH),
+    max_bytes=int(os.environ.get("REQUEST_LOG_MAX_BYTES", "10000000")),
+    backup_count=int(os.environ.get("REQUEST_LOG_BACKUPS", "5")),
+    # Odsetek żądań z rekordem diagnostycznym (wejście PersonalityNet), 0 = wyłączone
+    debug_sample_rate=float(os.environ.get("REQUEST_LOG_DEBUG_SAMPLE", "0")),
+) if REQUEST_LOG_ENABLED else None
 
-# Konfiguracja loggera
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+# Tryb startu: "background" (port otwarty od razu, modele ładowane w tle)
+# lub "blocking" (serwer przyjmuje połączenia dopiero po pełnym starcie)
+STARTUP_MODE = os.environ.get("STARTUP_MODE", "background")
 
-fh = logging.FileHandler('game_logs.log')
-fh.setLevel(logging.INFO)
+# Rejestr wersji modeli (model_registry.py). Bez aktywnej wersji ładowane są
+# pliki z katalogu roboczego. Co MODEL_REGISTRY_POLL s (0 = wyłączone) każdy
+# proces sprawdza registry.json i przeładowuje modele po zmianie aktywnej wersji.
+model_registry = ModelRegistry(os.environ.get("MODEL_REGISTRY", DEFAULT_REGISTRY_DIR))
+MODEL_REGISTRY_POLL = float(os.environ.get("MODEL_REGISTRY_POLL", "2"))
+# Jeśli ustawiony, endpointy /admin/* wymagają nagłówka X-Admin-Token
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
 
-formatter = logging.Formatter('%(asctime)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-fh.setFormatter(formatter)
 
-logger.addHandler(fh)
+@asynccontextmanager
+async def lifespan(app):
+    """Uruchamia ładowanie modeli przy starcie serwera uvicorn."""
+    if STARTUP_MODE == "blocking":
+        await asyncio.get_running_loop().run_in_executor(None, startup)
+    else:
+        threading.Thread(target=startup, name="startup", daemon=True).start()
+    yield
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
+
+# ==============================
+# Metryki (Prometheus, /metrics)
+# ==============================
+metrics_registry = Registry()
+REQUESTS_TOTAL = metrics_registry.counter(
+    "api_requests_total", "HTTP requests by path and status code", ["path", "status"])
+REQUESTS_IN_FLIGHT = metrics_registry.gauge(
+    "api_requests_in_flight", "HTTP requests currently being handled")
+REQUEST_DURATION = metrics_registry.histogram(
+    "api_request_duration_seconds", "Total HTTP request handling time", ["path"])
+STAGE_DURATION = metrics_registry.histogram(
+    "api_stage_duration_seconds", "Time spent per prediction stage (parse, retail, personality, log)", ["stage"])
+INFERENCE_BATCH_ROWS = metrics_registry.histogram(
+    "api_inference_batch_rows", "Rows per RetailNet/PersonalityNet pass", buckets=SIZE_BUCKETS)
+ERRORS_TOTAL = metrics_registry.counter(
+    "api_errors_total", "Prediction errors by endpoint and kind", ["endpoint", "kind"])
+MODEL_READY = metrics_registry.gauge("api_model_ready", "1 when models are loaded and warmed up")
+CACHE_EVENTS = metrics_registry.gauge(
+    "api_retail_cache_events", "RetailNet cache counters (hits, misses, evictions, ...)", ["event"])
+LOG_RECORDS = metrics_registry.gauge(
+    "api_request_log_records", "Request log records (written, dropped, queued)", ["state"])
+WS_CONNECTIONS = metrics_registry.gauge("api_ws_connections", "Open /ws/predict connections")
+WS_FRAMES = metrics_registry.counter(
+    "api_ws_frames_total", "Binary /ws/predict frames by direction (in, out)", ["direction"])
+MODEL_RELOADS = metrics_registry.counter(
+    "api_model_reloads_total", "Model reloads by result (ok, error)", ["result"])
+
+app.add_middleware(
+    MetricsMiddleware,
+    requests_total=REQUESTS_TOTAL, in_flight=REQUESTS_IN_FLIGHT, duration=REQUEST_DURATION,
+)
 
 # ==============================
 # 1) Dane wejściowe (Schema Pydantic)
@@ -58,71 +145,590 @@ class InputData(BaseModel):
     is_impulse: float = 0
 
 
+class WeatherData(BaseModel):
+    """Aktualna pogoda (używana do wstępnego wypełniania cache RetailNet)."""
+    precpt: float = 0
+    avg_temperature: float = 20
+
+
+# Cecha osobowości w [0, 1] (zakres PersonalityNet)
+UnitFloat = Annotated[float, Field(ge=0, le=1)]
+
+
+class PriceCurveRequest(BaseModel):
+    """
+    Zapytanie /price_curve: produkt (kategorie, basePrice), pogoda, rozkład
+    osobowości klientów (jednostajny w podanych zakresach) i siatka cen.
+    Bez listy prices siatka to steps cen od price_min do price_max.
+    """
+    first_category_id: int = 0
+    second_category_id: int = 0
+    third_category_id: int = 0
+    is_impulse: float = 0
+    base_price: float = Field(gt=0)
+
+    precpt: float = 0
+    avg_temperature: float = 20
+
+    impulsiveness_range: Tuple[UnitFloat, UnitFloat] = (0.0, 1.0)
+    generosity_range: Tuple[UnitFloat, UnitFloat] = (0.0, 1.0)
+    samples: int = Field(512, ge=1, le=4096)
+
+    prices: Optional[List[Annotated[float, Field(gt=0)]]] = Field(None, min_length=1, max_length=256)
+    price_min: Optional[float] = Field(None, gt=0)
+    price_max: Optional[float] = Field(None, gt=0)
+    steps: int = Field(31, ge=2, le=256)
+
+    @field_validator("impulsiveness_range", "generosity_range")
+    @classmethod
+    def _ordered_range(cls, value):
+        if value[0] > value[1]:
+            raise ValueError("range must be [low, high] with low <= high")
+        return value
+
+    def price_bounds(self):
+        """Granice siatki cen po uzupełnieniu domyślnych (0.5 x i 2 x basePrice)."""
+        low = 0.5 * self.base_price if self.price_min is None else self.price_min
+        high = 2.0 * self.base_price if self.price_max is None else self.price_max
+        return low, high
+
+    @model_validator(mode="after")
+    def _ordered_prices(self):
+        # Sprawdzane po uzupełnieniu domyślnych - np. samo price_min powyżej 2 x basePrice
+        low, high = self.price_bounds()
+        if self.prices is None and low >= high:
+            raise ValueError(f"price grid bounds must satisfy price_min < price_max, got [{low:g}, {high:g}]")
+        return self
+
+
+class BatchInputData(BaseModel):
+    """
+    Paczka danych wejściowych dla endpointu /predict_batch.
+    Elementy są walidowane pojedynczo, aby błąd w jednym produkcie
+    nie odrzucał całej listy zakupów.
+    """
+    # Any zamiast Dict: element niebędący obiektem (np. 5) dostaje błąd
+    # w swoim wyniku zamiast odrzucenia całej paczki
+    items: List[Any]
+
+
+# Maksymalna liczba elementów w jednym żądaniu /predict_batch
+MAX_BATCH_SIZE = 256
+
+
+def parse_started(request: Request):
+    """
+    Zależność endpointów z ciałem JSON: początek etapu "parse".
+    FastAPI rozwiązuje zależności przed walidacją ciała, więc czas od tego
+    punktu do wejścia w endpoint (parse_finished) to walidacja pydantic.
+    """
+    request.state.parse_start = time.perf_counter()
+
+
+def parse_finished(request: Request):
+    """Koniec etapu "parse" (pierwsza instrukcja endpointu lub błąd walidacji)."""
+    STAGE_DURATION.observe(time.perf_counter() - request.state.parse_start, stage="parse")
+
+
+@app.exception_handler(RequestValidationError)
+async def validation_error(request: Request, exc: RequestValidationError):
+    """Błąd walidacji ciała: etap "parse" i licznik błędów, odpowiedź 422 jak domyślnie w FastAPI."""
+    if hasattr(request.state, "parse_start"):
+        parse_finished(request)
+        ERRORS_TOTAL.inc(endpoint=request.url.path, kind="validation")
+    return await request_validation_exception_handler(request, exc)
+
+# Mikro-paczkowanie /predict (opt-in, konfigurowane zmiennymi środowiskowymi)
+MICROBATCH_ENABLED = os.environ.get("MICROBATCH", "0") == "1"
+MICROBATCH_MAX_SIZE = int(os.environ.get("MICROBATCH_MAX_SIZE", "32"))
+MICROBATCH_MAX_WAIT_MS = float(os.environ.get("MICROBATCH_MAX_WAIT_MS", "5"))
+
+
 # ==============================
 # 2) Prediction endpoint
 # ==============================
-# Load Personality Model (Ładowanie modelu osobowości)
-personality_model = PersonalityNet(len(PERSONALITY_COLUMNS)).to(device)
-# Usunięto try/except aby wymusić widoczność błędów
-print("Loading personality_model.pth...")
-personality_model.load_state_dict(torch.load("personality_model.pth", map_location=device, weights_only=True))
-personality_model.eval()
-print("Model loaded successfully!")
+# Backend inferencji: "torch" (domyślny), "numpy" (bez importu PyTorch)
+# albo artefakty z export_models.py: "torchscript" lub "int8" (ładowane tylko,
+# gdy przejdą kontrolę zgodności z checkpointami fp32 - export_models.check_parity)
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "torch")
+
+
+class ActiveModel(NamedTuple):
+    """
+    Aktywny zestaw modeli. Podmieniany jednym przypisaniem (set_engine), więc
+    żądanie, które pobrało migawkę na początku, liczy wszystkie etapy na tych
+    samych modelach, nawet gdy w trakcie nastąpi przeładowanie.
+    """
+    engine: Any
+    personality_lut: Any
+    base_cache: Optional[LRUTTLCache]
+    version: str        # wersja z model_registry.py lub "local" (pliki w katalogu roboczym)
+    generation: int     # numer aktywacji w tym procesie (klucze cache zależne od modelu)
+
+
+# Ustawiane przez startup() - do tego czasu endpointy przewidywań zwracają 503
+active_model = None
+
+
+@contextmanager
+def timed_phase(timings, name):
+    """Mierzy czas fazy startu (ms) i zapisuje go w słowniku timings."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = (time.perf_counter() - start) * 1000.0
+
+
+def load_engine(timings, directory=None):
+    """
+    Ładuje backend inferencji. Ciężkie importy (torch, network) odbywają się
+    dopiero tutaj, a oba checkpointy ładowane są równolegle.
+
+    Argumenty:
+        directory (str | None): Katalog wersji z model_registry.py
+                                (None = pliki w katalogu roboczym).
+    """
+    def artifact(name):
+        return os.path.join(directory, name) if directory else name
+
+    if INFERENCE_BACKEND == "numpy":
+        with timed_phase(timings, "import_backend"):
+            from numpy_engine import NumpyChain, DEFAULT_WEIGHTS_PATH, ensure_weights
+
+        weights_path = artifact(DEFAULT_WEIGHTS_PATH) if directory else os.environ.get("NUMPY_WEIGHTS", DEFAULT_WEIGHTS_PATH)
+        print(f"Loading {weights_path}...")
+        with timed_phase(timings, "load_checkpoints"):
+            # Wersje rejestru mają wagi wyeksportowane przy rejestracji; domyślny plik
+            # w katalogu roboczym jest eksportowany z checkpointów .pth na żądanie
+            if not directory and "NUMPY_WEIGHTS" not in os.environ:
+                ensure_weights(out_path=weights_path)
+            numpy_chain = NumpyChain.load(weights_path)
+
+        # Opcjonalna weryfikacja zgodności z modelami PyTorch przy starcie
+        if os.environ.get("NUMPY_PARITY_CHECK", "0") == "1":
+            with timed_phase(timings, "parity_check"):
+                from numpy_engine import parity_check, load_torch_chain
+                torch_chain = load_torch_chain(artifact("retail_ai_full.pth"), artifact("personality_model.pth"))
+                print(f"Parity check: {parity_check(numpy_chain, torch_chain)}")
+        return numpy_chain
+
+    if INFERENCE_BACKEND in ("torchscript", "int8"):
+        # Artefakty z export_models.py (TorchScript fp32 lub INT8 z kwantyzacją dynamiczną)
+        with timed_phase(timings, "import_backend"):
+            from export_models import load_optimized_chain, variant_paths
+
+        print(f"Loading {' and '.join(variant_paths(INFERENCE_BACKEND, directory))}...")
+        with timed_phase(timings, "load_checkpoints"):
+            return load_optimized_chain(INFERENCE_BACKEND, directory=directory)
+
+    with timed_phase(timings, "import_backend"):
+        import network
+
+    retail_path, personality_path = artifact("retail_ai_full.pth"), artifact("personality_model.pth")
+    print(f"Loading {retail_path} and {personality_path}...")
+    with timed_phase(timings, "load_checkpoints"):
+        device = network.get_device()
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            # Przy przeładowaniu błąd ładowania RetailNet nie może dać modelu z losowymi wagami
+            retail_future = pool.submit(network.load_retail_model, retail_path, device, directory is not None)
+            # Usunięto try/except aby wymusić widoczność błędów
+            personality_future = pool.submit(network.load_personality_model, personality_path, device)
+            retail_model, personality_model = retail_future.result(), personality_future.result()
+    return network.TorchChain(retail_model, personality_model, device)
+
+
+# ==============================
+# Tablica przeglądowa PersonalityNet (LUT)
+# ==============================
+# PERSONALITY_LUT: "" (wyłączona), "build" (budowa przy starcie) lub ścieżka do pliku .npz
+PERSONALITY_LUT = os.environ.get("PERSONALITY_LUT", "")
+PERSONALITY_LUT_GRID = parse_grid(os.environ.get("PERSONALITY_LUT_GRID", ",".join(map(str, DEFAULT_GRID))))
+PERSONALITY_LUT_DTYPE = np.dtype(os.environ.get("PERSONALITY_LUT_DTYPE", "float16"))
+# Maksymalny dopuszczalny błąd bezwzględny LUT - powyżej używana jest sieć
+PERSONALITY_LUT_MAX_ERROR = float(os.environ.get("PERSONALITY_LUT_MAX_ERROR", "0.02"))
+
+
+def load_personality_lut(source_engine):
+    """
+    Buduje lub wczytuje LUT i sprawdza jej błąd względem sieci z source_engine.
+
+    Zwraca:
+        PersonalityLUT | None: None gdy błąd przekracza PERSONALITY_LUT_MAX_ERROR.
+    """
+    if PERSONALITY_LUT == "build":
+        print(f"Building PersonalityNet LUT {PERSONALITY_LUT_GRID}...")
+        lut = PersonalityLUT.build(source_engine.final_prob, PERSONALITY_LUT_GRID, PERSONALITY_LUT_DTYPE)
+    else:
+        print(f"Loading PersonalityNet LUT from {PERSONALITY_LUT}...")
+        lut = PersonalityLUT.load(PERSONALITY_LUT)
+
+    report = lut.error_report(source_engine.final_prob)
+    print(f"LUT error report: {report}")
+    if report["max_abs_error"] > PERSONALITY_LUT_MAX_ERROR:
+        print(f"Warning: LUT max error exceeds {PERSONALITY_LUT_MAX_ERROR}, using PersonalityNet instead")
+        return None
+    return lut
+
+
+def personality_prob(p, model=None):
+    """Etap PersonalityNet: LUT (jeśli włączona) lub sieć backendu (model: migawka ActiveModel)."""
+    model = model or active_model
+    lut = model.personality_lut
+    return lut.query(p) if lut is not None else model.engine.final_prob(p)
+
+
+# ==============================
+# Cache etapu RetailNet
+# ==============================
+# base_buy_prob zależy wyłącznie od FEATURE_COLUMNS, które w trakcie gry
+# zmieniają się rzadko (pogoda, stałe wartości stanu magazynu, kategorie z katalogu).
+BASE_CACHE_SIZE = int(os.environ.get("BASE_CACHE_SIZE", "4096"))        # 0 = cache wyłączony
+BASE_CACHE_TTL = float(os.environ.get("BASE_CACHE_TTL", "300"))         # sekundy, 0 = bez TTL
+# Opcjonalne zaokrąglanie temperatury w kluczu (np. 0.1 stopnia), 0 = klucz dokładny
+BASE_CACHE_TEMP_STEP = float(os.environ.get("BASE_CACHE_TEMP_STEP", "0"))
+BASE_CACHE_PREWARM = os.environ.get("BASE_CACHE_PREWARM", "0") == "1"
+
+TEMPERATURE_INDEX = FEATURE_COLUMNS.index("avg_temperature")
+
+
+
+def new_base_cache():
+    """Pusty cache RetailNet (każdy aktywowany model ma własny) lub None, gdy wyłączony."""
+    return LRUTTLCache(BASE_CACHE_SIZE, BASE_CACHE_TTL or None) if BASE_CACHE_SIZE > 0 else None
+
+
+def current_base_cache():
+    return active_model.base_cache if active_model is not None else None
+
+
+def cached_base_prob(x, model=None):
+    """
+    Etap RetailNet z pamięcią podręczną (model: migawka ActiveModel, domyślnie aktywna).
+    Sieć uruchamiana jest jedną paczką tylko dla unikalnych kluczy, których brak w cache.
+    """
+    model = model or active_model
+    base_prob_cache = model.base_cache
+    if base_prob_cache is None:
+        return model.engine.base_prob(x)
+
+    if BASE_CACHE_TEMP_STEP > 0:
+        x = x.copy()
+        x[:, TEMPERATURE_INDEX] = np.round(x[:, TEMPERATURE_INDEX] / BASE_CACHE_TEMP_STEP) * BASE_CACHE_TEMP_STEP
+
+    keys = [tuple(row) for row in x.tolist()]
+    base = np.empty(len(keys), dtype=np.float32)
+    missing = {}
+    for i, key in enumerate(keys):
+        value = base_prob_cache.get(key)
+        if value is None:
+            missing.setdefault(key, []).append(i)
+        else:
+            base[i] = value
+
+    if missing:
+        missing_keys = list(missing)
+        values = model.engine.base_prob(np.array(missing_keys, dtype=np.float32))
+        for key, value in zip(missing_keys, values):
+            base_prob_cache.put(key, float(value))
+            base[missing[key]] = value
+    return base
+
+
+def set_engine(new_engine, version="local", carry_keys=()):
+    """
+    Aktywuje backend inferencji (start lub przeładowanie modelu). LUT i nowy
+    cache RetailNet są przygotowywane przed podmianą; wpisy starego modelu
+    nie trafiają do cache nowego (także te zapisywane przez żądania w toku).
+
+    Argumenty:
+        version (str): Wersja modeli (model_registry.py) lub "local".
+        carry_keys (list): Klucze cache RetailNet wyliczane nowym modelem przed
+                           podmianą - bez skoku chybień cache po przeładowaniu.
+    """
+    global active_model
+    lut = load_personality_lut(new_engine) if PERSONALITY_LUT else None
+    base_cache = new_base_cache()
+    if base_cache is not None and carry_keys:
+        keys = list(carry_keys)[-base_cache.maxsize:]
+        for key, value in zip(keys, new_engine.base_prob(np.array(keys, dtype=np.float32)).tolist()):
+            base_cache.put(key, value)
+    generation = active_model.generation + 1 if active_model is not None else 1
+    active_model = ActiveModel(new_engine, lut, base_cache, version, generation)
+    price_curve_cache.clear()
+
+
+def prewarm_base_cache(precpt, avg_temperature, products=None):
+    """
+    Wypełnia cache RetailNet dla wszystkich kategorii z katalogu przy danej pogodzie.
+    Stan magazynu jak w NPCBuyer (stock_hour6_22_cnt = hours_stock_status = 1).
+
+    Zwraca:
+        int: Liczba wstępnie obliczonych kategorii.
+    """
+    categories = catalog_categories(products if products is not None else load_catalog())
+    rows = []
+    for cat1, cat2, cat3 in categories:
+        features = {
+            "precpt": precpt,
+            "avg_temperature": avg_temperature,
+            "stock_hour6_22_cnt": 1,
+            "hours_stock_status": 1,
+            "first_category_id": cat1,
+            "second_category_id": cat2,
+            "third_category_id": cat3,
+        }
+        rows.append([features[col] for col in FEATURE_COLUMNS])
+    if rows:
+        cached_base_prob(np.array(rows, dtype=np.float32))
+    return len(rows)
+
+
+# ==============================
+# Start serwera (ładowanie, rozgrzewka, gotowość)
+# ==============================
+startup_state = {"ready": False, "error": None, "timings_ms": {}}
+_startup_lock = threading.Lock()
+
+
+def warmup_engine(target_engine):
+    """Rozgrzewka: pierwsze przejście alokuje bufory i inicjalizuje wątki backendu."""
+    x = np.zeros((1, len(FEATURE_COLUMNS)), dtype=np.float32)
+    traits = np.zeros((1, 3), dtype=np.float32)
+    target_engine.final_prob(np.column_stack([target_engine.base_prob(x), traits]))
+
+
+def model_source(version=None):
+    """
+    Skąd ładować modele: podana lub aktywna wersja rejestru, a bez rejestru
+    pliki z katalogu roboczego. Zwraca (katalog | None, wersja | "local").
+    """
+    version = version or model_registry.active_version()
+    if version is None:
+        return None, "local"
+    return model_registry.path(version), version
+
+
+def startup():
+    """
+    Pełny start backendu: ładowanie modeli, opcjonalna LUT, rozgrzewka
+    inferencji i wypełnienie cache. Funkcja jest idempotentna - może być
+    wywołana bezpośrednio (np. w skryptach) zamiast przez lifespan serwera.
+    """
+    with _startup_lock:
+        if startup_state["ready"]:
+            return
+        timings = startup_state["timings_ms"]
+        try:
+            with timed_phase(timings, "total"):
+                directory, version = model_source()
+                with timed_phase(timings, "load_engine"):
+                    loaded_engine = load_engine(timings, directory)
+
+                with timed_phase(timings, "warmup"):
+                    warmup_engine(loaded_engine)
+
+                # Aktywacja backendu (wraz z budową/wczytaniem LUT, jeśli włączona)
+                with timed_phase(timings, "activate"):
+                    set_engine(loaded_engine, version)
+
+                if BASE_CACHE_PREWARM and current_base_cache() is not None:
+                    with timed_phase(timings, "cache_prewarm"):
+                        try:
+                            print(f"Prewarmed RetailNet cache for {prewarm_base_cache(0, 20)} categories")
+                        except OSError as e:
+                            print(f"Warning: Could not prewarm RetailNet cache: {e}")
+        except Exception as e:
+            startup_state["error"] = f"{type(e).__name__}: {e}"
+            print(f"Startup failed: {startup_state['error']}")
+            raise
+
+        timings["since_import"] = (time.perf_counter() - IMPORT_TIME) * 1000.0
+        startup_state["ready"] = True
+        print(f"Model loaded successfully! (version: {version})")
+        print("Startup timings (ms): " + ", ".join(f"{k}={v:.1f}" for k, v in timings.items()))
+        if request_log is not None:
+            request_log.log("startup", backend=INFERENCE_BACKEND, model_version=version, timings_ms=dict(timings))
+    start_registry_watcher()
+
+
+# ==============================
+# Przeładowanie modeli bez restartu
+# ==============================
+_reload_lock = threading.Lock()
+
+
+def reload_model(version=None, reason="admin"):
+    """
+    Ładuje wersję modeli (domyślnie aktywną w rejestrze), rozgrzewa ją
+    i atomowo podmienia. Ładowanie trwa w wątku wywołującym - do podmiany
+    żądania obsługuje stary model, a po błędzie pozostaje on aktywny.
+
+    Zwraca:
+        dict: version, previous i timings_ms.
+    """
+    with _reload_lock:
+        previous = active_model.version if active_model is not None else None
+        timings = {}
+        try:
+            with timed_phase(timings, "total"):
+                directory, version = model_source(version)
+                with timed_phase(timings, "load_engine"):
+                    loaded_engine = load_engine(timings, directory)
+                with timed_phase(timings, "warmup"):
+                    warmup_engine(loaded_engine)
+                # Klucze starego cache liczone nowym modelem - bez fali chybień po podmianie
+                with timed_phase(timings, "activate"):
+                    old_cache = current_base_cache()
+                    set_engine(loaded_engine, version, old_cache.keys() if old_cache is not None else ())
+        except Exception as e:
+            MODEL_RELOADS.inc(result="error")
+            print(f"Model reload failed ({version}): {type(e).__name__}: {e}")
+            if request_log is not None:
+                request_log.log("model_reload", version=version, previous=previous, reason=reason,
+                                error=f"{type(e).__name__}: {e}")
+            raise
+
+        MODEL_RELOADS.inc(result="ok")
+        # Udane przeładowanie naprawia też serwer, którego start się nie powiódł
+        startup_state["error"] = None
+        startup_state["ready"] = True
+        print(f"Model {version} active (was {previous}, {reason}): "
+              + ", ".join(f"{k}={v:.1f}ms" for k, v in timings.items()))
+        if request_log is not None:
+            request_log.log("model_reload", version=version, previous=previous, reason=reason, timings_ms=timings)
+        return {"version": version, "previous": previous, "timings_ms": timings}
+
+
+def _watch_registry():
+    """
+    Wątek: przeładowuje modele, gdy w registry.json zmieni się aktywna wersja.
+    Reaguje tylko na zmiany rejestru - wersja załadowana ręcznie (/admin/reload)
+    nie jest cofana, a nieudana wersja nie jest ponawiana do kolejnej zmiany.
+    """
+    seen = active_model.version
+    while True:
+        time.sleep(MODEL_REGISTRY_POLL)
+        try:
+            version = model_registry.active_version()
+        except (OSError, ValueError):
+            continue  # plik w trakcie ręcznej edycji - kolejna próba za chwilę
+        if version is None or version == seen:
+            continue
+        seen = version
+        if version != active_model.version:
+            try:
+                reload_model(version, reason="registry")
+            except Exception:
+                pass  # zgłoszone w reload_model, obsługuje poprzedni model
+
+
+_watcher_pid = None
+
+
+def start_registry_watcher():
+    """Uruchamia śledzenie rejestru (raz na proces, także w procesach potomnych serve.py)."""
+    global _watcher_pid
+    if MODEL_REGISTRY_POLL <= 0 or not startup_state["ready"] or _watcher_pid == os.getpid():
+        return
+    _watcher_pid = os.getpid()
+    threading.Thread(target=_watch_registry, name="registry-watcher", daemon=True).start()
+
+
+# serve.py ładuje modele przed fork() - wątki nie przechodzą do procesów potomnych
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=start_registry_watcher)
+
+
+def require_ready(endpoint="other"):
+    """Zgłasza 503, dopóki modele nie są załadowane i rozgrzane."""
+    if not startup_state["ready"]:
+        ERRORS_TOTAL.inc(endpoint=endpoint, kind="not_ready")
+        detail = startup_state["error"] or "Model is loading"
+        raise HTTPException(status_code=503, detail=detail)
 
 
 # ==============================
 # 2) Prediction endpoint
 # ==============================
-@app.post("/predict")
-async def predict(data: InputData):
+def run_chain(rows):
+    """
+    Uruchamia łańcuch RetailNet -> PersonalityNet dla listy wierszy InputData
+    w jednym przebiegu (batch) każdej z sieci.
+
+    Zwraca:
+        tuple: (lista base_buy_prob, lista final_buy_prob) w kolejności wejścia.
+    """
+    x = np.array(
+        [[getattr(row, col, 0) for col in FEATURE_COLUMNS] for row in rows],
+        dtype=np.float32
+    )
+    traits = np.array(
+        [[row.impulsiveness, row.generosity, row.is_impulse] for row in rows],
+        dtype=np.float32
+    )
+    base_buy_probs, final_buy_probs = run_chain_arrays(x, traits)
+    return base_buy_probs.tolist(), final_buy_probs.tolist()
+
+
+def run_chain_arrays(x, traits):
+    """
+    Łańcuch RetailNet -> PersonalityNet dla gotowych tablic.
+    Oba etapy liczone są na jednej migawce modeli (odporne na przeładowanie w trakcie).
+
+    Argumenty:
+        x (np.ndarray): Cechy w kolejności FEATURE_COLUMNS (n, 7).
+        traits (np.ndarray): [impulsiveness, generosity, is_impulse] (n, 3).
+    """
+    model = active_model
+    INFERENCE_BATCH_ROWS.observe(len(x))
+    with STAGE_DURATION.time(stage="retail"):
+        base_buy_probs = cached_base_prob(x, model)
+    # Wejście PersonalityNet: [bazowe_prawd, impulsywność, szczodrość, czy_impulsowy]
+    with STAGE_DURATION.time(stage="personality"):
+        final_buy_probs = personality_prob(np.column_stack([base_buy_probs, traits]), model)
+    return base_buy_probs, final_buy_probs
+
+
+def run_chain_rows(rows):
+    """Wariant run_chain dla MicroBatcher: lista par (base, final) per wiersz."""
+    return list(zip(*run_chain(rows)))
+
+
+batcher = None
+if MICROBATCH_ENABLED:
+    batcher = MicroBatcher(run_chain_rows, MICROBATCH_MAX_SIZE, MICROBATCH_MAX_WAIT_MS)
+    print(f"Micro-batching enabled (max_size={MICROBATCH_MAX_SIZE}, max_wait_ms={MICROBATCH_MAX_WAIT_MS})")
+
+
+@app.post("/predict", dependencies=[Depends(parse_started)])
+async def predict(request: Request, data: InputData):
     """
     Główny endpoint przewidywania zakupów.
     
     Argumenty:
-        data (InputData): Dane wejściowe przesłane przez Unity (JSON).
+        data: Dane wejściowe w formacie InputData przesłane przez Unity (JSON).
         
     Zwraca:
         dict: Słownik zawierający prawdopodobieństwo zakupu i ostateczną decyzję (0 lub 1).
     """
-    # Ręczne logowanie przychodzącego żądania
-    try:
-        with open("game_logs.log", "a") as f:
-            f.write(f"RECEIVED REQUEST: {data.json()}\n")
-    except Exception as e:
-        print(f"Failed to write log: {e}")
-
-    # Zamiana wejścia na tensor zgodnie z FEATURE_COLUMNS
-    x_values = [getattr(data, col, 0) for col in FEATURE_COLUMNS]
-
-    x = torch.tensor(x_values, dtype=torch.float32).to(device).unsqueeze(0)
-
-    with torch.no_grad():
-        # 1. RetailNet prediction (Predykcja popytu ogólnego)
-        # Przewidywanie ogólnego popytu na podstawie danych sklepowych/pogodowych
-        logits = model(x)
-        base_buy_prob = float(torch.sigmoid(logits).item())
-
-        # 2. PersonalityNet prediction (Predykcja korekty osobowościowej)
-        # Wejście: [bazowe_prawd, impulsywność, szczodrość, czy_impulsowy]
-        # Przewidywanie indywidualne na podstawie cech osobowości agenta
-        p_values = [
-            base_buy_prob,
-            data.impulsiveness,
-            data.generosity,
-            data.is_impulse
-        ]
-        
-        # Logowanie tensora wejściowego
-        try:
-             with open("game_logs.log", "a") as f:
-                f.write(f"DEBUG TENSOR: {p_values}\n")
-        except: pass
-        
-        p_x = torch.tensor(p_values, dtype=torch.float32).to(device).unsqueeze(0)
+    # Opóźnienie w dzienniku liczone od początku walidacji ciała
+    start = request.state.parse_start
+    parse_finished(request)
+    require_ready("/predict")
 
-        p_logits = personality_model(p_x)
-        final_buy_prob = float(torch.sigmoid(p_logits).item())
-        pred = 1 if final_buy_prob > 0.5 else 0
+    try:
+        if batcher is not None:
+            # Żądanie dołącza do wspólnej paczki, inferencja poza pętlą zdarzeń
+            with STAGE_DURATION.time(stage="microbatch"):
+                base_buy_prob, final_buy_prob = await batcher.submit(data)
+        else:
+            base_buy_probs, final_buy_probs = run_chain([data])
+            base_buy_prob, final_buy_prob = base_buy_probs[0], final_buy_probs[0]
+    except Exception:
+        ERRORS_TOTAL.inc(endpoint="/predict", kind="inference")
+        raise
+    pred = 1 if final_buy_prob > 0.5 else 0
 
     response = {
         "base_buy_prob": base_buy_prob,
@@ -131,11 +737,460 @@ async def predict(data: InputData):
         "debug_check": "alive"
     }
     
-    # Ręczne logowanie odpowiedzi
+    # Jeden rekord na żądanie (zapis w tle)
+    if request_log is not None:
+        with STAGE_DURATION.time(stage="log"):
+            fields = {}
+            if request_log.sample_debug():
+                # Wejście PersonalityNet: [bazowe_prawd, impulsywność, szczodrość, czy_impulsowy]
+                fields["debug"] = {"personality_input": [base_buy_prob, data.impulsiveness, data.generosity, data.is_impulse]}
+            request_log.log(
+                "predict",
+                input=data.model_dump(),
+                output={"base_buy_prob": base_buy_prob, "final_buy_prob": final_buy_prob, "prediction": pred},
+                latency_ms=(time.perf_counter() - start) * 1000.0,
+                **fields
+            )
+
+    return response
+
+
+@app.post("/predict_batch", dependencies=[Depends(parse_started)])
+async def predict_batch(request: Request, batch: BatchInputData):
+    """
+    Endpoint przewidywania dla całej listy zakupów NPC w jednym żądaniu.
+
+    Argumenty:
+        batch: Paczka BatchInputData - lista elementów w formacie InputData (JSON).
+
+    Zwraca:
+        dict: Lista wyników w kolejności wejścia. Elementy z błędną walidacją
+              zawierają pole "error" zamiast przewidywania.
+    """
+    # Opóźnienie w dzienniku liczone od początku walidacji ciała
+    start = request.state.parse_start
+    parse_finished(request)
+    require_ready("/predict_batch")
+
+    if len(batch.items) > MAX_BATCH_SIZE:
+        ERRORS_TOTAL.inc(endpoint="/predict_batch", kind="batch_too_large")
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(batch.items)} items (max {MAX_BATCH_SIZE})"
+        )
+
+    results = [None] * len(batch.items)
+    valid_rows = []
+    valid_indices = []
+
+    # Walidacja każdego elementu osobno (błędy raportowane per element)
+    with STAGE_DURATION.time(stage="parse"):
+        for i, item in enumerate(batch.items):
+            try:
+                valid_rows.append(InputData.model_validate(item))
+                valid_indices.append(i)
+            except ValidationError as e:
+                results[i] = {"index": i, "error": str(e)}
+
+    if valid_rows:
+        try:
+            base_buy_probs, final_buy_probs = run_chain(valid_rows)
+        except Exception:
+            ERRORS_TOTAL.inc(endpoint="/predict_batch", kind="inference")
+            raise
+        for i, base_buy_prob, final_buy_prob in zip(valid_indices, base_buy_probs, final_buy_probs):
+            results[i] = {
+                "index": i,
+                "base_buy_prob": base_buy_prob,
+                "final_buy_prob": final_buy_prob,
+                "prediction": 1 if final_buy_prob > 0.5 else 0
+            }
+
+    errors = len(batch.items) - len(valid_rows)
+    if errors:
+        ERRORS_TOTAL.inc(errors, endpoint="/predict_batch", kind="item_validation")
+
+    # Jeden rekord na paczkę: poprawne wejścia i ich wyniki (zapis w tle)
+    if request_log is not None:
+        with STAGE_DURATION.time(stage="log"):
+            request_log.log(
+                "predict_batch",
+                items=len(batch.items),
+                errors=errors,
+                inputs=[row.model_dump() for row in valid_rows],
+                outputs=[[results[i]["base_buy_prob"], results[i]["final_buy_prob"], results[i]["prediction"]]
+                         for i in valid_indices],
+                latency_ms=(time.perf_counter() - start) * 1000.0
+            )
+
+    return {"results": results, "errors": errors}
+
+
+# ==============================
+# Kanał WebSocket /ws/predict (ramki binarne)
+# ==============================
+# Maksymalna liczba rekordów łączonych w jeden przebieg sieci
+WS_MAX_ROWS = int(os.environ.get("WS_MAX_ROWS", "1024"))
+# Ramki oczekujące na inferencję (po przekroczeniu odczyt z gniazda czeka - back-pressure)
+WS_MAX_PENDING_FRAMES = int(os.environ.get("WS_MAX_PENDING_FRAMES", "64"))
+
+
+def predict_frames(frames):
+    """
+    Jeden przebieg łańcucha dla połączonych ramek (request_ids, x, traits).
+    Rekordy z wartościami NaN/inf otrzymują STATUS_INVALID.
+
+    Zwraca:
+        tuple: (request_ids, x, traits, base_buy_prob, final_buy_prob, status)
+    """
+    request_ids = np.concatenate([frame[0] for frame in frames])
+    x = np.concatenate([frame[1] for frame in frames])
+    traits = np.concatenate([frame[2] for frame in frames])
+    base_buy_prob = np.zeros(len(request_ids), dtype=np.float32)
+    final_buy_prob = np.zeros(len(request_ids), dtype=np.float32)
+
+    if not startup_state["ready"]:
+        status = np.full(len(request_ids), STATUS_NOT_READY, dtype=np.uint8)
+        return request_ids, x, traits, base_buy_prob, final_buy_prob, status
+
+    valid = np.isfinite(x).all(axis=1) & np.isfinite(traits).all(axis=1)
+    status = np.where(valid, STATUS_OK, STATUS_INVALID).astype(np.uint8)
+    if valid.any():
+        base_buy_prob[valid], final_buy_prob[valid] = run_chain_arrays(x[valid], traits[valid])
+    return request_ids, x, traits, base_buy_prob, final_buy_prob, status
+
+
+@app.websocket("/ws/predict")
+async def ws_predict(websocket: WebSocket):
+    """
+    Stałe połączenie dla klienta gry. Klient wysyła ramki binarne z rekordami
+    żądań (wire_protocol.REQUEST_DTYPE) bez czekania na odpowiedzi; ramki
+    oczekujące w kolejce łączone są w jeden przebieg sieci, a wyniki
+    (RESPONSE_DTYPE) odsyłane są zaraz po obliczeniu, z request_id klienta.
+    """
+    await websocket.accept()
+    WS_CONNECTIONS.inc()
+    pending = asyncio.Queue(maxsize=WS_MAX_PENDING_FRAMES)
+    send_lock = asyncio.Lock()
+
+    async def send_error(message, kind="frame", request_ids=None):
+        # request_ids pozwala klientowi odrzucić tylko żądania z błędnej ramki
+        ERRORS_TOTAL.inc(endpoint="/ws/predict", kind=kind)
+        payload = {"error": message}
+        if request_ids:
+            payload["request_ids"] = request_ids
+        async with send_lock:
+            await websocket.send_json(payload)
+
+    async def infer():
+        while True:
+            frames = [await pending.get()]
+            rows = len(frames[0][0])
+            while rows < WS_MAX_ROWS and not pending.empty():
+                frame = pending.get_nowait()
+                frames.append(frame)
+                rows += len(frame[0])
+
+            start = time.perf_counter()
+            try:
+                # Inferencja poza pętlą zdarzeń - w tym czasie odbierane są kolejne ramki
+                result = await asyncio.to_thread(predict_frames, frames)
+            except Exception as e:
+                await send_error(f"Inference failed: {type(e).__name__}: {e}", kind="inference",
+                                 request_ids=[int(i) for frame in frames for i in frame[0]])
+                continue
+            request_ids, x, traits, base_buy_prob, final_buy_prob, status = result
+            async with send_lock:
+                await websocket.send_bytes(encode_responses(request_ids, base_buy_prob, final_buy_prob, status))
+            WS_FRAMES.inc(direction="out")
+
+            if request_log is not None:
+                with STAGE_DURATION.time(stage="log"):
+                    ok = status == STATUS_OK
+                    rows_in = np.column_stack([x, traits])[ok].tolist()
+                    request_log.log(
+                        "predict_stream",
+                        items=len(request_ids),
+                        errors=int((~ok).sum()),
+                        inputs=[dict(zip(FEATURE_COLUMNS + TRAIT_COLUMNS, row)) for row in rows_in],
+                        outputs=[[b, f, int(f > 0.5)] for b, f in zip(base_buy_prob[ok].tolist(),
+                                                                       final_buy_prob[ok].tolist())],
+                        latency_ms=(time.perf_counter() - start) * 1000.0
+                    )
+
+    worker = asyncio.create_task(infer())
     try:
-        with open("game_logs.log", "a") as f:
-            f.write(f"SENDING RESPONSE: {json.dumps(response)}\n")
+        while not worker.done():
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            frame = message.get("bytes")
+            if frame is None:
+                await send_error("Expected a binary frame")
+                continue
+            WS_FRAMES.inc(direction="in")
+            try:
+                with STAGE_DURATION.time(stage="parse"):
+                    decoded = decode_requests(frame)
+            except FrameError as e:
+                await send_error(str(e), request_ids=frame_request_ids(frame))
+                continue
+            if len(decoded[0]) > WS_MAX_ROWS:
+                await send_error(f"Frame too large: {len(decoded[0])} records (max {WS_MAX_ROWS})",
+                                 request_ids=decoded[0].tolist())
+                continue
+            await pending.put(decoded)
+    finally:
+        # Zadanie inferencji kończy się też samo, gdy wysyłka trafi na zamknięte połączenie
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        WS_CONNECTIONS.dec()
+
+
+# ==============================
+# Krzywa odpowiedzi na cenę (/price_curve)
+# ==============================
+# NPCBuyer mnoży final_buy_prob przez basePrice / price - cena nie jest wejściem sieci,
+# więc cała siatka cen wymaga jednego wiersza RetailNet i jednego przebiegu PersonalityNet
+PRICE_CURVE_CACHE_SIZE = int(os.environ.get("PRICE_CURVE_CACHE_SIZE", "256"))
+PRICE_CURVE_SEED = 0
+
+# Klucz: numer aktywacji modelu, pogoda i reszta zapytania - klienci z różną
+# pogodą nie wypierają sobie nawzajem wyników
+price_curve_cache = LRUTTLCache(PRICE_CURVE_CACHE_SIZE)
+
+
+def price_grid(query):
+    """Siatka cen: jawna lista lub steps punktów od price_min (0.5 x basePrice) do price_max (2 x basePrice)."""
+    if query.prices is not None:
+        return np.asarray(query.prices, dtype=np.float64)
+    low, high = query.price_bounds()
+    return np.linspace(low, high, query.steps)
+
+
+def compute_price_curve(query, model=None):
+    """
+    Oczekiwana odpowiedź klientów na każdą cenę z siatki.
+
+    Zwraca:
+        dict: base_buy_prob, oraz per cena: buy_rate (odsetek klientów, dla których
+              final_buy_prob * basePrice / price > 0.5), mean_buy_prob (średnie
+              skorygowane prawdopodobieństwo, obcięte do 1) i expected_revenue
+              (buy_rate * cena - przychód na klienta oglądającego produkt).
+    """
+    features = {
+        "precpt": query.precpt,
+        "avg_temperature": query.avg_temperature,
+        "stock_hour6_22_cnt": 1,
+        "hours_stock_status": 1,
+        "first_category_id": query.first_category_id,
+        "second_category_id": query.second_category_id,
+        "third_category_id": query.third_category_id,
+    }
+    x = np.array([[features[col] for col in FEATURE_COLUMNS]], dtype=np.float32)
+    with STAGE_DURATION.time(stage="retail"):
+        base_buy_prob = float(cached_base_prob(x, model)[0])
+
+    # Stałe ziarno - ta sama próbka osobowości dla każdego zapytania (wyniki porównywalne i cache'owalne)
+    rng = np.random.default_rng(PRICE_CURVE_SEED)
+    p = np.column_stack([
+        np.full(query.samples, base_buy_prob),
+        rng.uniform(*query.impulsiveness_range, query.samples),
+        rng.uniform(*query.generosity_range, query.samples),
+        np.full(query.samples, query.is_impulse),
+    ]).astype(np.float32)
+    INFERENCE_BATCH_ROWS.observe(query.samples)
+    with STAGE_DURATION.time(stage="personality"):
+        final_buy_prob = np.asarray(personality_prob(p, model), dtype=np.float64)
+
+    prices = price_grid(query)
+    # (próbki, ceny): skorygowane prawdopodobieństwo jak w NPCBuyer
+    adjusted = final_buy_prob[:, None] * (query.base_price / np.maximum(0.01, prices))[None, :]
+    buy_rate = (adjusted > 0.5).mean(axis=0)
+    revenue = buy_rate * prices
+    best = int(np.argmax(revenue))
+    return {
+        "base_buy_prob": base_buy_prob,
+        "prices": prices.tolist(),
+        "buy_rate": buy_rate.tolist(),
+        "mean_buy_prob": np.minimum(adjusted, 1.0).mean(axis=0).tolist(),
+        "expected_revenue": revenue.tolist(),
+        "best_price": float(prices[best]),
+        "best_revenue": float(revenue[best]),
+    }
+
+
+@app.post("/price_curve", dependencies=[Depends(parse_started)])
+async def price_curve(request: Request, query: PriceCurveRequest):
+    """
+    Krzywa popytu i przychodu produktu w funkcji ceny (podgląd w PriceEditorUI).
+    Wyniki są w cache (osobno dla każdej pogody) do podmiany modelu (set_engine).
+    """
+    parse_finished(request)
+    require_ready("/price_curve")
+
+    # Numer aktywacji w kluczu: krzywa liczona w trakcie przeładowania nie trafi do nowego modelu
+    model = active_model
+    weather = (query.precpt, query.avg_temperature)
+    key = (model.generation, weather, query.model_dump_json(exclude={"precpt", "avg_temperature"}))
+    result = price_curve_cache.get(key)
+    if result is not None:
+        return {**result, "cached": True}
+    try:
+        result = compute_price_curve(query, model)
+    except Exception:
+        ERRORS_TOTAL.inc(endpoint="/price_curve", kind="inference")
+        raise
+    price_curve_cache.put(key, result)
+    return {**result, "cached": False}
+
+
+@app.get("/ready")
+async def ready():
+    """
+    Gotowość serwera (odpytywana przez BackendLauncher w Unity).
+    200 po załadowaniu i rozgrzaniu modeli, 503 w trakcie ładowania lub po błędzie startu.
+    """
+    if startup_state["ready"]:
+        return {"ready": True, "backend": INFERENCE_BACKEND, "pid": os.getpid(),
+                "model_version": active_model.version, "timings_ms": startup_state["timings_ms"]}
+    status = "error" if startup_state["error"] else "loading"
+    return JSONResponse(
+        status_code=503,
+        content={"ready": False, "status": status, "error": startup_state["error"]}
+    )
+
+
+@app.get("/batching_stats")
+async def batching_stats():
+    """Zwraca konfigurację i statystyki rozmiarów paczek mikro-paczkowania."""
+    if batcher is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "max_batch_size": batcher.max_batch_size,
+        "max_wait_ms": batcher.max_wait * 1000.0,
+        **batcher.stats.as_dict()
+    }
+
+
+@app.get("/cache_stats")
+async def cache_stats():
+    """Zwraca liczniki pamięci podręcznej RetailNet (trafienia, chybienia, usunięcia)."""
+    base_prob_cache = current_base_cache()
+    if base_prob_cache is None:
+        return {"enabled": BASE_CACHE_SIZE > 0, "price_curve": price_curve_cache.stats()}
+    return {"enabled": True, "temperature_step": BASE_CACHE_TEMP_STEP, **base_prob_cache.stats(),
+            "price_curve": price_curve_cache.stats()}
+
+
+@app.post("/cache/prewarm")
+async def cache_prewarm(weather: WeatherData):
+    """Wstępnie wypełnia cache RetailNet dla wszystkich kategorii katalogu przy podanej pogodzie."""
+    if BASE_CACHE_SIZE <= 0:
+        raise HTTPException(status_code=409, detail="RetailNet cache is disabled")
+    require_ready("/cache/prewarm")
+    try:
+        count = prewarm_base_cache(weather.precpt, weather.avg_temperature)
+    except OSError as e:
+        raise HTTPException(status_code=404, detail=f"Product catalog not available: {e}")
+    return {"prewarmed": count, **current_base_cache().stats()}
+
+
+@app.get("/log_stats")
+async def log_stats():
+    """Zwraca liczniki dziennika żądań (zapisane, odrzucone, oczekujące rekordy)."""
+    if request_log is None:
+        return {"enabled": False}
+    return {"enabled": True, "path": request_log.path, **request_log.stats()}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Metryki serwera w formacie tekstowym Prometheus (do lokalnego odpytywania)."""
+    MODEL_READY.set(1 if startup_state["ready"] else 0)
+    base_prob_cache = current_base_cache()
+    if base_prob_cache is not None:
+        cache = base_prob_cache.stats()
+        for event in ("hits", "misses", "evictions", "expirations", "invalidations", "size"):
+            CACHE_EVENTS.set(cache[event], event=event)
+    if request_log is not None:
+        for state, value in request_log.stats().items():
+            LOG_RECORDS.set(value, state=state)
+    return PlainTextResponse(metrics_registry.render(), media_type=CONTENT_TYPE)
+
+
+# ==============================
+# Administracja modelami (/admin/*)
+# ==============================
+class ModelVersionRequest(BaseModel):
+    """Wersja z rejestru modeli (None = aktywna wersja rejestru)."""
+    version: Optional[str] = None
+
+
+def require_admin(request: Request):
+    if ADMIN_TOKEN and request.headers.get("x-admin-token") != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Admin-Token")
+
+
+async def run_reload(version, reason):
+    """Przeładowanie poza pętlą zdarzeń - w trakcie ładowania serwer obsługuje żądania."""
+    if version is not None:
+        try:
+            model_registry.path(version)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, reload_model, version, reason)
     except Exception as e:
-        print(f"Failed to write log: {e}")
-    
-    return response
+        raise HTTPException(status_code=500, detail=f"Reload failed, previous model still active: "
+                                                    f"{type(e).__name__}: {e}")
+
+
+@app.get("/admin/models")
+async def admin_models(request: Request):
+    """Wersje w rejestrze, wersja aktywna w rejestrze i wersja obsługiwana przez ten proces."""
+    require_admin(request)
+    return {
+        "serving": active_model.version if active_model is not None else None,
+        "pid": os.getpid(),
+        "active": model_registry.active_version(),
+        "versions": [model_registry.metadata(version) for version in model_registry.versions()],
+    }
+
+
+@app.post("/admin/reload")
+async def admin_reload(request: Request, body: Optional[ModelVersionRequest] = None):
+    """
+    Przeładowuje modele w tym procesie: podaną wersję lub aktywną wersję rejestru
+    (bez rejestru - pliki z katalogu roboczego, np. po log_finetune.py).
+    Nie zmienia rejestru, więc pozostałe procesy serve.py zostają przy swojej wersji.
+    """
+    require_admin(request)
+    return await run_reload(body.version if body else None, "admin")
+
+
+@app.post("/admin/activate")
+async def admin_activate(request: Request, body: ModelVersionRequest):
+    """
+    Aktywuje wersję: najpierw ładuje ją w tym procesie, a dopiero po powodzeniu
+    zapisuje w rejestrze (pozostałe procesy przełączą się, śledząc registry.json).
+    """
+    require_admin(request)
+    if body.version is None:
+        raise HTTPException(status_code=422, detail="version is required")
+    result = await run_reload(body.version, "activate")
+    model_registry.activate(body.version)
+    return result
+
+
+@app.post("/admin/rollback")
+async def admin_rollback(request: Request):
+    """Przywraca wersję aktywną przed bieżącą (jak python model_registry.py rollback)."""
+    require_admin(request)
+    version = model_registry.previous_version()
+    if version is None:
+        raise HTTPException(status_code=409, detail="No previous model version to roll back to")
+    result = await run_reload(version, "rollback")
+    model_registry.rollback()
+    return result
@@ -0,0 +1,121 @@
+"""
+Dynamiczne Mikro-Paczkowanie Żądań
+----------------------------------
+Ten plik zawiera planistę (scheduler) łączącego współbieżne żądania /predict
+w jedną paczkę (batch) dla sieci neuronowych.
+
+Zasada działania:
+- Każde żądanie trafia do kolejki asyncio razem z obiektem Future.
+- Wątek roboczy zbiera do `max_batch_size` elementów lub czeka maksymalnie
+  `max_wait_ms` milisekund od pierwszego elementu paczki.
+- Inferencja całej paczki uruchamiana jest poza pętlą zdarzeń (executor),
+  a każdy klient otrzymuje swój wiersz wyniku.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BatchStats:
+    """Statystyki rozmiarów przetworzonych paczek."""
+    def __init__(self):
+        self.batches = 0
+        self.items = 0
+        self.max_size = 0
+        self.histogram = {}
+
+    def record(self, size):
+        """Rejestruje przetworzenie paczki o podanym rozmiarze."""
+        self.batches += 1
+        self.items += size
+        self.max_size = max(self.max_size, size)
+        self.histogram[size] = self.histogram.get(size, 0) + 1
+
+    def as_dict(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "largest_batch": self.max_size,
+            "histogram": {str(k): v for k, v in sorted(self.histogram.items())},
+        }
+
+
+class MicroBatcher:
+    """
+    Planista mikro-paczek.
+
+    Argumenty:
+        process_fn (callable): Funkcja synchroniczna przyjmująca listę elementów
+                               i zwracająca listę wyników w tej samej kolejności.
+        max_batch_size (int): Maksymalna liczba elementów w jednej paczce.
+        max_wait_ms (float): Maksymalny czas oczekiwania na dopełnienie paczki.
+    """
+    def __init__(self, process_fn, max_batch_size=32, max_wait_ms=5.0):
+        self.process_fn = process_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.stats = BatchStats()
+
+        # Jeden wątek - inferencja paczek odbywa się sekwencyjnie
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="microbatch")
+        self._loop = None
+        self._queue = None
+        self._worker = None
+
+    def _ensure_worker(self):
+        """Uruchamia (leniwie) zadanie robocze w bieżącej pętli zdarzeń."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, item):
+        """Dodaje element do kolejki i czeka na jego wynik."""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        """Zbiera paczkę: pierwszy element blokująco, kolejne do limitu czasu/rozmiaru."""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Najpierw opróżnij to, co już czeka w kolejce
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        # Pomiń żądania, których klienci już zrezygnowali
+        return [(item, future) for item, future in batch if not future.done()]
+
+    async def _run(self):
+        """Główna pętla zadania roboczego."""
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+
+            items = [item for item, _ in batch]
+            try:
+                results = await self._loop.run_in_executor(self._executor, self.process_fn, items)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.stats.record(len(batch))
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
@@ -0,0 +1,93 @@
+"""
+Pamięć Podręczna LRU/TTL
+------------------------
+Ograniczona rozmiarem (LRU) i czasem życia wpisów (TTL) pamięć podręczna
+używana przez serwer API, m.in. przed etapem RetailNet (base_buy_prob).
+Bezpieczna wątkowo - z cache korzysta zarówno pętla zdarzeń, jak i wątek
+mikro-paczkowania.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUTTLCache:
+    """
+    Pamięć podręczna z polityką LRU i opcjonalnym TTL.
+
+    Argumenty:
+        maxsize (int): Maksymalna liczba wpisów (najdawniej używane są usuwane).
+        ttl (float | None): Czas życia wpisu w sekundach (None = bez limitu).
+        clock (callable): Źródło czasu (domyślnie time.monotonic).
+    """
+    def __init__(self, maxsize=4096, ttl=None, clock=time.monotonic):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Liczniki
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Zwraca wartość dla klucza lub None (brak wpisu / wpis wygasł)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and self.clock() >= expires_at:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Zapisuje wartość, usuwając najdawniej używany wpis po przekroczeniu limitu."""
+        expires_at = self.clock() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Unieważnia wszystkie wpisy (np. po przeładowaniu modelu)."""
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def keys(self):
+        """Klucze (od najdawniej do ostatnio używanego), np. do rozgrzania cache nowego modelu."""
+        with self._lock:
+            return list(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Zwraca liczniki i rozmiar cache jako słownik."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,27 @@
+"""
+Katalog Produktów
+-----------------
+Wczytywanie katalogu produktów sklepu (product_catalog.json).
+Katalog odzwierciedla produkty (komponenty Product) ze sceny Unity:
+nazwę, ceny, flagę produktu impulsowego oraz kategorie cat1..cat3
+używane jako wejście sieci RetailNet.
+"""
+import json
+
+DEFAULT_CATALOG_PATH = "product_catalog.json"
+
+
+def load_catalog(path=DEFAULT_CATALOG_PATH):
+    """Wczytuje listę produktów (słowników) z pliku JSON."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["products"]
+
+
+def catalog_categories(products):
+    """Zwraca unikalne trójki kategorii (cat1, cat2, cat3) w kolejności wystąpienia."""
+    seen = []
+    for product in products:
+        key = (product["cat1"], product["cat2"], product["cat3"])
+        if key not in seen:
+            seen.append(key)
+    return seen
@@ -0,0 +1,196 @@
+"""
+Punkty Kontrolne Treningu
+-------------------------
+Wspólne narzędzia wznawiania i kontroli treningu dla train.py i train_personality.py.
+
+- save_checkpoint / load_checkpoint: pełny stan treningu (wagi, optymalizator,
+  liczba ukończonych epok, historia, stan wczesnego zatrzymania, stan generatorów
+  liczb losowych). Zapis jest atomowy - przerwanie w trakcie zapisu nie psuje
+  poprzedniego checkpointu.
+- EarlyStopping: zatrzymanie po `patience` epokach bez poprawy straty walidacyjnej,
+  z przywróceniem najlepszych wag.
+- load_weights: wagi istniejącego modelu (retail_ai_full.pth, personality_model.pth)
+  jako punkt startowy dostrajania (--warm-start).
+
+Użycie:
+    python train.py --checkpoint-every 10                # okresowe checkpointy
+    python train.py --resume                             # wznowienie przerwanego treningu
+    python train.py --early-stopping 10 --val-fraction 0.1
+    python train.py --data new_data.parquet --warm-start --lr 1e-4 --epochs 20
+"""
+import copy
+import os
+import random
+
+import numpy as np
+import torch
+
+
+def rng_state():
+    """Stan generatorów torch (CPU i CUDA), NumPy (globalny) i random."""
+    kind, keys, pos, has_gauss, cached = np.random.get_state()
+    state = {
+        "torch": torch.get_rng_state(),
+        "numpy": [kind, keys.tolist(), pos, has_gauss, cached],
+        "python": random.getstate(),
+    }
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def set_rng_state(state):
+    torch.set_rng_state(state["torch"])
+    kind, keys, pos, has_gauss, cached = state["numpy"]
+    np.random.set_state((kind, np.array(keys, dtype=np.uint32), pos, has_gauss, cached))
+    random.setstate(state["python"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+
+def save_checkpoint(path, model, optimizer, epoch, history, early_stopping=None, seed=None):
+    """
+    Zapisuje pełny stan treningu (atomowo: plik tymczasowy + os.replace).
+
+    Argumenty:
+        model (nn.Module): Model (bez opakowania DDP).
+        epoch (int): Liczba ukończonych epok.
+        history (dict): Historia metryk treningu.
+        early_stopping (EarlyStopping | None): Stan wczesnego zatrzymania.
+        seed (int | None): Ziarno danych - --resume odtwarza te same zbiory (checkpoint_seed).
+    """
+    state = {
+        "model_state": model.state_dict(),
+        "optimizer_state": optimizer.state_dict(),
+        "epoch": epoch,
+        "history": history,
+        "rng_state": rng_state(),
+    }
+    if early_stopping is not None:
+        state["early_stopping"] = early_stopping.state_dict()
+    if seed is not None:
+        state["seed"] = seed
+    tmp_path = f"{path}.tmp"
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path, model, optimizer, device, early_stopping=None):
+    """
+    Przywraca stan z save_checkpoint.
+
+    Zwraca:
+        tuple: (liczba ukończonych epok, historia)
+    """
+    state = torch.load(path, map_location=device, weights_only=True)
+    model.load_state_dict(state["model_state"])
+    optimizer.load_state_dict(state["optimizer_state"])
+    set_rng_state(state["rng_state"])
+    if early_stopping is not None and "early_stopping" in state:
+        early_stopping.load_state_dict(state["early_stopping"])
+    return state["epoch"], state["history"]
+
+
+def checkpoint_seed(path):
+    """Ziarno danych zapisane przez save_checkpoint (None, gdy brak pliku lub ziarna)."""
+    if not os.path.exists(path):
+        return None
+    return torch.load(path, map_location="cpu", weights_only=True).get("seed")
+
+
+def load_weights(model, path, device):
+    """Ładuje wagi modelu z pliku state_dict, pełnego checkpointu ("model_state") lub save_checkpoint."""
+    state = torch.load(path, map_location=device, weights_only=True)
+    if "model_state" in state:
+        state = state["model_state"]
+    model.load_state_dict(state)
+
+
+class EarlyStopping:
+    """
+    Wczesne zatrzymanie na podstawie straty walidacyjnej.
+
+    Argumenty:
+        patience (int): Liczba epok bez poprawy, po której trening jest przerywany.
+        min_delta (float): Minimalny spadek straty uznawany za poprawę.
+    """
+    def __init__(self, patience, min_delta=0.0):
+        self.patience = patience
+        self.min_delta = min_delta
+        self.best_loss = float("inf")
+        self.best_epoch = None
+        self.best_state = None
+        self.bad_epochs = 0
+
+    def step(self, val_loss, model, epoch):
+        """Rejestruje wynik epoki. Zwraca True, gdy trening należy zakończyć."""
+        if val_loss < self.best_loss - self.min_delta:
+            self.best_loss = val_loss
+            self.best_epoch = epoch
+            self.best_state = copy.deepcopy(model.state_dict())
+            self.bad_epochs = 0
+        else:
+            self.bad_epochs += 1
+        return self.bad_epochs >= self.patience
+
+    def restore_best(self, model):
+        """Przywraca wagi z najlepszej epoki."""
+        if self.best_state is not None:
+            model.load_state_dict(self.best_state)
+
+    def state_dict(self):
+        return {"best_loss": self.best_loss, "best_epoch": self.best_epoch,
+                "best_state": self.best_state, "bad_epochs": self.bad_epochs}
+
+    def load_state_dict(self, state):
+        self.best_loss = state["best_loss"]
+        self.best_epoch = state["best_epoch"]
+        self.best_state = state["best_state"]
+        self.bad_epochs = state["bad_epochs"]
+
+
+def holdout_split(features, targets, fraction, seed=None):
+    """
+    Losowy podział tensorów na część treningową i walidacyjną.
+
+    Zwraca:
+        tuple: ((features, targets) treningowe, (features, targets) walidacyjne)
+    """
+    generator = torch.Generator().manual_seed(seed) if seed is not None else None
+    order = torch.randperm(len(targets), generator=generator)
+    num_val = max(1, int(len(targets) * fraction))
+    val, train = order[:num_val], order[num_val:]
+    return (features[train], targets[train]), (features[val], targets[val])
+
+
+@torch.no_grad()
+def evaluate(model, dataloader, criterion, device):
+    """Średnia strata i dokładność modelu na zbiorze walidacyjnym."""
+    model.eval()
+    total_loss = 0.0
+    correct = 0
+    total = 0
+    for X_batch, y_batch in dataloader:
+        X_batch = X_batch.to(device)
+        y_batch = y_batch.to(device).float().reshape(-1, 1)
+        logits = model(X_batch)
+        total_loss += criterion(logits, y_batch).item() * X_batch.size(0)
+        correct += ((torch.sigmoid(logits) > 0.5).float() == y_batch).sum().item()
+        total += X_batch.size(0)
+    return total_loss / total, correct / total
+
+
+def add_checkpoint_args(parser, default_checkpoint, default_weights):
+    """Wspólne argumenty CLI checkpointów, wczesnego zatrzymania i dostrajania."""
+    parser.add_argument("--checkpoint", default=default_checkpoint, help="Full training checkpoint file")
+    parser.add_argument("--checkpoint-every", type=int, default=10,
+                        help="Save a checkpoint every N epochs (0 = only at the end)")
+    parser.add_argument("--resume", action="store_true", help="Continue training from --checkpoint")
+    parser.add_argument("--early-stopping", type=int, default=0, metavar="PATIENCE",
+                        help="Stop after PATIENCE epochs without validation loss improvement (0 = off)")
+    parser.add_argument("--min-delta", type=float, default=1e-4,
+                        help="Minimum validation loss decrease counted as an improvement")
+    parser.add_argument("--val-fraction", type=float, default=0.1,
+                        help="Held-out validation fraction used with --early-stopping")
+    parser.add_argument("--warm-start", nargs="?", const=default_weights, default=None, metavar="WEIGHTS",
+                        help=f"Fine-tune existing weights (default: {default_weights}) instead of random init")
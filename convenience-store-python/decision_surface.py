@@ -0,0 +1,420 @@
+"""
+Powierzchnia Decyzyjna Łańcucha
+-------------------------------
+Ocena modeli na gęstych siatkach wejść zamiast pojedynczych, ręcznie
+wybranych punktów:
+
+- PersonalityNet na siatce base_buy_prob x impulsiveness x generosity x is_impulse
+  (domyślnie 201 x 101 x 101 x 2 = 4,1 mln punktów) porównana z regułą analityczną
+  SyntheticPersonalityDataset (train_personality.personality_score, próg
+  DECISION_THRESHOLD, szum NOISE_STD): zgodność decyzji BUY/SKIP poza pasem
+  wokół granicy, błąd względem P(zakup) = Phi((score - próg) / NOISE_STD)
+  oraz monotoniczność względem base_buy_prob, generosity i (dla produktów
+  impulsowych) impulsiveness,
+- RetailNet na siatce pogody (precpt x avg_temperature) dla zestawu kategorii
+  (stan magazynu jak w NPCBuyer): kategorie katalogu gry oraz najczęstsze
+  trójki kategorii z danych treningowych (cache cech, feature_cache.py) lub -
+  bez cache - trójki losowane z zakresu ID; wartości skończone w [0, 1]
+  oraz wrażliwość na pogodę i kategorię.
+
+Siatki liczone są dużymi paczkami wybranym backendem łańcucha (jak api.py).
+Wynik trafia do decision_surface.json (metryki, progi i wynik każdej
+kontroli) oraz na mapy cieplne (generate_plots.py). Kod wyjścia 1, gdy
+którakolwiek kontrola nie przejdzie.
+
+Użycie:
+    python decision_surface.py
+    python decision_surface.py --backend numpy --grid 401,101,101
+    python decision_surface.py --model-version v0003 --no-plots
+    python decision_surface.py --categories data --num-categories 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+from catalog import catalog_categories, load_catalog
+from features import FEATURE_COLUMNS
+from train_personality import DECISION_THRESHOLD, NOISE_STD, personality_score
+
+DEFAULT_GRID = (201, 101, 101)
+DEFAULT_REPORT_PATH = "decision_surface.json"
+BACKENDS = ["torch", "numpy", "torchscript", "int8"]
+CHUNK_ROWS = 1 << 20
+CATEGORY_SOURCES = ["auto", "catalog", "data", "sample"]
+# Zakres ID kategorii przy losowaniu (jak numpy_engine.sample_chain_inputs)
+CATEGORY_ID_RANGE = (0, 50)
+CATEGORY_COLUMNS = ["first_category_id", "second_category_id", "third_category_id"]
+
+# Progi kontroli: (metryka, operator, wartość domyślna)
+DEFAULT_THRESHOLDS = {
+    # Zgodność decyzji z regułą poza pasem |score - próg| <= margin (tam decyduje szum)
+    "personality.agreement_off_boundary": (">=", 0.99),
+    "personality.mean_abs_error": ("<=", 0.05),
+    "personality.monotonic_violation_rate": ("<=", 0.01),
+    "retail.invalid_fraction": ("<=", 0.0),
+}
+
+
+def parse_sizes(text, count):
+    """Zamienia napis '201,101,101' na krotkę count rozmiarów (każdy >= 2)."""
+    sizes = tuple(int(v) for v in text.split(","))
+    if len(sizes) != count or min(sizes) < 2:
+        raise argparse.ArgumentTypeError(f"expected {count} comma-separated sizes >= 2, got {text!r}")
+    return sizes
+
+
+def load_chain(backend="torch", directory=None):
+    """
+    Łańcuch RetailNet -> PersonalityNet wybranego backendu.
+
+    Argumenty:
+        directory (str | None): Katalog wersji z model_registry.py
+                                (None = pliki w katalogu roboczym).
+    """
+    def artifact(name):
+        return os.path.join(directory, name) if directory else name
+
+    if backend == "numpy":
+        from numpy_engine import NumpyChain, DEFAULT_WEIGHTS_PATH, ensure_weights
+        if directory:
+            return NumpyChain.load(artifact(DEFAULT_WEIGHTS_PATH))
+        return NumpyChain.load(ensure_weights())
+    if backend in ("torchscript", "int8"):
+        from export_models import load_optimized_chain
+        return load_optimized_chain(backend, torch.device("cpu"), directory)
+    from numpy_engine import load_torch_chain
+    return load_torch_chain(artifact("retail_ai_full.pth"), artifact("personality_model.pth"))
+
+
+def evaluate(fn, points, chunk_rows=CHUNK_ROWS):
+    """Wywołuje etap sieci paczkami po chunk_rows wierszy. Zwraca wektor float32."""
+    values = np.empty(len(points), dtype=np.float32)
+    for start in range(0, len(points), chunk_rows):
+        values[start:start + chunk_rows] = fn(points[start:start + chunk_rows])
+    return values
+
+
+# ==============================
+# PersonalityNet vs reguła analityczna
+# ==============================
+def analytic_prob(score):
+    """P(score + szum > DECISION_THRESHOLD) dla szumu N(0, NOISE_STD) - optimum dla tych danych."""
+    z = torch.from_numpy(np.asarray((score - DECISION_THRESHOLD) / NOISE_STD, dtype=np.float32))
+    return torch.special.ndtr(z).numpy()
+
+
+def personality_surface(chain, grid=DEFAULT_GRID, chunk_rows=CHUNK_ROWS):
+    """
+    Oblicza PersonalityNet i regułę analityczną na siatce.
+
+    Argumenty:
+        grid (tuple): Liczba punktów dla base_buy_prob, impulsiveness i generosity
+                      w [0, 1] (is_impulse zawsze {0, 1}).
+
+    Zwraca:
+        dict: axes (4 osie), seconds (czas przebiegu sieci) oraz tablice o kształcie
+              siatki: model (final_buy_prob), score (reguła bez szumu) i analytic.
+    """
+    axes = [np.linspace(0.0, 1.0, n, dtype=np.float32) for n in grid] + [np.array([0.0, 1.0], dtype=np.float32)]
+    mesh = np.meshgrid(*axes, indexing="ij")
+    points = np.stack([m.ravel() for m in mesh], axis=1)
+
+    start = time.perf_counter()
+    model = evaluate(chain.final_prob, points, chunk_rows).reshape(mesh[0].shape)
+    seconds = time.perf_counter() - start
+
+    score = personality_score(*mesh).astype(np.float32)
+    return {"axes": axes, "model": model, "score": score, "analytic": analytic_prob(score), "seconds": seconds}
+
+
+def monotonic_violations(values, axis, tolerance):
+    """Liczba par sąsiednich punktów, w których wartość spada o więcej niż tolerance, i liczba par."""
+    diffs = np.diff(values, axis=axis)
+    return int(np.sum(diffs < -tolerance)), diffs.size
+
+
+def personality_metrics(surface, margin=2 * NOISE_STD, tolerance=1e-3):
+    """
+    Porównanie sieci z regułą analityczną.
+
+    Argumenty:
+        margin (float): Połowa szerokości pasu wokół granicy decyzji, wyłączonego
+                        z agreement_off_boundary (tam etykiety zależą od szumu).
+        tolerance (float): Dopuszczalny spadek prawdopodobieństwa między sąsiednimi
+                           punktami siatki, zanim zostanie uznany za naruszenie monotoniczności.
+    """
+    model, score, analytic = surface["model"], surface["score"], surface["analytic"]
+    agree = (model > 0.5) == (score > DECISION_THRESHOLD)
+    off_boundary = np.abs(score - DECISION_THRESHOLD) > margin
+    error = np.abs(model - analytic)
+
+    # Reguła rośnie z base_buy_prob i generosity zawsze, z impulsiveness tylko dla produktów impulsowych
+    checks = [monotonic_violations(model, 0, tolerance), monotonic_violations(model, 2, tolerance),
+              monotonic_violations(model[..., 1], 1, tolerance)]
+    violations = sum(count for count, _ in checks)
+    pairs = sum(total for _, total in checks)
+
+    metrics = {
+        "points": int(model.size),
+        "seconds": surface["seconds"],
+        "points_per_sec": model.size / surface["seconds"],
+        "decision_agreement": float(agree.mean()),
+        "agreement_off_boundary": float(agree[off_boundary].mean()),
+        "boundary_margin": margin,
+        "mean_abs_error": float(error.mean(dtype=np.float64)),
+        "max_abs_error": float(error.max()),
+        "monotonic_violation_rate": violations / pairs,
+        "monotonic_tolerance": tolerance,
+        "buy_rate_model": float((model > 0.5).mean()),
+        "buy_rate_rule": float((score > DECISION_THRESHOLD).mean()),
+    }
+    for flag in (0, 1):
+        metrics[f"agreement_off_boundary_is_impulse_{flag}"] = float(
+            agree[..., flag][off_boundary[..., flag]].mean())
+    return metrics
+
+
+# ==============================
+# RetailNet: pogoda x kategorie
+# ==============================
+def data_categories(cache_dir, limit, max_rows=2_000_000):
+    """
+    Najczęstsze trójki kategorii w danych treningowych (cache cech).
+    Dla dużych zbiorów liczone na co k-tym wierszu (najwyżej max_rows wierszy).
+    """
+    from feature_cache import open_cache
+
+    features, _, manifest = open_cache(cache_dir, mmap_mode="r")
+    columns = [manifest["feature_columns"].index(c) for c in CATEGORY_COLUMNS]
+    step = max(1, len(features) // max_rows)
+    triples, counts = np.unique(np.asarray(features[::step][:, columns]).astype(np.int64), axis=0,
+                                return_counts=True)
+    order = np.argsort(-counts, kind="stable")[:limit]
+    return [tuple(int(v) for v in triples[i]) for i in order]
+
+
+def sample_categories(limit, seed=0, id_range=CATEGORY_ID_RANGE):
+    """Losowe (różne) trójki kategorii z zakresu ID."""
+    rng = np.random.default_rng(seed)
+    triples = {tuple(int(v) for v in row) for row in rng.integers(*id_range, size=(limit * 2, 3))}
+    return sorted(triples)[:limit]
+
+
+def select_categories(source="auto", limit=64, catalog_path=None, cache_dir=None, seed=0):
+    """
+    Kategorie siatki RetailNet: katalog gry (dla "auto" na początku listy)
+    uzupełniony o kategorie z danych lub losowane.
+
+    Argumenty:
+        source (str): "catalog", "data" (cache cech), "sample" (losowe trójki)
+                      lub "auto" (katalog + dane, a bez cache katalog + losowe).
+        limit (int): Liczba kategorii spoza katalogu.
+    """
+    from feature_cache import DEFAULT_CACHE_DIR, is_cache
+
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    catalog = []
+    if source in ("auto", "catalog"):
+        catalog = catalog_categories(load_catalog(catalog_path) if catalog_path else load_catalog())
+        if source == "catalog":
+            return catalog
+        source = "data" if is_cache(cache_dir) else "sample"
+    extra = data_categories(cache_dir, limit) if source == "data" else sample_categories(limit, seed)
+    return catalog + [c for c in extra if c not in catalog]
+
+
+def retail_surface(chain, categories, precpt_values, temperatures, chunk_rows=CHUNK_ROWS):
+    """
+    Oblicza RetailNet dla każdej kategorii na siatce pogody.
+    Stan magazynu jak w NPCBuyer (stock_hour6_22_cnt = hours_stock_status = 1).
+
+    Zwraca:
+        dict: categories, precpt, avg_temperature, seconds oraz base (kategorie, precpt, temperatury).
+    """
+    cats = np.asarray(categories, dtype=np.float32).reshape(-1, 3)
+    cat_index, precpt, temperature = np.meshgrid(
+        np.arange(len(cats)), precpt_values, temperatures, indexing="ij")
+    columns = {
+        "precpt": precpt.ravel(),
+        "avg_temperature": temperature.ravel(),
+        "stock_hour6_22_cnt": np.ones(precpt.size, dtype=np.float32),
+        "hours_stock_status": np.ones(precpt.size, dtype=np.float32),
+        "first_category_id": cats[cat_index.ravel(), 0],
+        "second_category_id": cats[cat_index.ravel(), 1],
+        "third_category_id": cats[cat_index.ravel(), 2],
+    }
+    x = np.column_stack([columns[col] for col in FEATURE_COLUMNS]).astype(np.float32)
+
+    start = time.perf_counter()
+    base = evaluate(chain.base_prob, x, chunk_rows).reshape(precpt.shape)
+    return {"categories": [list(map(int, c)) for c in categories], "precpt": np.asarray(precpt_values),
+            "avg_temperature": np.asarray(temperatures), "base": base,
+            "seconds": time.perf_counter() - start}
+
+
+def retail_metrics(surface):
+    base = surface["base"]
+    valid = np.isfinite(base) & (base >= 0.0) & (base <= 1.0)
+    # Rozpiętość base_buy_prob w funkcji pogody, osobno dla każdej kategorii
+    spread = base.reshape(len(base), -1).max(axis=1) - base.reshape(len(base), -1).min(axis=1)
+    # Rozpiętość między kategoriami, osobno dla każdego punktu pogody
+    category_spread = base.max(axis=0) - base.min(axis=0)
+    return {
+        "points": int(base.size),
+        "seconds": surface["seconds"],
+        "points_per_sec": base.size / surface["seconds"],
+        "invalid_fraction": float(1.0 - valid.mean()),
+        "min": float(np.nanmin(base)),
+        "mean": float(np.nanmean(base)),
+        "max": float(np.nanmax(base)),
+        "weather_spread_mean": float(np.nanmean(spread)),
+        "weather_spread_max": float(np.nanmax(spread)),
+        "categories": len(base),
+        "category_spread_mean": float(np.nanmean(category_spread)),
+        "category_spread_max": float(np.nanmax(category_spread)),
+    }
+
+
+# ==============================
+# Progi i raport
+# ==============================
+def judge(metrics, thresholds=DEFAULT_THRESHOLDS):
+    """
+    Sprawdza progi dla dostępnych metryk.
+
+    Argumenty:
+        metrics (dict): {"personality": {...}, "retail": {...}} (sekcja może nie istnieć).
+        thresholds (dict): {"sekcja.metryka": (operator, wartość)}.
+
+    Zwraca:
+        list: Kontrole {"check", "value", "op", "threshold", "passed"}.
+    """
+    checks = []
+    for name, (op, threshold) in thresholds.items():
+        section, metric = name.split(".")
+        if section not in metrics:
+            continue
+        value = metrics[section][metric]
+        passed = value >= threshold if op == ">=" else value <= threshold
+        checks.append({"check": name, "value": value, "op": op, "threshold": threshold, "passed": bool(passed)})
+    return checks
+
+
+def print_checks(checks):
+    for c in checks:
+        print(f"{'PASS' if c['passed'] else 'FAIL'}  {c['check']:<40} {c['value']:.6f} {c['op']} {c['threshold']}")
+
+
+def write_report(path, report):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def plot_surfaces(personality, retail, prefix):
+    """Mapy cieplne obu powierzchni (generate_plots.py, wymaga matplotlib)."""
+    from generate_plots import plot_personality_surface, plot_retail_surface
+
+    if personality is not None:
+        plot_personality_surface(personality, DECISION_THRESHOLD, f"{prefix}_personality.png")
+    if retail is not None:
+        plot_retail_surface(retail, f"{prefix}_retail.png")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate RetailNet/PersonalityNet on dense input grids")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--model-version", default=None,
+                        help="Model version from model_registry.py (default: checkpoints in the working directory)")
+    parser.add_argument("--registry", default=os.environ.get("MODEL_REGISTRY", "model_registry"))
+    parser.add_argument("--grid", type=lambda text: parse_sizes(text, 3), default=DEFAULT_GRID,
+                        help="Grid sizes for base_buy_prob,impulsiveness,generosity (is_impulse is always 0/1)")
+    parser.add_argument("--precpt", type=float, nargs=3, default=[0.0, 1.0, 11], metavar=("MIN", "MAX", "STEPS"))
+    parser.add_argument("--temperature", type=float, nargs=3, default=[-10.0, 40.0, 101],
+                        metavar=("MIN", "MAX", "STEPS"))
+    parser.add_argument("--categories", choices=CATEGORY_SOURCES, default="auto",
+                        help="RetailNet categories: game catalog, most frequent in the feature cache, "
+                             "random IDs, or auto (catalog + cache, or catalog + random without a cache)")
+    parser.add_argument("--num-categories", type=int, default=64,
+                        help="Categories taken from the feature cache or sampled (besides the catalog)")
+    parser.add_argument("--catalog", default=None, help="Product catalog for RetailNet categories")
+    parser.add_argument("--cache-dir", default=None, help="Feature cache directory (feature_cache.py)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip", choices=["personality", "retail"], default=None)
+    parser.add_argument("--margin", type=float, default=2 * NOISE_STD,
+                        help="Half-width of the band around the rule's decision boundary excluded from agreement")
+    parser.add_argument("--monotonic-tolerance", type=float, default=1e-3)
+    parser.add_argument("--min-agreement", type=float, default=DEFAULT_THRESHOLDS["personality.agreement_off_boundary"][1])
+    parser.add_argument("--max-mean-error", type=float, default=DEFAULT_THRESHOLDS["personality.mean_abs_error"][1])
+    parser.add_argument("--max-monotonic-violations", type=float,
+                        default=DEFAULT_THRESHOLDS["personality.monotonic_violation_rate"][1])
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--output", default=DEFAULT_REPORT_PATH)
+    parser.add_argument("--plot-prefix", default="decision_surface")
+    parser.add_argument("--no-plots", dest="plots", action="store_false")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    directory = None
+    if args.model_version:
+        from model_registry import ModelRegistry
+        directory = ModelRegistry(args.registry).path(args.model_version)
+    chain = load_chain(args.backend, directory)
+
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    thresholds["personality.agreement_off_boundary"] = (">=", args.min_agreement)
+    thresholds["personality.mean_abs_error"] = ("<=", args.max_mean_error)
+    thresholds["personality.monotonic_violation_rate"] = ("<=", args.max_monotonic_violations)
+
+    metrics = {}
+    personality = retail = None
+    if args.skip != "personality":
+        personality = personality_surface(chain, args.grid, args.chunk_rows)
+        metrics["personality"] = personality_metrics(personality, args.margin, args.monotonic_tolerance)
+        print(f"PersonalityNet: {metrics['personality']['points']:,} points in "
+              f"{metrics['personality']['seconds']:.2f}s ({metrics['personality']['points_per_sec']:,.0f}/s)")
+    if args.skip != "retail":
+        categories = select_categories(args.categories, args.num_categories, args.catalog, args.cache_dir, args.seed)
+        precpt = np.linspace(args.precpt[0], args.precpt[1], int(args.precpt[2]), dtype=np.float32)
+        temperatures = np.linspace(args.temperature[0], args.temperature[1], int(args.temperature[2]), dtype=np.float32)
+        retail = retail_surface(chain, categories, precpt, temperatures, args.chunk_rows)
+        metrics["retail"] = retail_metrics(retail)
+        print(f"RetailNet: {metrics['retail']['points']:,} points in {metrics['retail']['seconds']:.2f}s "
+              f"({len(categories)} categories)")
+
+    checks = judge(metrics, thresholds)
+    print_checks(checks)
+    passed = all(c["passed"] for c in checks)
+    write_report(args.output, {
+        "backend": args.backend,
+        "model_version": args.model_version,
+        "grid": {"personality": list(args.grid) + [2],
+                 "retail": [len(retail["categories"]), len(retail["precpt"]), len(retail["avg_temperature"])]
+                 if retail is not None else None},
+        "rule": {"threshold": DECISION_THRESHOLD, "noise_std": NOISE_STD},
+        "metrics": metrics,
+        "checks": checks,
+        "passed": passed,
+    })
+    print(f"Saved report to {args.output}")
+
+    if args.plots:
+        try:
+            plot_surfaces(personality, retail, args.plot_prefix)
+        except ImportError as e:
+            print(f"Warning: Skipping heatmaps ({e})")
+
+    print("Decision surface OK" if passed else "Decision surface FAILED")
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
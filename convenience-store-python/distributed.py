@@ -0,0 +1,137 @@
+"""
+Trening Równoległy na CPU
+-------------------------
+Wspólne narzędzia trybu data-parallel dla train.py i train_personality.py.
+
+- launch: uruchamia N procesów lokalnie (torch.multiprocessing.spawn),
+  łączy je w grupę torch.distributed (backend gloo) i dzieli rdzenie CPU.
+  Gradienty synchronizuje DistributedDataParallel w skryptach treningowych.
+- all_reduce_sum: sumowanie metryk epoki (strata, trafienia, liczba próbek).
+- scaling_report: porównanie przepustowości dla różnych liczb procesów.
+
+Użycie:
+    python train.py --workers 4
+    python train_personality.py --scaling 1,2,4
+"""
+import contextlib
+import json
+import os
+import socket
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+
+def find_free_port():
+    """Wolny port TCP dla rendezvous procesów."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def is_distributed():
+    return dist.is_available() and dist.is_initialized()
+
+
+def threads_per_worker(world_size):
+    """Liczba wątków intra-op na proces, tak aby procesy nie rywalizowały o rdzenie."""
+    return max(1, (os.cpu_count() or 1) // max(1, world_size))
+
+
+def _worker_entry(rank, fn, world_size, port, args, results):
+    """Punkt wejścia procesu potomnego: inicjalizacja grupy i uruchomienie fn."""
+    os.environ["MASTER_ADDR"] = "127.0.0.1"
+    os.environ["MASTER_PORT"] = str(port)
+    torch.set_num_threads(threads_per_worker(world_size))
+    dist.init_process_group("gloo", rank=rank, world_size=world_size)
+    try:
+        result = fn(rank, world_size, args)
+        if rank == 0:
+            results.put(result)
+    finally:
+        dist.destroy_process_group()
+
+
+def launch(fn, world_size, args):
+    """
+    Uruchamia fn(rank, world_size, args) w world_size procesach.
+    Dla world_size <= 1 funkcja jest wywoływana bezpośrednio (bez torch.distributed).
+
+    Argumenty:
+        fn (callable): Funkcja najwyższego poziomu modułu (musi dać się zserializować).
+
+    Zwraca:
+        Wynik zwrócony przez proces o rank 0.
+    """
+    if world_size <= 1:
+        return fn(0, 1, args)
+
+    results = mp.get_context("spawn").SimpleQueue()
+    mp.spawn(_worker_entry, args=(fn, world_size, find_free_port(), args, results),
+             nprocs=world_size, join=True)
+    return None if results.empty() else results.get()
+
+
+def all_reduce_sum(values):
+    """Sumuje listę liczb po wszystkich procesach (bez zmian poza trybem rozproszonym)."""
+    if not is_distributed():
+        return list(values)
+    tensor = torch.tensor(values, dtype=torch.float64)
+    dist.all_reduce(tensor, op=dist.ReduceOp.SUM)
+    return tensor.tolist()
+
+
+def join_context(model):
+    """
+    Kontekst obsługujący nierówną liczbę paczek w procesach
+    (np. przy strumieniowaniu grup wierszy) - DDP.join().
+    """
+    if isinstance(model, torch.nn.parallel.DistributedDataParallel):
+        return model.join()
+    return contextlib.nullcontext()
+
+
+def unwrap(model):
+    """Model bazowy (bez opakowania DDP) - do zapisu state_dict."""
+    return model.module if isinstance(model, torch.nn.parallel.DistributedDataParallel) else model
+
+
+def parse_worker_counts(text):
+    """Parsuje listę liczb procesów, np. "1,2,4"."""
+    return [int(part) for part in text.split(",") if part.strip()]
+
+
+def scaling_report(fn, args, worker_counts, output_path=None):
+    """
+    Uruchamia trening dla kolejnych liczb procesów i raportuje efektywność skalowania
+    (przepustowość N procesów / (N * przepustowość 1 procesu)).
+    fn musi zwracać słownik z kluczem "samples_per_sec".
+    """
+    rows = []
+    first_rate = None
+    for n in worker_counts:
+        run_args = type(args)(**{**vars(args), "workers": n, "save": False})
+        result = launch(fn, n, run_args) or {}
+        rate = result.get("samples_per_sec", 0.0)
+        if first_rate is None:
+            first_rate = rate
+        # Przepustowość na proces w pierwszym (bazowym) pomiarze
+        per_worker = first_rate / worker_counts[0] if first_rate else 0.0
+        rows.append({
+            "workers": n,
+            "speedup": rate / first_rate if first_rate else 0.0,
+            "efficiency": rate / (n * per_worker) if per_worker else 0.0,
+            **result,
+        })
+
+    print(f"\n{'workers':>8} {'samples/s':>12} {'speedup':>8} {'efficiency':>10}")
+    for row in rows:
+        print(f"{row['workers']:>8} {row.get('samples_per_sec', 0.0):>12,.0f} "
+              f"{row['speedup']:>7.2f}x {row['efficiency']:>9.0%}")
+
+    if output_path:
+        with open(output_path, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"Saved scaling report to {output_path}")
+    return rows
@@ -0,0 +1,191 @@
+"""
+Eksport Zoptymalizowanych Modeli
+--------------------------------
+Tworzy artefakty inferencyjne łańcucha RetailNet -> PersonalityNet
+na podstawie checkpointów fp32 (retail_ai_full.pth, personality_model.pth):
+
+- "torchscript": modele śledzone (torch.jit.trace) i zamrożone pod inferencję
+  (torch.jit.freeze - wagi jako stałe, bez gałęzi treningowych),
+- "int8": dynamiczna kwantyzacja warstw Linear do INT8, zapisana jako TorchScript.
+
+Zgodność z fp32 jest twardym warunkiem: wariant, którego dryf final_buy_prob
+lub odsetek zmian decyzji BUY/SKIP przekracza progi (EXPORT_MAX_DRIFT,
+EXPORT_MAX_FLIP_RATE), nie jest zapisywany ani ładowany (ParityError).
+PersonalityNet jest stroma w okolicy progu decyzji, więc INT8 zwykle tu odpada.
+
+Artefakty ładuje api.py przy starcie (INFERENCE_BACKEND=torchscript lub int8),
+a verify_chain.py --optimized raportuje ich dryf i przyspieszenie względem fp32.
+Pliki .pt nie są w repozytorium - buduje się je tym skryptem z checkpointów.
+
+Użycie:
+    python export_models.py                 # oba warianty
+    python export_models.py --variants int8
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from features import FEATURE_COLUMNS, PERSONALITY_COLUMNS
+
+# Progi zgodności z fp32 (jak verify_chain.py --optimized) na PARITY_SAMPLES losowych wejściach
+MAX_DRIFT = float(os.environ.get("EXPORT_MAX_DRIFT", "0.02"))
+MAX_FLIP_RATE = float(os.environ.get("EXPORT_MAX_FLIP_RATE", "0.001"))
+PARITY_SAMPLES = 20000
+
+# Wariant -> (plik RetailNet, plik PersonalityNet)
+EXPORT_VARIANTS = {
+    "torchscript": ("retail_ai_ts.pt", "personality_ts.pt"),
+    "int8": ("retail_ai_int8.pt", "personality_int8.pt"),
+}
+
+
+def _script(model, num_features, quantize):
+    """Śledzi model (opcjonalnie po kwantyzacji) i zamraża go do inferencji."""
+    if quantize:
+        # Wagi kwantyzowane per kanał (mniejszy dryf niż skala per tensor)
+        qconfig = torch.ao.quantization.per_channel_dynamic_qconfig
+        model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear: qconfig}, dtype=torch.qint8)
+    example = torch.zeros(1, num_features)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+    return torch.jit.freeze(traced.eval())
+
+
+class ParityError(ValueError):
+    """Wariant zbyt odbiega od modeli fp32, by go zapisać lub załadować."""
+
+
+def check_parity(variant, chain, reference, max_drift=MAX_DRIFT, max_flip_rate=MAX_FLIP_RATE,
+                 num_samples=PARITY_SAMPLES, seed=0):
+    """
+    Porównuje łańcuch wariantu z łańcuchem fp32 (reference) na losowych wejściach.
+
+    Zwraca:
+        dict: Raport (dryf base/final, zmiany decyzji); ParityError po przekroczeniu progów.
+    """
+    from numpy_engine import sample_chain_inputs
+
+    x, traits = sample_chain_inputs(num_samples, seed)
+    base, final = chain.predict(x, traits)
+    base_ref, final_ref = reference.predict(x, traits)
+    report = {
+        "samples": num_samples,
+        "max_drift_base": float(np.max(np.abs(base - base_ref))),
+        "max_drift_final": float(np.max(np.abs(final - final_ref))),
+        "decision_flips": int(np.sum((final > 0.5) != (final_ref > 0.5))),
+    }
+    if report["max_drift_final"] > max_drift or report["decision_flips"] > max_flip_rate * num_samples:
+        raise ParityError(
+            f"{variant}: final_buy_prob drift {report['max_drift_final']:.4f} (max {max_drift}), "
+            f"{report['decision_flips']} decision flips in {num_samples} rows "
+            f"(max {max_flip_rate * num_samples:g}) vs fp32")
+    return report
+
+
+def variant_paths(variant, directory=None):
+    """Ścieżki artefaktów wariantu (w katalogu roboczym lub np. w wersji z model_registry.py)."""
+    return tuple(os.path.join(directory, name) if directory else name for name in EXPORT_VARIANTS[variant])
+
+
+def export_variant(variant, retail_model, personality_model, directory=None):
+    """
+    Zapisuje oba modele w podanym wariancie, o ile przejdą kontrolę zgodności
+    z modelami fp32 (w przeciwnym razie ParityError i żaden plik nie powstaje).
+    Lista kolumn cech i raport zgodności zapisywane są w pliku jako metadane (extra file).
+
+    Zwraca:
+        dict: Raport zgodności (check_parity).
+    """
+    from network import TorchChain
+
+    cpu = torch.device("cpu")
+    quantize = variant == "int8"
+    retail_scripted = _script(retail_model, len(FEATURE_COLUMNS), quantize)
+    personality_scripted = _script(personality_model, len(PERSONALITY_COLUMNS), quantize)
+    report = check_parity(variant, TorchChain(retail_scripted, personality_scripted, cpu),
+                          TorchChain(retail_model, personality_model, cpu))
+
+    retail_path, personality_path = variant_paths(variant, directory)
+    for scripted, columns, path in (
+        (retail_scripted, FEATURE_COLUMNS, retail_path),
+        (personality_scripted, PERSONALITY_COLUMNS, personality_path),
+    ):
+        meta = json.dumps({"variant": variant, "columns": list(columns), "parity": report})
+        torch.jit.save(scripted, path, _extra_files={"meta.json": meta})
+        print(f"Saved {path}")
+    return report
+
+
+def load_scripted_model(path, columns, device=torch.device("cpu")):
+    """Wczytuje artefakt TorchScript i sprawdza zgodność zapisanych kolumn z features.py."""
+    extra = {"meta.json": ""}
+    model = torch.jit.load(path, map_location=device, _extra_files=extra)
+    meta = json.loads(extra["meta.json"] or "{}")
+    if meta.get("columns", list(columns)) != list(columns):
+        raise ValueError(f"{path}: feature columns {meta['columns']} do not match features.py")
+    model.eval()
+    return model
+
+
+def load_optimized_chain(variant, device=None, directory=None, check=True):
+    """
+    Łańcuch TorchChain zbudowany z artefaktów wariantu.
+    Modele INT8 (kwantyzacja dynamiczna) działają wyłącznie na CPU.
+
+    Argumenty:
+        check (bool): Porównanie z checkpointami fp32 z tego samego katalogu -
+                      ParityError zamiast łańcucha, który zmienia decyzje
+                      (False tylko dla narzędzi raportujących dryf).
+    """
+    from network import TorchChain, get_device
+
+    device = torch.device("cpu") if variant == "int8" else (device or get_device())
+    retail_path, personality_path = variant_paths(variant, directory)
+    for path in (retail_path, personality_path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found (build it with: python export_models.py --variants {variant})")
+    chain = TorchChain(
+        load_scripted_model(retail_path, FEATURE_COLUMNS, device),
+        load_scripted_model(personality_path, PERSONALITY_COLUMNS, device),
+        device,
+    )
+    if check:
+        from numpy_engine import load_torch_chain
+
+        fp32_paths = [os.path.join(directory, name) if directory else name
+                      for name in ("retail_ai_full.pth", "personality_model.pth")]
+        report = check_parity(variant, chain, load_torch_chain(*fp32_paths))
+        print(f"Parity vs fp32: drift {report['max_drift_final']:.2e}, {report['decision_flips']} flips")
+    return chain
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export TorchScript and INT8 inference artifacts")
+    parser.add_argument("--variants", nargs="+", choices=sorted(EXPORT_VARIANTS), default=sorted(EXPORT_VARIANTS))
+    parser.add_argument("--retail", default="retail_ai_full.pth")
+    parser.add_argument("--personality", default="personality_model.pth")
+    args = parser.parse_args()
+
+    from network import load_retail_model, load_personality_model
+
+    # Eksport zawsze z wag fp32 na CPU
+    cpu = torch.device("cpu")
+    retail_model = load_retail_model(args.retail, cpu, strict=True)
+    personality_model = load_personality_model(args.personality, cpu)
+    failed = []
+    for variant in args.variants:
+        try:
+            export_variant(variant, retail_model, personality_model)
+        except ParityError as e:
+            print(f"Not exported: {e}")
+            failed.append(variant)
+    if failed:
+        parser.exit(1, f"Parity FAILED for: {', '.join(failed)}\n")
+
+
+if __name__ == "__main__":
+    main()
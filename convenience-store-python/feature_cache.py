@@ -0,0 +1,253 @@
+"""
+Lokalny Cache Cech FreshRetailNet
+---------------------------------
+Jednorazowe przetworzenie pliku parquet do macierzy cech FEATURE_COLUMNS
+i etykiet w plikach .npy, otwieranych później przez mapowanie pamięci
+(bez sieci, bez ponownego przeliczania cech, start w milisekundach).
+
+Katalog cache:
+    features.npy    float32 (n, len(FEATURE_COLUMNS)) - jak retail_data.table_to_arrays
+    targets.npy     float32 (n,)                       - sale_amount > 0
+    manifest.json   źródło, kolumny, liczba wierszy, skróty SHA-256 plików
+                    i odcisk pliku źródłowego (rozmiar, czas modyfikacji)
+
+Pliki otwierane są w trybie copy-on-write (mmap_mode="c"), więc kilka procesów
+treningowych (distributed.py, sweep.py) współdzieli jedną kopię w pamięci
+podręcznej stron systemu. Ten moduł nie zależy od PyTorch (jak retail_data.py).
+
+train.py, inspect_data.py i sweep.py używają cache automatycznie, gdy jego
+źródło zgadza się z --data (lub gdy --data wskazuje katalog cache).
+
+Użycie:
+    python feature_cache.py build                        # z hf:// (domyślne źródło)
+    python feature_cache.py build --source train.parquet --cache-dir feature_cache
+    python feature_cache.py info
+    python feature_cache.py verify                       # ponowne liczenie skrótów
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from features import FEATURE_COLUMNS
+from retail_data import DATASET_URL, TARGET_SOURCE_COLUMN, open_parquet, table_to_arrays
+
+DEFAULT_CACHE_DIR = "feature_cache"
+MANIFEST_NAME = "manifest.json"
+FEATURES_NAME = "features.npy"
+TARGETS_NAME = "targets.npy"
+CACHE_VERSION = 1
+HASH_CHUNK_BYTES = 8 << 20
+
+
+def file_sha256(path):
+    """Skrót SHA-256 zawartości pliku (czytanego paczkami)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_fingerprint(source):
+    """Rozmiar i czas modyfikacji pliku lokalnego (None dla źródeł zdalnych)."""
+    if "://" in source or not os.path.exists(source):
+        return None
+    stat = os.stat(source)
+    return {"bytes": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def build_cache(source=DATASET_URL, cache_dir=DEFAULT_CACHE_DIR, feature_columns=FEATURE_COLUMNS,
+                read_rows=65536):
+    """
+    Przetwarza plik parquet do katalogu cache.
+
+    Plik jest czytany strumieniowo (paczki read_rows wierszy, tylko potrzebne
+    kolumny) wprost do prealokowanych plików .npy - zużycie pamięci nie zależy
+    od rozmiaru zbioru. Cache powstaje w katalogu tymczasowym i zastępuje
+    poprzedni dopiero po zapisaniu manifestu.
+
+    Zwraca:
+        dict: Manifest.
+    """
+    start = time.perf_counter()
+    parquet = open_parquet(source)
+    names = parquet.schema_arrow.names
+    columns = [c for c in feature_columns if c in names] + [TARGET_SOURCE_COLUMN]
+    num_rows = parquet.metadata.num_rows
+
+    tmp_dir = f"{cache_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    features = np.lib.format.open_memmap(os.path.join(tmp_dir, FEATURES_NAME), mode="w+",
+                                         dtype=np.float32, shape=(num_rows, len(feature_columns)))
+    targets = np.lib.format.open_memmap(os.path.join(tmp_dir, TARGETS_NAME), mode="w+",
+                                        dtype=np.float32, shape=(num_rows,))
+    row = 0
+    for batch in parquet.iter_batches(batch_size=read_rows, columns=columns):
+        x, y = table_to_arrays(batch, feature_columns)
+        features[row:row + len(y)] = x
+        targets[row:row + len(y)] = y
+        row += len(y)
+        print(f"\rProcessed {row:,}/{num_rows:,} rows", end="", flush=True)
+    print()
+    if row != num_rows:
+        raise ValueError(f"{source}: read {row} rows, metadata reports {num_rows}")
+    features.flush()
+    targets.flush()
+    del features, targets
+
+    manifest = {
+        "version": CACHE_VERSION,
+        "source": source,
+        "source_fingerprint": source_fingerprint(source),
+        "feature_columns": list(feature_columns),
+        "target": f"{TARGET_SOURCE_COLUMN} > 0",
+        "rows": num_rows,
+        "created": time.time(),
+        "files": {},
+    }
+    for name in (FEATURES_NAME, TARGETS_NAME):
+        path = os.path.join(tmp_dir, name)
+        manifest["files"][name] = {"sha256": file_sha256(path), "bytes": os.path.getsize(path)}
+    # Skrót całości: zmienia się przy każdej zmianie danych lub kolumn
+    manifest["content_hash"] = hashlib.sha256(json.dumps(
+        [manifest["feature_columns"], manifest["files"]], sort_keys=True).encode()).hexdigest()
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+    print(f"Cached {num_rows:,} rows to {cache_dir} in {time.perf_counter() - start:.1f}s "
+          f"(content hash {manifest['content_hash'][:12]})")
+    return manifest
+
+
+def read_manifest(cache_dir=DEFAULT_CACHE_DIR):
+    """Manifest cache lub None, gdy katalog nie jest (kompletnym) cache."""
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _same_source(a, b):
+    """Równość źródeł; ścieżki lokalne porównywane po normalizacji (./train.parquet == train.parquet)."""
+    if "://" in a or "://" in b:
+        return a == b
+    return os.path.abspath(a) == os.path.abspath(b)
+
+
+def is_cache(path):
+    return os.path.isdir(path) and read_manifest(path) is not None
+
+
+def resolve_cache(data, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Katalog cache odpowiadający źródłu danych lub None (odczyt z parquet).
+
+    Argumenty:
+        data (str): Wartość --data - katalog cache albo ścieżka/URL parquet.
+        cache_dir (str): Domyślny katalog cache sprawdzany dla ścieżek parquet.
+    """
+    if is_cache(data):
+        return data
+    manifest = read_manifest(cache_dir)
+    if manifest is None or not _same_source(manifest["source"], data):
+        return None
+    if manifest["feature_columns"] != FEATURE_COLUMNS:
+        print(f"Warning: {cache_dir} was built for different feature columns, reading {data}")
+        return None
+    fingerprint = source_fingerprint(data)
+    if fingerprint is not None and fingerprint != manifest["source_fingerprint"]:
+        print(f"Warning: {data} changed since {cache_dir} was built, reading the parquet file "
+              f"(rebuild: python feature_cache.py build --source {data})")
+        return None
+    return cache_dir
+
+
+def open_cache(cache_dir=DEFAULT_CACHE_DIR, mmap_mode="c"):
+    """
+    Otwiera cache bez kopiowania danych.
+
+    Argumenty:
+        mmap_mode (str): "c" (copy-on-write, tablice zapisywalne, np. dla
+                         torch.from_numpy) lub "r" (tylko odczyt).
+
+    Zwraca:
+        tuple: (features (n, k), targets (n,), manifest) - tablice np.memmap.
+    """
+    manifest = read_manifest(cache_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"{cache_dir} is not a feature cache (no {MANIFEST_NAME})")
+    if manifest["version"] != CACHE_VERSION:
+        raise ValueError(f"{cache_dir}: cache version {manifest['version']}, expected {CACHE_VERSION}")
+    features = np.load(os.path.join(cache_dir, FEATURES_NAME), mmap_mode=mmap_mode)
+    targets = np.load(os.path.join(cache_dir, TARGETS_NAME), mmap_mode=mmap_mode)
+    if features.shape != (manifest["rows"], len(manifest["feature_columns"])) or len(targets) != manifest["rows"]:
+        raise ValueError(f"{cache_dir}: array shapes do not match the manifest")
+    return features, targets, manifest
+
+
+def verify_cache(cache_dir=DEFAULT_CACHE_DIR):
+    """Porównuje skróty plików z manifestem. Zwraca listę niezgodnych plików."""
+    manifest = read_manifest(cache_dir)
+    return [name for name, info in manifest["files"].items()
+            if file_sha256(os.path.join(cache_dir, name)) != info["sha256"]]
+
+
+def iter_cache_arrays(features, targets, batch_rows=65536, fraction=1.0,
+                      shard_index=0, num_shards=1, rng=None):
+    """
+    Odpowiednik retail_data.iter_parquet_arrays dla cache: bloki batch_rows
+    kolejnych wierszy pełnią rolę grup wierszy (podział między shardy,
+    losowa kolejność, próbkowanie fraction). Zwraca kopie bloków (X, y).
+    """
+    rng = rng or np.random.default_rng()
+    blocks = [b for b in range(-(-len(targets) // batch_rows)) if b % num_shards == shard_index]
+    rng.shuffle(blocks)
+    for block in blocks:
+        rows = slice(block * batch_rows, (block + 1) * batch_rows)
+        x, y = np.array(features[rows]), np.array(targets[rows])
+        if fraction < 1.0:
+            keep = rng.random(len(y)) < fraction
+            x, y = x[keep], y[keep]
+        if len(y):
+            yield x, y
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory-mapped FreshRetailNet feature cache")
+    parser.add_argument("command", choices=["build", "info", "verify"])
+    parser.add_argument("--source", default=DATASET_URL, help="Parquet path or hf:// URL")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--read-rows", type=int, default=65536)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        if args.source.startswith("hf://"):
+            from train import hf_login
+            hf_login()
+        build_cache(args.source, args.cache_dir, read_rows=args.read_rows)
+        return
+
+    manifest = read_manifest(args.cache_dir)
+    if manifest is None:
+        parser.exit(1, f"{args.cache_dir} is not a feature cache (run: python feature_cache.py build)\n")
+    if args.command == "info":
+        print(json.dumps(manifest, indent=2))
+        return
+    start = time.perf_counter()
+    mismatched = verify_cache(args.cache_dir)
+    if mismatched:
+        parser.exit(1, f"Hash mismatch: {', '.join(mismatched)} (rebuild the cache)\n")
+    print(f"OK: {manifest['rows']:,} rows, hashes match ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
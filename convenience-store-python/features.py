@@ -0,0 +1,28 @@
+"""
+Definicje Kolumn Wejściowych
+----------------------------
+Lista cech wejściowych obu sieci neuronowych. Moduł nie zależy od PyTorch,
+dzięki czemu może być importowany przez lekkie backendy inferencji (NumPy).
+"""
+
+# -------------------------------
+# Feature columns (te same co przy treningu)
+# -------------------------------
+# Lista cech używanych przez model RetailNet
+FEATURE_COLUMNS = [
+    "precpt",
+    "avg_temperature",
+    "stock_hour6_22_cnt",
+    "hours_stock_status",
+    "first_category_id",
+    "second_category_id",
+    "third_category_id",
+]
+
+# Lista cech używanych przez model PersonalityNet
+PERSONALITY_COLUMNS = [
+    "base_buy_prob",
+    "impulsiveness",
+    "generosity",
+    "is_impulse"
+]
@@ -1,7 +1,55 @@
 import json
 import matplotlib.pyplot as plt
+import numpy as np
 import os
 
+def _series(data, key, epochs):
+    """
+    Seria metryki wyrównana do ostatnich epok (jak val_loss), None jako NaN.
+    Historie sprzed record_metrics mogą być krótsze niż 'loss' po --resume z --profile.
+    """
+    values = np.array(data[key], dtype=float)
+    return epochs[len(epochs) - len(values):], values
+
+def plot_performance(data, epochs, title, rows):
+    """Panele wydajności: przepustowość/czas epoki oraz podział czasu na fazy i pamięć."""
+    # Przepustowość i czas epoki
+    ax = plt.subplot(rows, 2, 3)
+    ax.plot(*_series(data, 'samples_per_sec', epochs), 'g-o', label='Samples/sec', markersize=2)
+    ax.set_title(f'{title} - Throughput')
+    ax.set_xlabel('Epochs')
+    ax.set_ylabel('Samples/sec')
+    ax.grid(True, which='both', linestyle='--', linewidth=0.5)
+    ax_time = ax.twinx()
+    ax_time.plot(*_series(data, 'epoch_time_s', epochs), 'k--', label='Epoch time (s)', linewidth=1)
+    ax_time.set_ylabel('Epoch time (s)')
+    lines = ax.get_lines() + ax_time.get_lines()
+    ax.legend(lines, [line.get_label() for line in lines], loc='best')
+
+    # Podział czasu epoki na fazy (skumulowany) i szczytowa pamięć
+    # (epoki bez instrumentacji pomijane - stackplot nie obsługuje NaN)
+    ax = plt.subplot(rows, 2, 4)
+    phases = ['data', 'forward', 'backward', 'optimizer']
+    phase_epochs, _ = _series(data, 'data_time_s', epochs)
+    times = np.array([_series(data, f'{p}_time_s', epochs)[1] for p in phases])
+    measured = ~np.isnan(times).any(axis=0)
+    ax.stackplot(np.asarray(phase_epochs)[measured], *times[:, measured],
+                 labels=[p.capitalize() for p in phases], alpha=0.7)
+    ax.set_title(f'{title} - Time per Phase / Peak Memory')
+    ax.set_xlabel('Epochs')
+    ax.set_ylabel('Seconds')
+    ax.grid(True, which='both', linestyle='--', linewidth=0.5)
+    handles, labels = ax.get_legend_handles_labels()
+    if data.get('peak_memory_mb'):
+        mem_epochs, memory = _series(data, 'peak_memory_mb', epochs)
+        if not np.isnan(memory).all():
+            ax_mem = ax.twinx()
+            ax_mem.plot(mem_epochs, memory, 'm-', label='Peak memory (MB)', linewidth=1)
+            ax_mem.set_ylabel('Peak memory (MB)')
+            mem_handles, mem_labels = ax_mem.get_legend_handles_labels()
+            handles, labels = handles + mem_handles, labels + mem_labels
+    ax.legend(handles, labels, loc='upper right')
+
 def plot_history(history_file, title, output_file):
     if not os.path.exists(history_file):
         print(f"File {history_file} not found. Please run the corresponding training script first.")
@@ -11,12 +59,20 @@ def plot_history(history_file, title, output_file):
         data = json.load(f)
 
     epochs = range(1, len(data['loss']) + 1)
+    # Metryki wydajności (train.py/train_personality.py --profile)
+    has_perf = 'epoch_time_s' in data
+    rows = 2 if has_perf else 1
     
-    plt.figure(figsize=(12, 5))
+    plt.figure(figsize=(12, 5 * rows))
     
     # Loss
-    plt.subplot(1, 2, 1)
+    plt.subplot(rows, 2, 1)
     plt.plot(epochs, data['loss'], 'r-o', label='Loss', markersize=2)
+    # Strata walidacyjna (--early-stopping)
+    # (po --resume walidacja może obejmować tylko ostatnie epoki)
+    if 'val_loss' in data:
+        val_epochs = epochs[len(epochs) - len(data['val_loss']):]
+        plt.plot(val_epochs, data['val_loss'], 'r--', label='Validation loss', linewidth=1)
     plt.title(f'{title} - Loss')
     plt.xlabel('Epochs')
     plt.ylabel('Loss')
@@ -24,19 +80,96 @@ def plot_history(history_file, title, output_file):
     plt.legend()
 
     # Accuracy
-    plt.subplot(1, 2, 2)
+    plt.subplot(rows, 2, 2)
     plt.plot(epochs, data['accuracy'], 'b-o', label='Accuracy', markersize=2)
+    if 'val_accuracy' in data:
+        plt.plot(val_epochs, data['val_accuracy'], 'b--', label='Validation accuracy', linewidth=1)
     plt.title(f'{title} - Accuracy')
     plt.xlabel('Epochs')
     plt.ylabel('Accuracy')
     plt.grid(True, which='both', linestyle='--', linewidth=0.5)
     plt.legend()
 
+    if has_perf:
+        plot_performance(data, epochs, title, rows)
+
     plt.tight_layout()
     plt.savefig(output_file, dpi=300)
     print(f"Saved plot to {output_file}")
     plt.close()
 
+def _heatmap(ax, values, x_axis, y_axis, title, xlabel, ylabel, vmin=0.0, vmax=1.0, cmap='viridis'):
+    """Mapa cieplna values (y, x) na osiach x_axis/y_axis z paskiem kolorów."""
+    image = ax.imshow(values, origin='lower', aspect='auto', cmap=cmap, vmin=vmin, vmax=vmax,
+                      extent=[x_axis[0], x_axis[-1], y_axis[0], y_axis[-1]])
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    plt.colorbar(image, ax=ax)
+    return image
+
+def plot_personality_surface(surface, threshold, output_file):
+    """
+    Powierzchnia PersonalityNet z decision_surface.py: dla is_impulse = 0 i 1
+    final_buy_prob sieci i reguły (przekrój generosity = 0.5, granice decyzji:
+    sieć - linia ciągła, reguła - przerywana) oraz błąd |sieć - reguła| uśredniony po generosity.
+    """
+    base_axis, impulsiveness_axis, generosity_axis, _ = surface['axes']
+    g = len(generosity_axis) // 2
+    plt.figure(figsize=(18, 10))
+    for row, flag in enumerate((0, 1)):
+        # Macierze (impulsiveness, base_buy_prob)
+        model = surface['model'][:, :, g, flag].T
+        analytic = surface['analytic'][:, :, g, flag].T
+        score = surface['score'][:, :, g, flag].T
+        error = abs(surface['model'][..., flag] - surface['analytic'][..., flag]).mean(axis=2).T
+        label = 'impulse item' if flag else 'regular item'
+
+        for col, (values, title) in enumerate([(model, 'PersonalityNet'), (analytic, 'Analytic rule')]):
+            ax = plt.subplot(2, 3, row * 3 + col + 1)
+            _heatmap(ax, values, base_axis, impulsiveness_axis,
+                     f'{title} - {label} (generosity {generosity_axis[g]:.2f})', 'base_buy_prob', 'impulsiveness')
+            if 0 < model.min() < 0.5 < model.max():
+                ax.contour(base_axis, impulsiveness_axis, model, levels=[0.5], colors='white', linewidths=1.5)
+            if score.min() < threshold < score.max():
+                ax.contour(base_axis, impulsiveness_axis, score, levels=[threshold], colors='red',
+                           linestyles='dashed', linewidths=1.5)
+
+        ax = plt.subplot(2, 3, row * 3 + 3)
+        _heatmap(ax, error, base_axis, impulsiveness_axis, f'|Network - rule| (mean over generosity) - {label}',
+                 'base_buy_prob', 'impulsiveness', vmax=max(float(error.max()), 1e-6), cmap='magma')
+
+    plt.tight_layout()
+    plt.savefig(output_file, dpi=150)
+    print(f"Saved plot to {output_file}")
+    plt.close()
+
+def plot_retail_surface(surface, output_file):
+    """
+    Powierzchnia RetailNet z decision_surface.py: średnie base_buy_prob po kategoriach
+    w funkcji pogody oraz base_buy_prob kategorii w funkcji temperatury (bez opadów).
+    """
+    base = surface['base']
+    temperatures = surface['avg_temperature']
+    plt.figure(figsize=(14, 6))
+
+    ax = plt.subplot(1, 2, 1)
+    _heatmap(ax, base.mean(axis=0), temperatures, surface['precpt'],
+             'RetailNet - mean over categories', 'avg_temperature', 'precpt')
+
+    ax = plt.subplot(1, 2, 2)
+    # Wiersz i mapy zajmuje przedział [i - 0.5, i + 0.5]
+    _heatmap(ax, base[:, 0, :], temperatures, [-0.5, len(base) - 0.5],
+             f"RetailNet per category (precpt {surface['precpt'][0]:g})", 'avg_temperature', 'category')
+    if len(base) <= 40:
+        ax.set_yticks(range(len(base)))
+        ax.set_yticklabels(['/'.join(map(str, c)) for c in surface['categories']], fontsize=7)
+
+    plt.tight_layout()
+    plt.savefig(output_file, dpi=150)
+    print(f"Saved plot to {output_file}")
+    plt.close()
+
 if __name__ == "__main__":
     print("Generating training plots for Retail and Personality networks...")
     plot_history("retail_history.json", "Retail Network", "retail_training_plot.png")
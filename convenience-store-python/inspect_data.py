@@ -1,11 +1,48 @@
+"""
+Podgląd Danych FreshRetailNet
+-----------------------------
+Wypisuje kolumny, pierwsze wiersze i podstawowe statystyki zbioru.
+Gdy istnieje cache cech (feature_cache.py) dla podanego źródła, dane czytane
+są z plików mapowanych w pamięci - bez sieci; w przeciwnym razie z pliku parquet.
+
+Użycie:
+    python inspect_data.py
+    python inspect_data.py --data train.parquet --no-cache
+"""
+import argparse
+
+import numpy as np
 import pandas as pd
-try:
+
+from feature_cache import open_cache, resolve_cache
+from retail_data import DATASET_URL
+
+
+def inspect_cache(cache_dir):
+    features, targets, manifest = open_cache(cache_dir, mmap_mode="r")
+    print(f"Feature cache {cache_dir} (source: {manifest['source']}, rows: {manifest['rows']:,})")
+    df = pd.DataFrame(np.asarray(features[:5]), columns=manifest["feature_columns"])
+    df["target"] = targets[:5]
+    print("First 5 rows:")
+    print(df)
+
+    stats = pd.DataFrame({
+        "min": features.min(axis=0),
+        "mean": features.mean(axis=0, dtype=np.float64),
+        "max": features.max(axis=0),
+    }, index=manifest["feature_columns"])
+    print("Feature statistics:")
+    print(stats)
+    print(f"Target rate ({manifest['target']}): {targets.mean(dtype=np.float64):.4f}")
+
+
+def inspect_parquet(path):
     print("Reading parquet...")
-    df = pd.read_parquet("hf://datasets/Dingdong-Inc/FreshRetailNet-50K/data/train.parquet")
+    df = pd.read_parquet(path)
     print("Columns:", df.columns.tolist())
     print("First 5 rows:")
     print(df.head())
-    
+
     # Check for category names
     possible_names = [c for c in df.columns if 'name' in c or 'desc' in c]
     if possible_names:
@@ -13,6 +50,24 @@ try:
         print(df[possible_names + ['first_category_id']].drop_duplicates().head(20))
     else:
         print("No name columns found.")
-        
-except Exception as e:
-    print(f"Error: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the FreshRetailNet dataset")
+    parser.add_argument("--data", default=DATASET_URL, help="Parquet path, hf:// URL or feature cache directory")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="Read the parquet file (all columns) even if a feature cache exists")
+    args = parser.parse_args()
+
+    try:
+        cache_dir = resolve_cache(args.data) if args.cache else None
+        if cache_dir is not None:
+            inspect_cache(cache_dir)
+        else:
+            inspect_parquet(args.data)
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
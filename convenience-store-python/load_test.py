@@ -0,0 +1,328 @@
+"""
+Test Obciążeniowy API
+---------------------
+Generator ruchu odtwarzający zachowanie klientów (NPC) z gry:
+godzinowe szanse pojawienia się klientów (ClientSpawner), długości list
+zakupów, zmiany pogody (WeatherManager) oraz żądania wysyłane przez NPCBuyer.
+
+Domyślnie uruchamia lokalnie serwer `uvicorn api:app`, czeka na /ready
+i steruje nim współbieżnymi klientami asyncio (httpx).
+Raportuje przepustowość, opóźnienia p50/p95/p99 i odsetek błędów,
+a wyniki zapisuje w pliku JSON do porównań między commitami.
+
+Użycie:
+    python load_test.py --hours 14 --seconds-per-hour 2 --npc-scale 20
+    python load_test.py --mode single --server-env MICROBATCH=1
+    python load_test.py --server-workers 4
+    python load_test.py --url http://127.0.0.1:8000 --baseline load_test_results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+from catalog import load_catalog
+from store_model import (
+    OPENING_HOUR, CLOSING_HOUR, DEFAULT_SPAWN_CHANCE, SPAWN_CHECK_INTERVAL, REAL_SECONDS_PER_HOUR,
+    Weather, make_npc, item_payload, spawn_chance,
+)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = "load_test_results.json"
+
+
+# ==============================
+# Lokalny serwer
+# ==============================
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LocalServer:
+    """
+    Serwer uvicorn api:app uruchomiony jako proces potomny.
+    Zmienne środowiskowe (np. INFERENCE_BACKEND, MICROBATCH) można nadpisać przez env.
+    Przy workers > 0 uruchamiany jest serwer prefork (serve.py) z podaną liczbą procesów.
+    """
+    def __init__(self, port=None, env=None, ready_timeout=120.0, workers=0):
+        self.port = port or _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = {**os.environ, **(env or {})}
+        self.ready_timeout = ready_timeout
+        self.workers = workers
+        self.process = None
+        self.startup_s = None
+
+    def __enter__(self):
+        start = time.perf_counter()
+        if self.workers:
+            command = [sys.executable, "serve.py", "--workers", str(self.workers)]
+        else:
+            command = [sys.executable, "-m", "uvicorn", "api:app"]
+        self.process = subprocess.Popen(
+            command + ["--host", "127.0.0.1", "--port", str(self.port), "--log-level", "warning"],
+            cwd=HERE, env=self.env,
+        )
+        self._wait_ready()
+        self.startup_s = time.perf_counter() - start
+        return self
+
+    def _wait_ready(self):
+        deadline = time.monotonic() + self.ready_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"API server exited with code {self.process.returncode}")
+            try:
+                if httpx.get(f"{self.url}/ready", timeout=1.0).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.25)
+        raise TimeoutError("API server did not become ready in time")
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+# ==============================
+# Klienci (NPC)
+# ==============================
+class Recorder:
+    """Zbiera wyniki pojedynczych żądań."""
+    def __init__(self):
+        self.records = []
+
+    def add(self, endpoint, hour, latency_ms, ok, items, item_errors=0):
+        self.records.append({
+            "endpoint": endpoint, "hour": hour, "latency_ms": latency_ms,
+            "ok": ok, "items": items, "item_errors": item_errors,
+        })
+
+
+async def _post(client, recorder, endpoint, payload, hour, items):
+    start = time.perf_counter()
+    try:
+        response = await client.post(endpoint, json=payload)
+        ok = response.status_code == 200
+        item_errors = response.json().get("errors", 0) if ok and endpoint == "/predict_batch" else 0
+    except (httpx.HTTPError, ValueError):
+        ok, item_errors = False, 0
+    recorder.add(endpoint, hour, (time.perf_counter() - start) * 1000, ok, items, item_errors)
+
+
+async def run_npc(client, recorder, npc, weather, hour, mode):
+    """
+    Żądania jednego klienta: cała lista w jednym /predict_batch (jak obecny NPCBuyer)
+    lub produkt po produkcie przez /predict (tryb "single", dawny klient).
+    """
+    payloads = [item_payload(product, npc, weather) for product in npc["shopping_list"]]
+    if mode == "batch":
+        await _post(client, recorder, "/predict_batch", {"items": payloads}, hour, len(payloads))
+    else:
+        for payload in payloads:
+            await _post(client, recorder, "/predict", payload, hour, 1)
+
+
+async def drive(url, args, products):
+    """
+    Odtwarza dzień sklepu: co SPAWN_CHECK_INTERVAL sekund gry każdy z npc_scale
+    "spawnerów" losuje pojawienie się klienta z szansą godzinową.
+    Czas gry jest skalowany parametrem --seconds-per-hour.
+    """
+    rng = np.random.default_rng(args.seed)
+    weather = Weather(rng)
+    recorder = Recorder()
+
+    tick_real = SPAWN_CHECK_INTERVAL * args.seconds_per_hour / REAL_SECONDS_PER_HOUR
+    tick_hours = SPAWN_CHECK_INTERVAL / REAL_SECONDS_PER_HOUR
+    end_hour = min(CLOSING_HOUR, args.start_hour + args.hours)
+
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    timeout = httpx.Timeout(args.timeout, pool=None)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+        tasks = []
+        npcs = 0
+        hour = args.start_hour
+        start = time.perf_counter()
+        tick = 0
+        while hour < end_hour:
+            weather.advance(hour, SPAWN_CHECK_INTERVAL)
+            spawned = rng.binomial(args.npc_scale, spawn_chance(hour, args.spawn_chance))
+            for _ in range(spawned):
+                npc = make_npc(rng, products)
+                tasks.append(asyncio.create_task(
+                    run_npc(client, recorder, npc, weather, int(hour), args.mode)
+                ))
+            npcs += spawned
+
+            tick += 1
+            hour = args.start_hour + tick * tick_hours
+            # Harmonogram bezwzględny - bez dryfu przy wolnych odpowiedziach
+            delay = start + tick * tick_real - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        await asyncio.gather(*tasks)
+        duration = time.perf_counter() - start
+
+    return recorder.records, duration, npcs
+
+
+# ==============================
+# Raport
+# ==============================
+def _latency_summary(latencies):
+    if not latencies:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    values = np.asarray(latencies)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99),
+            "mean": float(values.mean()), "max": float(values.max())}
+
+
+def summarize(records, duration, npcs):
+    """Przepustowość, percentyle opóźnień i błędy - łącznie, per endpoint i per godzina gry."""
+    def block(rows):
+        requests = len(rows)
+        errors = sum(1 for r in rows if not r["ok"])
+        items = sum(r["items"] for r in rows)
+        return {
+            "requests": requests,
+            "items": items,
+            "errors": errors,
+            "item_errors": sum(r["item_errors"] for r in rows),
+            "error_rate": errors / requests if requests else 0.0,
+            "latency_ms": _latency_summary([r["latency_ms"] for r in rows if r["ok"]]),
+        }
+
+    summary = block(records)
+    summary.update({
+        "npcs": npcs,
+        "duration_s": duration,
+        "throughput_rps": summary["requests"] / duration if duration else 0.0,
+        "items_per_sec": summary["items"] / duration if duration else 0.0,
+        "by_endpoint": {ep: block([r for r in records if r["endpoint"] == ep])
+                        for ep in sorted({r["endpoint"] for r in records})},
+        "by_hour": {str(h): block([r for r in records if r["hour"] == h])
+                    for h in sorted({r["hour"] for r in records})},
+    })
+    return summary
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summary(summary):
+    lat = summary["latency_ms"]
+    print(f"\nNPCs: {summary['npcs']} | requests: {summary['requests']} | items: {summary['items']} "
+          f"| duration: {summary['duration_s']:.1f}s")
+    print(f"Throughput: {summary['throughput_rps']:.1f} req/s | {summary['items_per_sec']:.1f} items/s")
+    if lat["p50"] is not None:
+        print(f"Latency ms: p50={lat['p50']:.2f} p95={lat['p95']:.2f} p99={lat['p99']:.2f} max={lat['max']:.2f}")
+    print(f"Errors: {summary['errors']} ({summary['error_rate']:.2%}), item errors: {summary['item_errors']}")
+
+
+def compare(summary, baseline, max_regression):
+    """
+    Porównanie z poprzednim wynikiem. Zwraca False, jeśli p95/p99 wzrosły
+    lub przepustowość spadła o więcej niż max_regression (ułamek).
+    """
+    base = baseline["summary"]
+    checks = [
+        ("p95 ms", base["latency_ms"]["p95"], summary["latency_ms"]["p95"], True),
+        ("p99 ms", base["latency_ms"]["p99"], summary["latency_ms"]["p99"], True),
+        ("items/s", base["items_per_sec"], summary["items_per_sec"], False),
+        ("error rate", base["error_rate"], summary["error_rate"], True),
+    ]
+    passed = True
+    print(f"\nComparison with baseline (commit {baseline.get('meta', {}).get('git_commit')}):")
+    for name, old, new, lower_is_better in checks:
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        regression = change > max_regression if lower_is_better else change < -max_regression
+        passed &= not regression
+        print(f"  {name:<10} {old:>10.2f} -> {new:>10.2f} ({change:+.1%}){'  REGRESSION' if regression else ''}")
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay NPC traffic against the API and report latency")
+    parser.add_argument("--url", default=None, help="Use a running server instead of starting api:app")
+    parser.add_argument("--server-env", action="append", default=[], help="KEY=VALUE for the local server")
+    parser.add_argument("--server-workers", type=int, default=0,
+                        help="Start the local server with serve.py and this many workers")
+    parser.add_argument("--mode", choices=["batch", "single"], default="batch",
+                        help="batch: one /predict_batch per NPC, single: one /predict per item")
+    parser.add_argument("--start-hour", type=float, default=OPENING_HOUR)
+    parser.add_argument("--hours", type=float, default=CLOSING_HOUR - OPENING_HOUR)
+    parser.add_argument("--seconds-per-hour", type=float, default=2.0,
+                        help=f"Real seconds per game hour (game default: {REAL_SECONDS_PER_HOUR})")
+    parser.add_argument("--npc-scale", type=int, default=20,
+                        help="Independent spawn rolls per check (multiplies NPC traffic)")
+    parser.add_argument("--spawn-chance", type=float, nargs="+", default=DEFAULT_SPAWN_CHANCE,
+                        help="Hourly spawn chance per check, from opening hour")
+    parser.add_argument("--max-connections", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--catalog", default=os.path.join(HERE, "product_catalog.json"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=None, help="Previous results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    products = load_catalog(args.catalog)
+    server_env = dict(item.split("=", 1) for item in args.server_env)
+
+    if args.url:
+        records, duration, npcs = asyncio.run(drive(args.url, args, products))
+        startup_s = None
+    else:
+        with LocalServer(env=server_env, workers=args.server_workers) as server:
+            print(f"Server ready in {server.startup_s:.2f}s at {server.url}")
+            records, duration, npcs = asyncio.run(drive(server.url, args, products))
+            startup_s = server.startup_s
+
+    summary = summarize(records, duration, npcs)
+    print_summary(summary)
+
+    result = {
+        "meta": {
+            "timestamp": time.time(),
+            "git_commit": _git_commit(),
+            "server_startup_s": startup_s,
+            "server_env": server_env,
+            "args": {k: v for k, v in vars(args).items() if k not in ("baseline", "output")},
+        },
+        "summary": summary,
+    }
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            if not compare(summary, json.load(f), args.max_regression):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+"""
+Dostrajanie PersonalityNet z Ruchu Gry
+--------------------------------------
+Przyrostowe dostrajanie PersonalityNet na rozkładzie wejść obserwowanym w grze.
+
+- LogTail: czyta dziennik żądań (request_log.py) przyrostowo - bieżący plik,
+  archiwa po rotacji (game_logs.jsonl.1, ...) oraz dzienniki procesów roboczych
+  serve.py (game_logs.w<N>.jsonl). Pozycja odczytu jest zapamiętywana dla
+  każdego pliku (po numerze i-węzła, więc przeżywa rotację), a niepełne linie
+  są doczytywane w kolejnej rundzie - żaden rekord nie jest czytany dwukrotnie.
+- ReplayBuffer: bufor cykliczny ostatnich wierszy wejścia PersonalityNet
+  [base_buy_prob, impulsiveness, generosity, is_impulse] z rekordów
+  predict / predict_batch / predict_stream, zapisywany między rundami.
+- Etykiety: dziennik nie zawiera rzeczywistych decyzji, więc celem jest reguła
+  z train_personality.py liczona analitycznie: P(score + szum > próg)
+  (miękka etykieta - wartość oczekiwana etykiet z treningu syntetycznego).
+  Część każdej paczki to próbki jednostajne (--synthetic-mix), aby model nie
+  zapominał obszarów rzadko odwiedzanych w grze.
+- Runda: kilkaset kroków Adama z niskim lr od bieżących wag. Nowe wagi są
+  zapisywane (atomowo) tylko wtedy, gdy strata na odłożonych wierszach z gry
+  spadła, a strata na próbkach jednostajnych nie wzrosła ponad --max-regression.
+
+Proces działa niezależnie od serwera (osobny proces, niski priorytet, jeden
+wątek) - serwer nie jest blokowany. Nowy personality_model.pth jest ładowany przy
+kolejnym starcie serwera; dla INFERENCE_BACKEND=numpy wagi należy wyeksportować
+(--export-numpy).
+
+Użycie:
+    python log_finetune.py --once                         # jedna runda
+    python log_finetune.py --watch --interval 300 &       # proces w tle
+    python log_finetune.py --watch --log game_logs.jsonl --min-new-rows 5000
+"""
+import argparse
+import json
+import os
+import re
+import signal
+import sys
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.optim as optim
+
+from network import PERSONALITY_COLUMNS, load_personality_model
+from request_log import DEFAULT_LOG_PATH
+from train_personality import DECISION_THRESHOLD, NOISE_STD, generate_personality_batch, personality_score
+
+DEFAULT_STATE_PATH = "finetune_state.json"
+DEFAULT_BUFFER_PATH = "finetune_buffer.npz"
+DEFAULT_HISTORY_PATH = "finetune_history.json"
+
+# Rekordy dziennika zawierające wejścia PersonalityNet
+LOGGED_KINDS = ("predict", "predict_batch", "predict_stream")
+READ_CHUNK_BYTES = 1 << 20
+
+
+# ==============================
+# Przyrostowy odczyt dziennika
+# ==============================
+def discover_log_files(path=DEFAULT_LOG_PATH):
+    """
+    Pliki dziennika: bieżący, dzienniki procesów roboczych i ich archiwa,
+    od najstarszego (według czasu modyfikacji).
+    """
+    directory = os.path.dirname(path) or "."
+    stem, ext = os.path.splitext(os.path.basename(path))
+    pattern = re.compile(rf"^{re.escape(stem)}(\.w\d+)?{re.escape(ext)}(\.\d+)?$")
+    files = [os.path.join(directory, name) for name in os.listdir(directory) if pattern.match(name)]
+    return sorted(files, key=lambda name: os.stat(name).st_mtime)
+
+
+class LogTail:
+    """
+    Przyrostowy czytnik dziennika żądań z zapamiętaną pozycją każdego pliku.
+
+    Pliki identyfikowane są przez (st_dev, st_ino) - rotacja (zmiana nazwy)
+    nie zmienia identyfikatora, więc archiwum jest doczytywane od miejsca,
+    w którym skończył się odczyt bieżącego pliku. Plik krótszy niż zapamiętana
+    pozycja (obcięty lub nowy plik z ponownie użytym i-węzłem) czytany jest od początku.
+
+    Argumenty:
+        path (str): Ścieżka bieżącego dziennika (jak REQUEST_LOG_PATH serwera).
+        state_path (str): Plik JSON z pozycjami odczytu.
+    """
+    def __init__(self, path=DEFAULT_LOG_PATH, state_path=DEFAULT_STATE_PATH):
+        self.path = path
+        self.state_path = state_path
+        self.offsets = {}
+        self.pending_rows = 0
+        if os.path.exists(state_path):
+            with open(state_path) as f:
+                state = json.load(f)
+            self.offsets = state.get("offsets", {})
+            self.pending_rows = state.get("pending_rows", 0)
+
+    def read_new(self):
+        """Generator nowych rekordów (pełnych linii) ze wszystkich plików dziennika."""
+        seen = {}
+        for name in discover_log_files(self.path):
+            try:
+                stat = os.stat(name)
+            except FileNotFoundError:
+                continue  # usunięty przez rotację w trakcie odczytu
+            key = f"{stat.st_dev}:{stat.st_ino}"
+            offset = self.offsets.get(key, 0)
+            if stat.st_size < offset:
+                offset = 0
+            if stat.st_size > offset:
+                offset = yield from self._read_from(name, offset)
+            seen[key] = offset
+        # Pliki usunięte przez rotację nie są już potrzebne
+        self.offsets = seen
+
+    @staticmethod
+    def _read_from(name, offset):
+        """Czyta pełne linie od pozycji offset. Zwraca nową pozycję (koniec ostatniej pełnej linii)."""
+        remainder = b""
+        with open(name, "rb") as f:
+            f.seek(offset)
+            while True:
+                chunk = f.read(READ_CHUNK_BYTES)
+                if not chunk:
+                    break
+                lines = (remainder + chunk).split(b"\n")
+                remainder = lines.pop()
+                for line in lines:
+                    offset += len(line) + 1
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+        # Niepełna ostatnia linia zostaje na następną rundę
+        return offset
+
+    def save(self):
+        """Zapisuje pozycje odczytu (atomowo)."""
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"offsets": self.offsets, "pending_rows": self.pending_rows}, f)
+        os.replace(tmp_path, self.state_path)
+
+
+def personality_rows(record):
+    """
+    Wiersze wejścia PersonalityNet z rekordu dziennika.
+
+    Zwraca:
+        list: [base_buy_prob, impulsiveness, generosity, is_impulse] dla każdej
+              poprawnej pozycji (pusta lista dla innych typów rekordów).
+    """
+    kind = record.get("kind")
+    if kind == "predict":
+        inputs, bases = [record["input"]], [record["output"]["base_buy_prob"]]
+    elif kind in LOGGED_KINDS:
+        inputs, bases = record.get("inputs", []), [output[0] for output in record.get("outputs", [])]
+    else:
+        return []
+    return [[base, row["impulsiveness"], row["generosity"], row["is_impulse"]]
+            for row, base in zip(inputs, bases)]
+
+
+# ==============================
+# Bufor wierszy z gry
+# ==============================
+class ReplayBuffer:
+    """
+    Bufor cykliczny ostatnich `capacity` wierszy wejścia PersonalityNet.
+    Najstarsze wiersze są nadpisywane, więc zbiór śledzi bieżący rozkład ruchu.
+    """
+    def __init__(self, capacity):
+        self.rows = np.empty((capacity, len(PERSONALITY_COLUMNS)), dtype=np.float32)
+        self.size = 0
+        self.position = 0
+        self.total_seen = 0
+
+    def add(self, rows):
+        rows = np.asarray(rows, dtype=np.float32).reshape(-1, self.rows.shape[1])
+        # Odrzucenie wartości nieskończonych (dziennik przechowuje też nietypowe wejścia)
+        rows = rows[np.isfinite(rows).all(axis=1)][-len(self.rows):]
+        capacity = len(self.rows)
+        end = self.position + len(rows)
+        if end <= capacity:
+            self.rows[self.position:end] = rows
+        else:
+            split = capacity - self.position
+            self.rows[self.position:] = rows[:split]
+            self.rows[:end - capacity] = rows[split:]
+        self.position = end % capacity
+        self.size = min(capacity, self.size + len(rows))
+        self.total_seen += len(rows)
+        return len(rows)
+
+    def data(self):
+        return self.rows[:self.size]
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, rows=self.data(), position=self.position, total_seen=self.total_seen)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, capacity):
+        buffer = cls(capacity)
+        if os.path.exists(path):
+            with np.load(path) as data:
+                rows, position = data["rows"], int(data["position"])
+                # Kolejność chronologiczna (od najstarszego), także przy zmianie pojemności
+                buffer.add(np.concatenate([rows[position:], rows[:position]]))
+                buffer.total_seen = int(data["total_seen"])
+        return buffer
+
+
+# ==============================
+# Runda dostrajania
+# ==============================
+def teacher_targets(x):
+    """
+    Prawdopodobieństwo zakupu według reguły z train_personality.py:
+    P(score + N(0, NOISE_STD) > DECISION_THRESHOLD).
+
+    Zwraca:
+        torch.Tensor: Miękkie etykiety (n, 1), float32.
+    """
+    score = personality_score(x[:, 0], x[:, 1], x[:, 2], x[:, 3])
+    z = torch.from_numpy(((score - DECISION_THRESHOLD) / NOISE_STD).astype(np.float32))
+    return torch.special.ndtr(z).reshape(-1, 1)
+
+
+@torch.no_grad()
+def evaluate_rows(model, x, criterion):
+    """Strata względem miękkich etykiet i zgodność decyzji (> 0.5) z regułą."""
+    model.eval()
+    targets = teacher_targets(x)
+    logits = model(torch.from_numpy(x))
+    loss = criterion(logits, targets).item()
+    agreement = ((logits > 0) == (targets > 0.5)).float().mean().item()
+    return loss, agreement
+
+
+def finetune_round(model, rows, args, rng):
+    """
+    Krótkie dostrajanie modelu na wierszach z gry.
+
+    Argumenty:
+        model (PersonalityNet): Model z bieżącymi wagami (modyfikowany w miejscu).
+        rows (np.ndarray): Wiersze z bufora (n, 4).
+        args (argparse.Namespace): Parametry rundy (steps, batch_size, lr, ...).
+        rng (np.random.Generator): Generator losowań paczek.
+
+    Zwraca:
+        dict: Metryki przed i po rundzie oraz decyzja o akceptacji ("accepted").
+    """
+    criterion = nn.BCEWithLogitsLoss()
+    order = rng.permutation(len(rows))
+    num_eval = min(args.eval_rows, len(rows) // 5)
+    eval_rows, train_rows = rows[order[:num_eval]], rows[order[num_eval:]]
+    uniform_rows, _ = generate_personality_batch(args.eval_rows, rng)
+
+    live_before, agreement_before = evaluate_rows(model, eval_rows, criterion)
+    uniform_before, _ = evaluate_rows(model, uniform_rows, criterion)
+
+    optimizer = optim.Adam(model.parameters(), lr=args.lr)
+    num_synthetic = int(args.batch_size * args.synthetic_mix)
+    model.train()
+    for _ in range(args.steps):
+        batch = train_rows[rng.integers(0, len(train_rows), args.batch_size - num_synthetic)]
+        if num_synthetic:
+            batch = np.concatenate([batch, generate_personality_batch(num_synthetic, rng)[0]])
+        optimizer.zero_grad()
+        loss = criterion(model(torch.from_numpy(batch)), teacher_targets(batch))
+        loss.backward()
+        optimizer.step()
+
+    live_after, agreement_after = evaluate_rows(model, eval_rows, criterion)
+    uniform_after, _ = evaluate_rows(model, uniform_rows, criterion)
+    accepted = live_after < live_before and uniform_after <= uniform_before + args.max_regression
+    return {
+        "ts": time.time(),
+        "rows": len(rows),
+        "live_loss": [live_before, live_after],
+        "live_agreement": [agreement_before, agreement_after],
+        "uniform_loss": [uniform_before, uniform_after],
+        "accepted": accepted,
+    }
+
+
+def save_model(model, path):
+    """Zapisuje state_dict atomowo - serwer startujący w trakcie zapisu nie zobaczy połowy pliku."""
+    tmp_path = f"{path}.tmp"
+    torch.save(model.state_dict(), tmp_path)
+    os.replace(tmp_path, path)
+
+
+def append_history(path, entry):
+    history = []
+    if os.path.exists(path):
+        with open(path) as f:
+            history = json.load(f)
+    history.append(entry)
+    with open(path, "w") as f:
+        json.dump(history, f, indent=2)
+
+
+def run_round(tail, buffer, args, rng):
+    """
+    Jedna runda: doczytanie dziennika, a po zebraniu --min-new-rows nowych
+    wierszy - dostrajanie i (po akceptacji) zapis modelu.
+
+    Zwraca:
+        dict | None: Metryki rundy lub None, gdy za mało nowych danych.
+    """
+    new_rows = []
+    for record in tail.read_new():
+        new_rows.extend(personality_rows(record))
+    if new_rows:
+        tail.pending_rows += buffer.add(new_rows)
+    # Bufor przed pozycjami - po przerwaniu wiersze mogą się co najwyżej powtórzyć, nie zginąć
+    buffer.save(args.buffer)
+
+    result = None
+    if tail.pending_rows >= args.min_new_rows and buffer.size >= args.min_buffer_rows:
+        # Zawsze od bieżącego pliku modelu (mógł zostać zastąpiony pełnym treningiem)
+        model = load_personality_model(args.model, torch.device("cpu"))
+        result = finetune_round(model, buffer.data(), args, rng)
+        result["new_rows"] = tail.pending_rows
+        if result["accepted"]:
+            save_model(model, args.output)
+            if args.export_numpy:
+                from numpy_engine import export_weights
+                export_weights(personality_path=args.output)
+        append_history(args.history, result)
+        tail.pending_rows = 0
+    tail.save()
+    return result
+
+
+def print_round(result):
+    live, agreement, uniform = result["live_loss"], result["live_agreement"], result["uniform_loss"]
+    status = "accepted" if result["accepted"] else "rejected"
+    print(f"Round on {result['rows']} rows ({result['new_rows']} new): "
+          f"live loss {live[0]:.4f} -> {live[1]:.4f}, agreement {agreement[0]:.4f} -> {agreement[1]:.4f}, "
+          f"uniform loss {uniform[0]:.4f} -> {uniform[1]:.4f} [{status}]")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fine-tune PersonalityNet incrementally on logged game traffic")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--once", action="store_true", help="Run a single round and exit (default)")
+    mode.add_argument("--watch", action="store_true", help="Keep polling the log and fine-tuning")
+    parser.add_argument("--interval", type=float, default=300.0, help="Seconds between rounds with --watch")
+    parser.add_argument("--log", default=os.environ.get("REQUEST_LOG_PATH", DEFAULT_LOG_PATH),
+                        help="Current request log (worker logs and archives are found automatically)")
+    parser.add_argument("--state", default=DEFAULT_STATE_PATH, help="Read offsets file")
+    parser.add_argument("--buffer", default=DEFAULT_BUFFER_PATH, help="Saved replay buffer")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_PATH)
+    parser.add_argument("--model", default="personality_model.pth", help="Weights to start each round from")
+    parser.add_argument("--output", default=None, help="Where accepted weights go (default: --model)")
+    parser.add_argument("--export-numpy", action="store_true",
+                        help="Re-export chain_weights.npz after an accepted round (INFERENCE_BACKEND=numpy)")
+    parser.add_argument("--buffer-size", type=int, default=200000, help="Most recent rows kept for training")
+    parser.add_argument("--min-new-rows", type=int, default=2000, help="New rows needed to start a round")
+    parser.add_argument("--min-buffer-rows", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=300, help="Optimizer steps per round")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--lr", type=float, default=1e-4)
+    parser.add_argument("--synthetic-mix", type=float, default=0.25,
+                        help="Fraction of each batch drawn uniformly over the input space")
+    parser.add_argument("--eval-rows", type=int, default=4096, help="Held-out rows used to accept a round")
+    parser.add_argument("--max-regression", type=float, default=0.005,
+                        help="Allowed uniform-sample loss increase for an accepted round")
+    parser.add_argument("--threads", type=int, default=1, help="Torch threads (leave cores to the server)")
+    parser.add_argument("--nice", type=int, default=10, help="Process niceness increment (POSIX)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    args.output = args.output or args.model
+    if not 0 <= args.synthetic_mix < 1:
+        parser.error("--synthetic-mix must be in [0, 1)")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    torch.set_num_threads(args.threads)
+    if args.nice and hasattr(os, "nice"):
+        os.nice(args.nice)
+    # SIGTERM jak Ctrl+C - stan zapisywany jest tylko na końcu rundy
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    rng = np.random.default_rng(args.seed)
+    tail = LogTail(args.log, args.state)
+    buffer = ReplayBuffer.load(args.buffer, args.buffer_size)
+    print(f"Tailing {args.log} ({buffer.size} buffered rows, {tail.pending_rows} pending)")
+
+    try:
+        while True:
+            result = run_round(tail, buffer, args, rng)
+            if result is not None:
+                print_round(result)
+            elif not args.watch:
+                print(f"Not enough new rows ({tail.pending_rows}/{args.min_new_rows}), no round run")
+            if not args.watch:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Rejestr Wersji Modeli
+---------------------
+Wersjonowane pary checkpointów RetailNet + PersonalityNet z metadanymi
+oraz wskaźnik aktywnej wersji, którą obsługuje serwer API.
+
+Układ katalogu (MODEL_REGISTRY, domyślnie model_registry/):
+    registry.json                   {"active": "v0003", "history": ["v0001", "v0003"]}
+    v0003/
+        retail_ai_full.pth          wagi fp32 (backend "torch")
+        personality_model.pth
+        chain_weights.npz           backend "numpy" (numpy_engine.export_weights)
+        retail_ai_ts.pt, ...        backendy "torchscript" / "int8" (tylko warianty zgodne z fp32)
+        metadata.json               kolumny cech, architektura, metryki treningu, skróty SHA-256
+
+Wersja jest kompletna (wszystkie artefakty) zanim pojawi się w rejestrze,
+a registry.json zapisywany jest atomowo. api.py ładuje aktywną wersję przy
+starcie i śledzi registry.json - po activate / rollback (z CLI lub /admin/*)
+każdy proces serwera ładuje, rozgrzewa i atomowo podmienia modele bez restartu.
+
+Użycie:
+    python model_registry.py register --note "retrained with --early-stopping" --activate
+    python model_registry.py list
+    python model_registry.py activate v0002
+    python model_registry.py rollback
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+
+from features import FEATURE_COLUMNS, PERSONALITY_COLUMNS
+
+DEFAULT_REGISTRY_DIR = "model_registry"
+STATE_NAME = "registry.json"
+METADATA_NAME = "metadata.json"
+RETAIL_NAME = "retail_ai_full.pth"
+PERSONALITY_NAME = "personality_model.pth"
+VERSION_PATTERN = re.compile(r"^v(\d{4,})$")
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def history_summary(path):
+    """
+    Ostatnie wartości metryk z pliku historii treningu (retail_history.json,
+    personality_history.json) lub None, gdy pliku brak.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        history = json.load(f)
+    summary = {key: values[-1] for key, values in history.items() if isinstance(values, list) and values}
+    summary["epochs"] = len(history.get("loss", []))
+    return summary
+
+
+def _architecture(model):
+    return {"hidden": [model.fc1.out_features, model.fc2.out_features],
+            "params": sum(p.numel() for p in model.parameters())}
+
+
+class ModelRegistry:
+    """
+    Rejestr wersji modeli w katalogu root.
+
+    Argumenty:
+        root (str): Katalog rejestru (tworzony przy pierwszej rejestracji).
+    """
+    def __init__(self, root=DEFAULT_REGISTRY_DIR):
+        self.root = root
+
+    # ------------------------------
+    # Stan (aktywna wersja, historia aktywacji)
+    # ------------------------------
+    def _read_state(self):
+        path = os.path.join(self.root, STATE_NAME)
+        if not os.path.exists(path):
+            return {"active": None, "history": []}
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_state(self, state):
+        path = os.path.join(self.root, STATE_NAME)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def active_version(self):
+        """Aktywna wersja lub None (brak rejestru / żadna wersja nie była aktywowana)."""
+        return self._read_state()["active"]
+
+    def versions(self):
+        """Zarejestrowane wersje, od najstarszej."""
+        if not os.path.isdir(self.root):
+            return []
+        found = [name for name in os.listdir(self.root) if VERSION_PATTERN.match(name)]
+        return sorted(found, key=lambda name: int(VERSION_PATTERN.match(name).group(1)))
+
+    def path(self, version):
+        """Katalog wersji; ValueError dla nieznanej wersji."""
+        directory = os.path.join(self.root, version)
+        if not VERSION_PATTERN.match(version) or not os.path.isfile(os.path.join(directory, METADATA_NAME)):
+            raise ValueError(f"Unknown model version {version!r}")
+        return directory
+
+    def metadata(self, version):
+        with open(os.path.join(self.path(version), METADATA_NAME)) as f:
+            return json.load(f)
+
+    def activate(self, version):
+        """Ustawia aktywną wersję (serwery przełączają się same, śledząc registry.json)."""
+        self.path(version)
+        state = self._read_state()
+        if state["active"] != version:
+            state["active"] = version
+            state["history"].append(version)
+            self._write_state(state)
+        return version
+
+    def previous_version(self):
+        """Wersja, którą przywróciłby rollback(), lub None."""
+        history = self._read_state()["history"]
+        return history[-2] if len(history) >= 2 else None
+
+    def rollback(self):
+        """Przywraca wersję aktywną przed bieżącą. Zwraca tę wersję."""
+        state = self._read_state()
+        if len(state["history"]) < 2:
+            raise ValueError("No previous model version to roll back to")
+        state["history"].pop()
+        state["active"] = state["history"][-1]
+        self._write_state(state)
+        return state["active"]
+
+    # ------------------------------
+    # Rejestracja
+    # ------------------------------
+    def register(self, retail_path=RETAIL_NAME, personality_path=PERSONALITY_NAME, note=None, metrics=None):
+        """
+        Dodaje nową wersję: kopiuje checkpointy, sprawdza je (ładowanie modeli),
+        tworzy artefakty wszystkich backendów i zapisuje metadane.
+
+        Argumenty:
+            metrics (dict): Metryki treningu, np. {"retail": {...}, "personality": {...}}.
+
+        Zwraca:
+            dict: Metadane nowej wersji.
+        """
+        import torch
+        from export_models import EXPORT_VARIANTS, ParityError, export_variant
+        from network import load_personality_model, load_retail_model
+        from numpy_engine import DEFAULT_WEIGHTS_PATH, export_weights
+
+        os.makedirs(self.root, exist_ok=True)
+        existing = self.versions()
+        number = int(VERSION_PATTERN.match(existing[-1]).group(1)) + 1 if existing else 1
+        version = f"v{number:04d}"
+        tmp_dir = os.path.join(self.root, f".{version}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        try:
+            shutil.copy2(retail_path, os.path.join(tmp_dir, RETAIL_NAME))
+            shutil.copy2(personality_path, os.path.join(tmp_dir, PERSONALITY_NAME))
+
+            # Błędne lub niezgodne checkpointy odrzucane są tutaj, a nie przy przeładowaniu serwera
+            cpu = torch.device("cpu")
+            retail_model = load_retail_model(os.path.join(tmp_dir, RETAIL_NAME), cpu, strict=True)
+            personality_model = load_personality_model(os.path.join(tmp_dir, PERSONALITY_NAME), cpu)
+            export_weights(os.path.join(tmp_dir, RETAIL_NAME), os.path.join(tmp_dir, PERSONALITY_NAME),
+                           os.path.join(tmp_dir, DEFAULT_WEIGHTS_PATH))
+            # Wariant niezgodny z fp32 (zwykle INT8) nie trafia do wersji - backend zgłosi brak plików
+            parity = {}
+            for variant in EXPORT_VARIANTS:
+                try:
+                    parity[variant] = export_variant(variant, retail_model, personality_model, tmp_dir)
+                except ParityError as e:
+                    print(f"Warning: Skipping {variant} artifacts: {e}")
+
+            metadata = {
+                "version": version,
+                "created": time.time(),
+                "note": note,
+                "sources": {"retail": os.path.abspath(retail_path), "personality": os.path.abspath(personality_path)},
+                "feature_columns": FEATURE_COLUMNS,
+                "personality_columns": PERSONALITY_COLUMNS,
+                "architecture": {"retail": _architecture(retail_model),
+                                 "personality": _architecture(personality_model)},
+                "metrics": metrics or {},
+                "variants": sorted(parity),
+                "parity": parity,
+                "files": {name: _sha256(os.path.join(tmp_dir, name)) for name in sorted(os.listdir(tmp_dir))},
+            }
+            with open(os.path.join(tmp_dir, METADATA_NAME), "w") as f:
+                json.dump(metadata, f, indent=2)
+            os.replace(tmp_dir, os.path.join(self.root, version))
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        return metadata
+
+
+def print_versions(registry):
+    active = registry.active_version()
+    print(f"{'':2}{'version':<8} {'created':<19} {'retail':>8} {'personality':>11} {'retail acc':>10} "
+          f"{'pers. acc':>9}  note")
+    for version in registry.versions():
+        meta = registry.metadata(version)
+        arch = meta["architecture"]
+        metrics = meta["metrics"]
+        accuracy = [(metrics.get(name) or {}).get("val_accuracy", (metrics.get(name) or {}).get("accuracy"))
+                    for name in ("retail", "personality")]
+        accuracy = [f"{value:.4f}" if value is not None else "-" for value in accuracy]
+        created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(meta["created"]))
+        marker = "* " if version == active else "  "
+        print(f"{marker}{version:<8} {created:<19} {','.join(map(str, arch['retail']['hidden'])):>8} "
+              f"{','.join(map(str, arch['personality']['hidden'])):>11} {accuracy[0]:>10} {accuracy[1]:>9}  "
+              f"{meta['note'] or ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Versioned model registry for hot reloads")
+    parser.add_argument("--registry", default=os.environ.get("MODEL_REGISTRY", DEFAULT_REGISTRY_DIR))
+    commands = parser.add_subparsers(dest="command", required=True)
+    register = commands.add_parser("register", help="Add the current checkpoints as a new version")
+    register.add_argument("--retail", default=RETAIL_NAME)
+    register.add_argument("--personality", default=PERSONALITY_NAME)
+    register.add_argument("--retail-history", default="retail_history.json")
+    register.add_argument("--personality-history", default="personality_history.json")
+    register.add_argument("--note", default=None)
+    register.add_argument("--activate", action="store_true", help="Make the new version active")
+    commands.add_parser("list", help="Show registered versions (* = active)")
+    activate = commands.add_parser("activate", help="Switch running servers to a version")
+    activate.add_argument("version")
+    commands.add_parser("rollback", help="Switch back to the previously active version")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+    try:
+        if args.command == "register":
+            metrics = {"retail": history_summary(args.retail_history),
+                       "personality": history_summary(args.personality_history)}
+            metadata = registry.register(args.retail, args.personality, args.note, metrics)
+            print(f"Registered {metadata['version']} in {args.registry}")
+            if args.activate:
+                registry.activate(metadata["version"])
+                print(f"Activated {metadata['version']}")
+        elif args.command == "list":
+            print_versions(registry)
+        elif args.command == "activate":
+            print(f"Activated {registry.activate(args.version)}")
+        elif args.command == "rollback":
+            print(f"Rolled back to {registry.rollback()}")
+    except ValueError as e:
+        parser.exit(1, f"Error: {e}\n")
+
+
+if __name__ == "__main__":
+    main()
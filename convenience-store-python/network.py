@@ -5,33 +5,22 @@ Ten plik zawiera definicje architektur dwóch sieci neuronowych używanych w pro
 1. RetailNet - sieć przewidująca ogólne prawdopodobieństwo zakupu.
 2. PersonalityNet - sieć korygująca decyzję na podstawie cech osobowości.
 
-Oraz definicje kolumn wejściowych i logikę ładowania wytrenowanego modelu RetailNet.
+Oraz funkcje ładowania wytrenowanych modeli i klasę TorchChain, która
+uruchamia obie sieci szeregowo na paczkach danych NumPy.
+Atrybuty `model` i `device` są leniwe - model RetailNet jest ładowany
+przy pierwszym odwołaniu, a nie przy imporcie modułu.
 """
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
-# -------------------------------
-# Feature columns (te same co przy treningu)
-# -------------------------------
-# Lista cech używanych przez model RetailNet
-FEATURE_COLUMNS = [
-    "precpt",
-    "avg_temperature",
-    "stock_hour6_22_cnt",
-    "hours_stock_status",
-    "first_category_id",
-    "second_category_id",
-    "third_category_id",
-]
-
-# Lista cech używanych przez model PersonalityNet
-PERSONALITY_COLUMNS = [
-    "base_buy_prob",
-    "impulsiveness",
-    "generosity",
-    "is_impulse"
-]
+# Kolumny wejściowe (re-eksport, definicje w features.py)
+from features import FEATURE_COLUMNS, PERSONALITY_COLUMNS
+
+# Domyślne szerokości warstw ukrytych (zapisane modele i skrypty treningowe)
+DEFAULT_RETAIL_HIDDEN = (64, 64)
+DEFAULT_PERSONALITY_HIDDEN = (32, 16)
 
 # -------------------------------
 # Klasy Modeli (Model Classes)
@@ -42,15 +31,16 @@ class RetailNet(nn.Module):
     Służy do oceny 'bazowej' szansy na zakup na podstawie czynników zewnętrznych.
     Architektura:
       - Wejście: len(FEATURE_COLUMNS)
-      - Warstwa ukryta 1: 64 neurony (ReLU)
-      - Warstwa ukryta 2: 64 neurony (ReLU)
+      - Warstwa ukryta 1: hidden_sizes[0] neuronów (ReLU, domyślnie 64)
+      - Warstwa ukryta 2: hidden_sizes[1] neuronów (ReLU, domyślnie 64)
       - Wyjście: 1 neuron (Logits)
     """
-    def __init__(self, input_size):
+    def __init__(self, input_size, hidden_sizes=DEFAULT_RETAIL_HIDDEN):
         super().__init__()
-        self.fc1 = nn.Linear(input_size, 64)
-        self.fc2 = nn.Linear(64, 64)
-        self.fc3 = nn.Linear(64, 1)
+        hidden1, hidden2 = hidden_sizes
+        self.fc1 = nn.Linear(input_size, hidden1)
+        self.fc2 = nn.Linear(hidden1, hidden2)
+        self.fc3 = nn.Linear(hidden2, 1)
 
     def forward(self, x):
         """Przepływ danych przez sieć (Forward Pass)."""
@@ -65,15 +55,16 @@ class PersonalityNet(nn.Module):
     Bierze pod uwagę bazowe prawdopodobieństwo oraz cechy osobowości agenta.
     Architektura:
       - Wejście: len(PERSONALITY_COLUMNS)
-      - Warstwa ukryta 1: 32 neurony (ReLU)
-      - Warstwa ukryta 2: 16 neuronów (ReLU)
+      - Warstwa ukryta 1: hidden_sizes[0] neuronów (ReLU, domyślnie 32)
+      - Warstwa ukryta 2: hidden_sizes[1] neuronów (ReLU, domyślnie 16)
       - Wyjście: 1 neuron (Logits - ostateczna decyzja)
     """
-    def __init__(self, input_size):
+    def __init__(self, input_size, hidden_sizes=DEFAULT_PERSONALITY_HIDDEN):
         super().__init__()
-        self.fc1 = nn.Linear(input_size, 32)
-        self.fc2 = nn.Linear(32, 16)
-        self.fc3 = nn.Linear(16, 1)
+        hidden1, hidden2 = hidden_sizes
+        self.fc1 = nn.Linear(input_size, hidden1)
+        self.fc2 = nn.Linear(hidden1, hidden2)
+        self.fc3 = nn.Linear(hidden2, 1)
 
     def forward(self, x):
         """Przepływ danych przez sieć (Forward Pass)."""
@@ -81,19 +72,105 @@ class PersonalityNet(nn.Module):
         x = F.relu(self.fc2(x))
         return self.fc3(x)
 
+
+class TorchChain:
+    """
+    Łańcuch RetailNet -> PersonalityNet uruchamiany w PyTorch.
+    Przyjmuje i zwraca tablice NumPy, dzięki czemu ma ten sam interfejs
+    co backend numpy_engine.NumpyChain.
+    """
+    def __init__(self, retail_model, personality_model, device):
+        self.retail_model = retail_model
+        self.personality_model = personality_model
+        self.device = device
+
+    def base_prob(self, x):
+        """RetailNet: macierz (n, len(FEATURE_COLUMNS)) -> wektor base_buy_prob (n,)."""
+        x = torch.as_tensor(np.asarray(x, dtype=np.float32)).to(self.device)
+        with torch.no_grad():
+            return torch.sigmoid(self.retail_model(x)).squeeze(1).cpu().numpy()
+
+    def final_prob(self, p):
+        """PersonalityNet: macierz (n, len(PERSONALITY_COLUMNS)) -> wektor final_buy_prob (n,)."""
+        p = torch.as_tensor(np.asarray(p, dtype=np.float32)).to(self.device)
+        with torch.no_grad():
+            return torch.sigmoid(self.personality_model(p)).squeeze(1).cpu().numpy()
+
+    def predict(self, x, traits):
+        """
+        Pełny łańcuch dla paczki.
+        traits: macierz (n, 3) [impulsywność, szczodrość, czy_impulsowy].
+        Zwraca: (base_buy_prob, final_buy_prob) jako wektory (n,).
+        """
+        base = self.base_prob(x)
+        final = self.final_prob(np.column_stack([base, np.asarray(traits, dtype=np.float32)]))
+        return base, final
+
+def hidden_sizes_of(state_dict):
+    """Szerokości warstw ukrytych odczytane z kształtów wag (modele o niestandardowej architekturze)."""
+    return state_dict["fc1.weight"].shape[0], state_dict["fc2.weight"].shape[0]
+
+
+def parse_hidden_sizes(text):
+    """Parsuje argument CLI "64,64" do krotki szerokości warstw ukrytych."""
+    sizes = tuple(int(size) for size in text.split(","))
+    if len(sizes) != 2 or min(sizes) < 1:
+        raise ValueError(f"Expected two positive layer widths, e.g. 64,64 (got {text!r})")
+    return sizes
+
 # -------------------------------
 # Urządzenie Obliczeniowe (Device)
 # -------------------------------
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+_device = None
+
+
+def get_device():
+    """Zwraca urządzenie obliczeniowe (sprawdzenie CUDA odbywa się dopiero przy pierwszym użyciu)."""
+    global _device
+    if _device is None:
+        _device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    return _device
 
 # -------------------------------
-# Ładowanie wytrenowanego modelu
+# Ładowanie wytrenowanych modeli
 # -------------------------------
-# Inicjalizacja i próba załadowania wytrenowanego modelu RetailNet przy starcie modułu
-model = RetailNet(len(FEATURE_COLUMNS)).to(device)
-try:
-    checkpoint = torch.load("retail_ai_full.pth", map_location=device, weights_only=True)
-    model.load_state_dict(checkpoint["model_state"])
-    model.eval()
-except Exception as e:
-    print(f"Warning: Could not load retail_ai_full.pth: {e}")
+def load_retail_model(path="retail_ai_full.pth", device=None, strict=False):
+    """
+    Tworzy RetailNet i ładuje wagi z pełnego checkpointu (klucz "model_state").
+    Przy strict=False błąd ładowania kończy się ostrzeżeniem (model z losowymi wagami).
+    """
+    device = device or get_device()
+    try:
+        state = torch.load(path, map_location=device, weights_only=True)["model_state"]
+        retail_model = RetailNet(len(FEATURE_COLUMNS), hidden_sizes_of(state)).to(device)
+        retail_model.load_state_dict(state)
+    except Exception as e:
+        if strict:
+            raise
+        print(f"Warning: Could not load {path}: {e}")
+        retail_model = RetailNet(len(FEATURE_COLUMNS)).to(device)
+    retail_model.eval()
+    return retail_model
+
+
+def load_personality_model(path="personality_model.pth", device=None):
+    """Tworzy PersonalityNet i ładuje wagi (state_dict); błędy nie są ukrywane."""
+    device = device or get_device()
+    state = torch.load(path, map_location=device, weights_only=True)
+    personality_model = PersonalityNet(len(PERSONALITY_COLUMNS), hidden_sizes_of(state)).to(device)
+    personality_model.load_state_dict(state)
+    personality_model.eval()
+    return personality_model
+
+
+def __getattr__(name):
+    """
+    Leniwe atrybuty modułu: `device` i `model` (RetailNet z retail_ai_full.pth)
+    są tworzone dopiero przy pierwszym użyciu, a nie przy imporcie modułu.
+    """
+    if name == "device":
+        return get_device()
+    if name == "model":
+        globals()["model"] = load_retail_model()
+        return globals()["model"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
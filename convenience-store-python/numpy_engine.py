@@ -0,0 +1,212 @@
+"""
+Silnik Inferencji NumPy
+-----------------------
+Lekki backend inferencji łańcucha RetailNet -> PersonalityNet bez PyTorch.
+
+Wagi obu sieci są eksportowane z plików retail_ai_full.pth oraz
+personality_model.pth do jednego pliku chain_weights.npz (float32).
+Plik jest pochodny i nie trafia do repozytorium: ensure_weights eksportuje
+go na żądanie, gdy go brak lub gdy checkpointy zmieniły się od eksportu.
+Cały łańcuch liczony jest jako kilka mnożeń macierzy NumPy, zarówno
+dla pojedynczego elementu, jak i dla całej paczki.
+
+Użycie:
+    python numpy_engine.py export   # eksport wag do chain_weights.npz
+    python numpy_engine.py parity   # porównanie z modelami PyTorch (eksport, jeśli wagi są nieaktualne)
+"""
+import argparse
+import os
+
+import numpy as np
+
+from features import FEATURE_COLUMNS, PERSONALITY_COLUMNS
+
+DEFAULT_WEIGHTS_PATH = "chain_weights.npz"
+
+# Nazwy warstw w state_dict obu sieci (fc1 -> fc2 -> fc3)
+LAYERS = ["fc1", "fc2", "fc3"]
+
+
+def sigmoid(x):
+    """Numerycznie stabilna funkcja sigmoidalna."""
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+def export_weights(retail_path="retail_ai_full.pth",
+                   personality_path="personality_model.pth",
+                   out_path=DEFAULT_WEIGHTS_PATH):
+    """
+    Eksportuje wagi obu sieci z checkpointów PyTorch do pliku .npz.
+    Macierze wag zapisywane są w transpozycji (in, out), gotowe do x @ W.
+    """
+    import torch
+
+    retail_state = torch.load(retail_path, map_location="cpu", weights_only=True)["model_state"]
+    personality_state = torch.load(personality_path, map_location="cpu", weights_only=True)
+
+    arrays = {}
+    for prefix, state in (("retail", retail_state), ("personality", personality_state)):
+        for layer in LAYERS:
+            arrays[f"{prefix}_{layer}_w"] = state[f"{layer}.weight"].numpy().T.astype(np.float32)
+            arrays[f"{prefix}_{layer}_b"] = state[f"{layer}.bias"].numpy().astype(np.float32)
+
+    arrays["feature_columns"] = np.array(FEATURE_COLUMNS)
+    arrays["personality_columns"] = np.array(PERSONALITY_COLUMNS)
+    arrays["source_fingerprint"] = source_fingerprint(retail_path, personality_path)
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, out_path)
+    print(f"Exported chain weights to {out_path}")
+
+
+def source_fingerprint(retail_path, personality_path):
+    """Rozmiar i czas modyfikacji (ns) obu checkpointów - macierz int64 (2, 2)."""
+    stats = [os.stat(path) for path in (retail_path, personality_path)]
+    return np.array([[st.st_size, st.st_mtime_ns] for st in stats], dtype=np.int64)
+
+
+def ensure_weights(retail_path="retail_ai_full.pth",
+                   personality_path="personality_model.pth",
+                   out_path=DEFAULT_WEIGHTS_PATH):
+    """
+    Zwraca out_path, eksportując wagi, gdy pliku brak lub jego source_fingerprint
+    nie zgadza się z checkpointami. Bez checkpointów (wdrożenie bez PyTorch)
+    istniejący plik używany jest bez sprawdzania.
+    """
+    if not (os.path.exists(retail_path) and os.path.exists(personality_path)):
+        return out_path
+    if os.path.exists(out_path):
+        with np.load(out_path) as data:
+            if ("source_fingerprint" in data.files
+                    and np.array_equal(data["source_fingerprint"], source_fingerprint(retail_path, personality_path))):
+                return out_path
+        print(f"{out_path} is older than {retail_path} / {personality_path}, re-exporting...")
+    export_weights(retail_path, personality_path, out_path)
+    return out_path
+
+
+class NumpyChain:
+    """
+    Łańcuch RetailNet -> PersonalityNet liczony w NumPy.
+    Interfejs zgodny z network.TorchChain (base_prob, final_prob, predict).
+    """
+    def __init__(self, retail_layers, personality_layers):
+        # Listy par (W, b) dla kolejnych warstw
+        self.retail_layers = retail_layers
+        self.personality_layers = personality_layers
+
+    @classmethod
+    def load(cls, path=DEFAULT_WEIGHTS_PATH):
+        """Wczytuje wagi z pliku .npz utworzonego przez export_weights."""
+        with np.load(path) as data:
+            if list(data["feature_columns"]) != FEATURE_COLUMNS:
+                raise ValueError(f"{path}: feature columns do not match FEATURE_COLUMNS")
+            retail = [(data[f"retail_{l}_w"], data[f"retail_{l}_b"]) for l in LAYERS]
+            personality = [(data[f"personality_{l}_w"], data[f"personality_{l}_b"]) for l in LAYERS]
+        return cls(retail, personality)
+
+    @staticmethod
+    def _mlp(layers, x):
+        """Przepływ przez sieć: ReLU na warstwach ukrytych, logity na wyjściu."""
+        for w, b in layers[:-1]:
+            x = np.maximum(x @ w + b, 0.0)
+        w, b = layers[-1]
+        return (x @ w + b)[:, 0]
+
+    def base_prob(self, x):
+        """RetailNet: macierz (n, len(FEATURE_COLUMNS)) -> wektor base_buy_prob (n,)."""
+        x = np.atleast_2d(np.asarray(x, dtype=np.float32))
+        return sigmoid(self._mlp(self.retail_layers, x))
+
+    def final_prob(self, p):
+        """PersonalityNet: macierz (n, len(PERSONALITY_COLUMNS)) -> wektor final_buy_prob (n,)."""
+        p = np.atleast_2d(np.asarray(p, dtype=np.float32))
+        return sigmoid(self._mlp(self.personality_layers, p))
+
+    def predict(self, x, traits):
+        """
+        Pełny łańcuch dla paczki (lub pojedynczego wiersza).
+        traits: macierz (n, 3) [impulsywność, szczodrość, czy_impulsowy].
+        Zwraca: (base_buy_prob, final_buy_prob) jako wektory (n,).
+        """
+        base = self.base_prob(x)
+        traits = np.atleast_2d(np.asarray(traits, dtype=np.float32))
+        final = self.final_prob(np.column_stack([base, traits]))
+        return base, final
+
+
+def sample_chain_inputs(num_samples=10000, seed=0):
+    """
+    Losowe wejścia łańcucha w zakresach spotykanych w grze i w danych treningowych.
+
+    Zwraca:
+        (np.ndarray, np.ndarray): x (n, len(FEATURE_COLUMNS)) oraz traits (n, 3).
+    """
+    rng = np.random.default_rng(seed)
+    x = np.column_stack([
+        rng.integers(0, 2, num_samples),            # precpt
+        rng.uniform(-10, 40, num_samples),          # avg_temperature
+        rng.integers(0, 17, num_samples),           # stock_hour6_22_cnt
+        rng.integers(0, 2, num_samples),            # hours_stock_status
+        rng.integers(0, 50, (num_samples, 3)),      # kategorie
+    ]).astype(np.float32)
+    traits = np.column_stack([
+        rng.random(num_samples),
+        rng.random(num_samples),
+        rng.integers(0, 2, num_samples),
+    ]).astype(np.float32)
+    return x, traits
+
+
+def parity_check(chain, torch_chain, num_samples=10000, seed=0):
+    """
+    Porównuje wyniki NumpyChain z łańcuchem PyTorch na losowych wejściach.
+
+    Zwraca:
+        dict: Maksymalne różnice bezwzględne base/final oraz liczba zmian decyzji.
+    """
+    x, traits = sample_chain_inputs(num_samples, seed)
+    base_np, final_np = chain.predict(x, traits)
+    base_t, final_t = torch_chain.predict(x, traits)
+    return {
+        "samples": num_samples,
+        "max_abs_diff_base": float(np.max(np.abs(base_np - base_t))),
+        "max_abs_diff_final": float(np.max(np.abs(final_np - final_t))),
+        "decision_flips": int(np.sum((final_np > 0.5) != (final_t > 0.5))),
+    }
+
+
+def load_torch_chain(retail_path="retail_ai_full.pth", personality_path="personality_model.pth"):
+    """Ładuje referencyjny łańcuch PyTorch (tylko do weryfikacji)."""
+    import torch
+    from network import TorchChain, load_personality_model, load_retail_model
+
+    device = torch.device("cpu")
+    retail_model = load_retail_model(retail_path, device, strict=True)
+    personality_model = load_personality_model(personality_path, device)
+    return TorchChain(retail_model, personality_model, device)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NumPy inference engine for RetailNet -> PersonalityNet")
+    parser.add_argument("command", choices=["export", "parity"])
+    parser.add_argument("--weights", default=DEFAULT_WEIGHTS_PATH)
+    parser.add_argument("--samples", type=int, default=10000)
+    parser.add_argument("--tolerance", type=float, default=1e-5)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_weights(out_path=args.weights)
+        return
+
+    report = parity_check(NumpyChain.load(ensure_weights(out_path=args.weights)), load_torch_chain(),
+                          num_samples=args.samples)
+    print(f"Parity report: {report}")
+    ok = max(report["max_abs_diff_base"], report["max_abs_diff_final"]) <= args.tolerance
+    print("Parity OK" if ok else "Parity FAILED")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
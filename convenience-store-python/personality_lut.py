@@ -0,0 +1,147 @@
+"""
+Tablica Przeglądowa PersonalityNet (LUT)
+----------------------------------------
+PersonalityNet ma tylko cztery wejścia o małych zakresach:
+base_buy_prob, impulsiveness i generosity w [0, 1] oraz binarne is_impulse.
+Sieć można więc raz obliczyć na regularnej siatce (np. 256x64x64x2),
+a zapytania obsługiwać interpolacją wieloliniową zamiast mnożeń macierzy.
+
+Moduł zawiera również raport błędu (maksymalny i średni błąd bezwzględny)
+względem prawdziwej sieci.
+
+Użycie:
+    python personality_lut.py build --grid 256,64,64,2 --dtype float16
+    python personality_lut.py report --lut personality_lut.npz
+"""
+import argparse
+import itertools
+
+import numpy as np
+
+from features import PERSONALITY_COLUMNS
+
+DEFAULT_GRID = (256, 64, 64, 2)
+DEFAULT_LUT_PATH = "personality_lut.npz"
+
+
+def parse_grid(text):
+    """Zamienia napis '256,64,64,2' na krotkę rozmiarów siatki."""
+    grid = tuple(int(v) for v in text.split(","))
+    if len(grid) != len(PERSONALITY_COLUMNS) or min(grid) < 2:
+        raise ValueError(f"Grid must have {len(PERSONALITY_COLUMNS)} sizes >= 2, got {text!r}")
+    return grid
+
+
+class PersonalityLUT:
+    """
+    Siatka wartości final_buy_prob na [0, 1]^4 z interpolacją wieloliniową.
+
+    Argumenty:
+        table (np.ndarray): Tablica o kształcie siatki (float16 lub float32).
+    """
+    def __init__(self, table):
+        self.table = table
+        self.grid = table.shape
+
+    @classmethod
+    def build(cls, final_prob_fn, grid=DEFAULT_GRID, dtype=np.float16, chunk_size=262144):
+        """
+        Oblicza sieć we wszystkich punktach siatki.
+
+        Argumenty:
+            final_prob_fn (callable): Etap PersonalityNet, macierz (n, 4) -> wektor (n,).
+            grid (tuple): Liczba punktów siatki dla każdego wejścia.
+            dtype: Typ przechowywanych wartości (float16 lub float32).
+        """
+        axes = [np.linspace(0.0, 1.0, n, dtype=np.float32) for n in grid]
+        points = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, len(grid))
+
+        values = np.empty(len(points), dtype=np.float32)
+        for start in range(0, len(points), chunk_size):
+            values[start:start + chunk_size] = final_prob_fn(points[start:start + chunk_size])
+        return cls(values.reshape(grid).astype(dtype))
+
+    def save(self, path=DEFAULT_LUT_PATH):
+        np.savez(path, table=self.table, columns=np.array(PERSONALITY_COLUMNS))
+        print(f"Saved PersonalityNet LUT {self.grid} ({self.table.dtype}, {self.table.nbytes / 1e6:.1f} MB) to {path}")
+
+    @classmethod
+    def load(cls, path=DEFAULT_LUT_PATH):
+        with np.load(path) as data:
+            if list(data["columns"]) != PERSONALITY_COLUMNS:
+                raise ValueError(f"{path}: columns do not match PERSONALITY_COLUMNS")
+            return cls(data["table"])
+
+    def query(self, p):
+        """
+        Interpolacja wieloliniowa: macierz (n, 4) -> wektor final_buy_prob (n,).
+        Wejścia spoza [0, 1] są przycinane do krawędzi siatki.
+        """
+        p = np.clip(np.atleast_2d(np.asarray(p, dtype=np.float32)), 0.0, 1.0)
+
+        lower, weights = [], []
+        for dim, n in enumerate(self.grid):
+            pos = p[:, dim] * (n - 1)
+            i0 = np.minimum(pos.astype(np.int64), n - 2)
+            lower.append(i0)
+            weights.append(pos - i0)
+
+        # Suma ważona 2^4 narożników komórki siatki
+        result = np.zeros(len(p), dtype=np.float32)
+        for corner in itertools.product((0, 1), repeat=len(self.grid)):
+            w = np.ones(len(p), dtype=np.float32)
+            index = []
+            for dim, bit in enumerate(corner):
+                w *= weights[dim] if bit else 1.0 - weights[dim]
+                index.append(lower[dim] + bit)
+            result += w * self.table[tuple(index)]
+        return result
+
+    def error_report(self, final_prob_fn, num_samples=100000, seed=0):
+        """
+        Porównuje LUT z prawdziwą siecią na losowych wejściach
+        (is_impulse losowane jako 0/1, jak w grze).
+
+        Zwraca:
+            dict: max_abs_error, mean_abs_error oraz liczba zmian decyzji BUY/SKIP.
+        """
+        rng = np.random.default_rng(seed)
+        p = rng.random((num_samples, len(self.grid))).astype(np.float32)
+        p[:, 3] = rng.integers(0, 2, num_samples)
+
+        exact = final_prob_fn(p)
+        approx = self.query(p)
+        error = np.abs(approx - exact)
+        return {
+            "grid": list(self.grid),
+            "dtype": str(self.table.dtype),
+            "samples": num_samples,
+            "max_abs_error": float(error.max()),
+            "mean_abs_error": float(error.mean()),
+            "decision_flips": int(np.sum((approx > 0.5) != (exact > 0.5))),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PersonalityNet lookup table")
+    parser.add_argument("command", choices=["build", "report"])
+    parser.add_argument("--grid", default=",".join(map(str, DEFAULT_GRID)))
+    parser.add_argument("--dtype", choices=["float16", "float32"], default="float16")
+    parser.add_argument("--lut", default=DEFAULT_LUT_PATH)
+    parser.add_argument("--samples", type=int, default=100000)
+    args = parser.parse_args()
+
+    from numpy_engine import load_torch_chain
+    chain = load_torch_chain()
+
+    if args.command == "build":
+        lut = PersonalityLUT.build(chain.final_prob, parse_grid(args.grid), np.dtype(args.dtype))
+        lut.save(args.lut)
+    else:
+        lut = PersonalityLUT.load(args.lut)
+
+    print(f"LUT error report: {lut.error_report(chain.final_prob, args.samples)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Asynchroniczny Dziennik Żądań
+-----------------------------
+Zastępuje synchroniczne dopisywanie do game_logs.log w obsłudze żądań.
+
+- RequestLogger: rekordy trafiają do kolejki, a wątek w tle zapisuje je
+  paczkami jako zwarte linie JSONL (jeden rekord na żądanie, z czasami).
+  Pliki są rotowane po przekroczeniu rozmiaru (game_logs.jsonl.1, .2, ...).
+  Rekordy diagnostyczne (debug) mogą być próbkowane lub wyłączone.
+- iter_records: czytnik strumieniowy z filtrowaniem (również w trybie --follow).
+
+Użycie czytnika:
+    python request_log.py --kind predict --where prediction=1 --limit 20
+    python request_log.py --follow
+"""
+import argparse
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+DEFAULT_LOG_PATH = "game_logs.jsonl"
+
+
+class RequestLogger:
+    """
+    Dziennik żądań zapisywany w tle.
+
+    Argumenty:
+        path (str): Ścieżka bieżącego pliku JSONL.
+        max_bytes (int): Rozmiar pliku, po którym następuje rotacja (0 = bez rotacji).
+        backup_count (int): Liczba przechowywanych plików archiwalnych.
+        debug_sample_rate (float): Odsetek żądań z polem "debug" (0 = wyłączone).
+        batch_size (int): Maksymalna liczba rekordów zapisywanych naraz.
+        flush_interval (float): Maksymalny czas (s) przed zapisem niepełnej paczki.
+        queue_size (int): Pojemność kolejki; nadmiarowe rekordy są odrzucane i liczone.
+    """
+    def __init__(self, path=DEFAULT_LOG_PATH, max_bytes=10_000_000, backup_count=5,
+                 debug_sample_rate=0.0, batch_size=256, flush_interval=0.5, queue_size=10000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.debug_sample_rate = debug_sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.written = 0
+        self.dropped = 0
+
+        self._queue_size = queue_size
+        self._start()
+        atexit.register(self.close)
+        if hasattr(os, "register_at_fork"):
+            # Proces potomny po fork() (serve.py) nie dziedziczy wątku zapisu
+            os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        """Tworzy kolejkę i wątek zapisu dla bieżącego procesu."""
+        self._queue = queue.Queue(maxsize=self._queue_size)
+        self._thread = threading.Thread(target=self._run, name="request-log", daemon=True)
+        self._thread.start()
+
+    def sample_debug(self):
+        """Czy dołączyć dane diagnostyczne do bieżącego rekordu."""
+        return self.debug_sample_rate > 0 and random.random() < self.debug_sample_rate
+
+    def log(self, kind, **fields):
+        """Dodaje rekord do kolejki (bez blokowania obsługi żądania)."""
+        record = {"ts": time.time(), "kind": kind, **fields}
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Zapisuje zaległe rekordy i zatrzymuje wątek."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+    def _rotate(self):
+        """Przesuwa pliki: path -> path.1 -> path.2 ... (najstarszy jest usuwany)."""
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def _write(self, records):
+        data = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records)
+        try:
+            if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(data)
+            self.written += len(records)
+        except OSError as e:
+            self.dropped += len(records)
+            print(f"Failed to write log: {e}")
+
+    def _run(self):
+        """Pętla wątku: zbiera paczkę rekordów i zapisuje ją jednym wywołaniem."""
+        stop = False
+        while not stop:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if first is None:
+                break
+
+            records = [first]
+            while len(records) < self.batch_size:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    stop = True
+                    break
+                records.append(record)
+            self._write(records)
+
+    def stats(self):
+        return {"written": self.written, "dropped": self.dropped, "queued": self._queue.qsize()}
+
+
+def worker_log_path(path, worker_id):
+    """Ścieżka dziennika procesu roboczego serve.py, np. game_logs.w1.jsonl."""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.w{worker_id}{ext}"
+
+
+def log_files(path=DEFAULT_LOG_PATH):
+    """Pliki dziennika od najstarszego archiwum do bieżącego pliku."""
+    archives = []
+    i = 1
+    while os.path.exists(f"{path}.{i}"):
+        archives.append(f"{path}.{i}")
+        i += 1
+    files = list(reversed(archives))
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def _matches(record, kind, since, where):
+    if kind is not None and record.get("kind") != kind:
+        return False
+    if since is not None and record.get("ts", 0) < since:
+        return False
+    for key, value in where.items():
+        # Pola szukane są w rekordzie oraz w zagnieżdżonych "input"/"output"
+        found = record.get(key, record.get("input", {}).get(key, record.get("output", {}).get(key)))
+        if str(found) != value:
+            return False
+    return True
+
+
+def _iter_lines(path, follow=False, poll_interval=0.5):
+    """
+    Pełne linie pliku (bajty). W trybie follow czeka na nowe dane: niepełna
+    linia zostaje w buforze do dokończenia, a po rotacji (pod ścieżką jest
+    inny i-węzeł) lub obcięciu pliku czytanie przechodzi do nowego pliku -
+    po ostatnim doczytaniu starego.
+    """
+    f = open(path, "rb")
+    try:
+        buffer = b""
+        reopen = False
+        while True:
+            chunk = f.readline()
+            if chunk:
+                buffer += chunk
+                if buffer.endswith(b"\n"):
+                    yield buffer
+                    buffer = b""
+                continue
+            if not follow:
+                return
+            if reopen:
+                try:
+                    new_file = open(path, "rb")
+                except FileNotFoundError:
+                    time.sleep(poll_interval)  # rotacja w toku - plik jeszcze nie istnieje
+                    continue
+                f.close()
+                f, buffer, reopen = new_file, b"", False
+                continue
+            try:
+                stat = os.stat(path)
+                reopen = stat.st_ino != os.fstat(f.fileno()).st_ino or stat.st_size < f.tell()
+            except FileNotFoundError:
+                reopen = True
+            if not reopen:
+                time.sleep(poll_interval)
+    finally:
+        f.close()
+
+
+def iter_records(path=DEFAULT_LOG_PATH, kind=None, since=None, where=None,
+                 include_rotated=True, follow=False, poll_interval=0.5):
+    """
+    Strumieniowo czyta rekordy dziennika z filtrowaniem.
+
+    Argumenty:
+        kind (str): Typ rekordu (np. "predict", "predict_batch").
+        since (float): Tylko rekordy o znaczniku czasu >= since (epoch).
+        where (dict): Równość pól, np. {"prediction": "1"}.
+        follow (bool): Po dojściu do końca czekaj na nowe rekordy (jak tail -f),
+                       także po rotacji bieżącego pliku.
+    """
+    where = where or {}
+    files = log_files(path) if include_rotated else [path]
+    for i, name in enumerate(files):
+        follow_file = follow and i == len(files) - 1 and name == path
+        for line in _iter_lines(name, follow_file, poll_interval):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if _matches(record, kind, since, where):
+                yield record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read and filter the structured request log")
+    parser.add_argument("--path", default=DEFAULT_LOG_PATH)
+    parser.add_argument("--kind", default=None)
+    parser.add_argument("--since", type=float, default=None, help="Unix timestamp")
+    parser.add_argument("--where", action="append", default=[], help="field=value (repeatable)")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--follow", action="store_true")
+    args = parser.parse_args()
+
+    where = dict(item.split("=", 1) for item in args.where)
+    for n, record in enumerate(iter_records(args.path, args.kind, args.since, where, follow=args.follow)):
+        if args.limit is not None and n >= args.limit:
+            break
+        print(json.dumps(record, separators=(",", ":")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Dane FreshRetailNet
+-------------------
+Wspólne funkcje odczytu i przetwarzania danych FreshRetailNet-50K
+(bez zależności od PyTorch).
+
+- Odczyt pliku parquet strumieniowo (po grupach wierszy / paczkach rekordów),
+  wyłącznie kolumn FEATURE_COLUMNS oraz sale_amount.
+- Wektorowa zamiana kolumn (również listowych, np. godzinowych) na float32.
+- Bufor tasujący o ograniczonym rozmiarze dla danych strumieniowych.
+"""
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+DATASET_URL = "hf://datasets/Dingdong-Inc/FreshRetailNet-50K/data/train.parquet"
+TARGET_SOURCE_COLUMN = "sale_amount"
+
+
+def open_parquet(path):
+    """Otwiera plik parquet (ścieżka lokalna lub URL obsługiwany przez fsspec, np. hf://)."""
+    if "://" in path:
+        import fsspec
+        return pq.ParquetFile(fsspec.open(path, "rb").open())
+    return pq.ParquetFile(path)
+
+
+def column_to_float32(column):
+    """
+    Zamienia kolumnę Arrow na wektor float32.
+    Kolumny listowe redukowane są do średniej elementów wiersza
+    (jak np.mean w RetailDataset), braki danych zastępowane są zerami.
+    """
+    if isinstance(column, pa.ChunkedArray):
+        column = column.combine_chunks()
+
+    if pa.types.is_list(column.type) or pa.types.is_large_list(column.type):
+        flat = pc.list_flatten(column).to_numpy(zero_copy_only=False).astype(np.float64)
+        parents = pc.list_parent_indices(column).to_numpy()
+        sums = np.bincount(parents, weights=np.nan_to_num(flat), minlength=len(column))
+        counts = np.bincount(parents, minlength=len(column))
+        means = np.divide(sums, counts, out=np.zeros(len(column)), where=counts > 0)
+        return means.astype(np.float32)
+
+    values = column.to_numpy(zero_copy_only=False)
+    return np.nan_to_num(values.astype(np.float32))
+
+
+def table_to_arrays(table, feature_columns):
+    """
+    Zamienia tabelę / paczkę rekordów Arrow na (X, y):
+    X - macierz float32 (n, len(feature_columns)), y - etykiety float32 (sale_amount > 0).
+    Brakujące kolumny cech wypełniane są zerami.
+    """
+    n = table.num_rows
+    x = np.zeros((n, len(feature_columns)), dtype=np.float32)
+    names = table.schema.names
+    for i, col in enumerate(feature_columns):
+        if col in names:
+            x[:, i] = column_to_float32(table.column(col))
+    y = (column_to_float32(table.column(TARGET_SOURCE_COLUMN)) > 0).astype(np.float32)
+    return x, y
+
+
+def sample_rows(num_rows, sample, seed=0):
+    """
+    Pozycje losowej próbki wierszy (rosnąco) lub None, gdy próbkowanie jest
+    wyłączone (sample = 0 lub >= num_rows). Wspólne dla odczytu z parquet
+    i z cache cech, więc --sample/--seed wybierają te same wiersze w obu trybach.
+    """
+    if not sample or sample >= num_rows:
+        return None
+    return np.sort(np.random.default_rng(seed).choice(num_rows, sample, replace=False))
+
+
+def iter_parquet_arrays(path, feature_columns, batch_rows=65536, fraction=1.0,
+                        shard_index=0, num_shards=1, rng=None):
+    """
+    Strumieniowo czyta plik parquet paczkami rekordów i zwraca (X, y).
+
+    Argumenty:
+        batch_rows (int): Liczba wierszy w paczce odczytu.
+        fraction (float): Odsetek losowo zachowanych wierszy (0, 1].
+        shard_index, num_shards: Podział grup wierszy między procesy/wątki
+                                 (grupa i trafia do sharda i % num_shards).
+        rng (np.random.Generator): Generator do losowania kolejności grup i próbkowania.
+    """
+    rng = rng or np.random.default_rng()
+    parquet = open_parquet(path)
+    names = parquet.schema_arrow.names
+    columns = [c for c in feature_columns if c in names] + [TARGET_SOURCE_COLUMN]
+
+    row_groups = [g for g in range(parquet.num_row_groups) if g % num_shards == shard_index]
+    rng.shuffle(row_groups)
+
+    for group in row_groups:
+        for batch in parquet.iter_batches(batch_size=batch_rows, row_groups=[group], columns=columns):
+            x, y = table_to_arrays(batch, feature_columns)
+            if fraction < 1.0:
+                keep = rng.random(len(y)) < fraction
+                x, y = x[keep], y[keep]
+            if len(y):
+                yield x, y
+
+
+def shuffle_buffer(chunks, buffer_size, rng):
+    """
+    Tasowanie w buforze o ograniczonym rozmiarze.
+    Gdy bufor osiągnie buffer_size wierszy, jest tasowany, a połowa wierszy
+    zostaje wydana; druga połowa miesza się z kolejnymi paczkami.
+
+    Zwraca (generator): przetasowane paczki (X, y).
+    """
+    buf_x, buf_y, size = [], [], 0
+    for x, y in chunks:
+        buf_x.append(x)
+        buf_y.append(y)
+        size += len(y)
+        if size >= buffer_size:
+            x_all, y_all = np.concatenate(buf_x), np.concatenate(buf_y)
+            order = rng.permutation(size)
+            emit, keep = order[:size - buffer_size // 2], order[size - buffer_size // 2:]
+            yield x_all[emit], y_all[emit]
+            buf_x, buf_y, size = [x_all[keep]], [y_all[keep]], len(keep)
+
+    if size:
+        x_all, y_all = np.concatenate(buf_x), np.concatenate(buf_y)
+        order = rng.permutation(size)
+        yield x_all[order], y_all[order]
@@ -0,0 +1,196 @@
+"""
+Serwer Produkcyjny (prefork)
+----------------------------
+Uruchamia API (api.py) w kilku procesach roboczych współdzielących jedne wagi.
+
+Proces nadrzędny raz ładuje i rozgrzewa modele (api.startup()), otwiera gniazdo
+nasłuchujące, a następnie tworzy procesy robocze przez fork(). Wagi modeli,
+LUT i wypełniony cache RetailNet są współdzielone między procesami jako strony
+kopiowane przy zapisie (copy-on-write) - inferencja ich nie modyfikuje, więc
+pamięć wag nie rośnie z liczbą procesów, a procesy robocze nie ładują niczego
+od nowa. Wszystkie procesy przyjmują połączenia z tego samego gniazda.
+
+Każdy proces roboczy dostaje cpu_count / workers wątków (torch oraz BLAS/OpenMP),
+aby procesy nie rywalizowały o rdzenie. Proces nadrzędny ładuje modele na jednym
+wątku - pula wątków OpenMP utworzona przed fork() nie działa w procesach potomnych.
+Proces nadrzędny nadzoruje procesy robocze i uruchamia ponownie te, które
+zakończyły się nieoczekiwanie.
+
+Uwagi:
+- Metryki (/metrics) i statystyki (/batching_stats, /cache_stats) dotyczą
+  procesu, który obsłużył żądanie.
+- Każdy proces roboczy zapisuje własny dziennik żądań (game_logs.w<N>.jsonl).
+- Bez fork() (Windows) serwer działa jako pojedynczy proces uvicorn.
+
+Użycie:
+    python serve.py --workers 4 --port 8000
+    INFERENCE_BACKEND=numpy python serve.py --workers 2 --threads-per-worker 1
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+# Restart procesu roboczego, który padł szybciej niż po tym czasie, jest
+# traktowany jako błąd konfiguracji (zamiast pętli restartów)
+MIN_WORKER_UPTIME_S = 5.0
+MAX_FAST_FAILURES = 3
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def default_workers():
+    """Liczba procesów roboczych: SERVE_WORKERS lub liczba rdzeni."""
+    return int(os.environ.get("SERVE_WORKERS", "0")) or os.cpu_count() or 1
+
+
+def threads_per_worker(workers):
+    """Równy podział rdzeni między procesy robocze (co najmniej jeden wątek)."""
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def pin_threads(threads):
+    """
+    Ustawia liczbę wątków obliczeniowych w bieżącym procesie.
+    Zmienne środowiskowe działają tylko, jeśli ustawiono je przed importem numpy/torch.
+    """
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    if "torch" in sys.modules:
+        import torch
+        torch.set_num_threads(threads)
+
+
+def bind_socket(host, port, backlog=2048):
+    """Gniazdo nasłuchujące otwierane przed fork() i dziedziczone przez procesy robocze."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(worker_id, sock, args, threads):
+    """Proces roboczy: własne wątki, własny dziennik, serwer uvicorn na wspólnym gnieździe."""
+    import uvicorn
+    import api
+    from request_log import worker_log_path
+
+    # Obsługa sygnałów należy do uvicorn (łagodne zamknięcie po SIGTERM)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    pin_threads(threads)
+    if api.request_log is not None:
+        api.request_log.path = worker_log_path(api.request_log.path, worker_id)
+
+    # Modele są już załadowane - lifespan (api.startup) kończy się natychmiast
+    config = uvicorn.Config(api.app, log_level=args.log_level, timeout_keep_alive=args.keep_alive)
+    server = uvicorn.Server(config)
+    try:
+        server.run(sockets=[sock])
+    finally:
+        if api.request_log is not None:
+            api.request_log.close()
+
+
+def spawn_worker(worker_id, sock, args, threads):
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(worker_id, sock, args, threads)
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            # Bez handlerów atexit procesu nadrzędnego
+            os._exit(code)
+    return pid
+
+
+def supervise(sock, args, threads):
+    """Tworzy procesy robocze i uruchamia ponownie te, które się zakończyły."""
+    workers = {}  # pid -> (worker_id, czas startu)
+    fast_failures = 0
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for worker_id in range(1, args.workers + 1):
+        workers[spawn_worker(worker_id, sock, args, threads)] = (worker_id, time.monotonic())
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} workers "
+          f"x {threads} threads (pid {os.getpid()})")
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        worker_id, started = workers.pop(pid, (None, None))
+        if worker_id is None or stopping:
+            continue
+
+        code = os.waitstatus_to_exitcode(status)
+        print(f"Worker {worker_id} (pid {pid}) exited with code {code}, restarting")
+        fast_failures = fast_failures + 1 if time.monotonic() - started < MIN_WORKER_UPTIME_S else 0
+        if fast_failures >= MAX_FAST_FAILURES:
+            print("Workers keep failing on startup, shutting down")
+            stop(None, None)
+            continue
+        workers[spawn_worker(worker_id, sock, args, threads)] = (worker_id, time.monotonic())
+    sock.close()
+    return 1 if fast_failures >= MAX_FAST_FAILURES else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API with prefork workers sharing loaded model weights")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=default_workers(),
+                        help="Worker processes (default: SERVE_WORKERS or CPU count)")
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="Torch/BLAS threads per worker (default: CPU count / workers)")
+    parser.add_argument("--keep-alive", type=int, default=5, help="HTTP keep-alive timeout in seconds")
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    args.workers = max(1, args.workers)
+    threads = args.threads_per_worker or threads_per_worker(args.workers)
+
+    if not hasattr(os, "fork"):
+        # Windows: brak fork(), pojedynczy proces
+        import uvicorn
+        if args.workers > 1:
+            print("Prefork is not available on this platform, serving with a single process")
+        uvicorn.run("api:app", host=args.host, port=args.port, log_level=args.log_level,
+                    timeout_keep_alive=args.keep_alive)
+        return
+
+    # Jeden wątek podczas ładowania - procesy potomne ustawiają własną liczbę wątków
+    pin_threads(1)
+    import api
+    if api.INFERENCE_BACKEND != "numpy":
+        import torch
+        torch.set_num_threads(1)
+    sock = bind_socket(args.host, args.port)
+    api.startup()
+    sys.exit(supervise(sock, args, threads))
+
+
+if __name__ == "__main__":
+    main()
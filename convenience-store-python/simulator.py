@@ -0,0 +1,303 @@
+"""
+Symulator Dni Sklepu
+--------------------
+Wektorowa symulacja pełnych dni sklepu bez uruchamiania Unity i serwera API.
+
+Odwzorowuje logikę gry (store_model.py):
+- ClientSpawner: co SPAWN_CHECK_INTERVAL sekund losowanie klienta z szansą godzinową,
+  osobowość U(0, 1), lista zakupów (produkty impulsowe + losowania bez powtórzeń),
+- WeatherManager: temperatura z godziny i losowe przełączanie opadów,
+- NPCBuyer: decyzja final_buy_prob * (basePrice / price) > 0.5, koszt = suma cen.
+
+Wszystkie decyzje wielu dni liczone są kilkoma dużymi przebiegami sieci:
+RetailNet tylko dla unikalnych wierszy (pogoda x kategorie), PersonalityNet
+dla wszystkich produktów z list zakupów naraz. Pozwala to policzyć tysiące
+dni na minutę do balansowania cen i planowania obciążenia serwera.
+
+Użycie:
+    python simulator.py --days 1000
+    python simulator.py --days 200 --price "soda bottle=7.5" --backend torch
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from catalog import load_catalog
+from features import FEATURE_COLUMNS
+from store_model import (
+    OPENING_HOUR, CLOSING_HOUR, DEFAULT_SPAWN_CHANCE, SPAWN_CHECK_INTERVAL, REAL_SECONDS_PER_HOUR,
+    MAX_SHOPPING_LIST_ITEMS, MAX_IMPULSE_ITEMS, IMPULSE_CHANCE, PRECIPITATION_TOGGLE_CHANCE,
+    BUY_THRESHOLD, spawn_chance, temperature_at, price_ratio,
+)
+
+DEFAULT_OUTPUT = "simulation_results.json"
+BACKENDS = ("numpy", "torch", "torchscript")
+
+# Sprawdzenia spawnera na godzinę gry (10 s / 2 s = 5)
+CHECKS_PER_HOUR = int(round(REAL_SECONDS_PER_HOUR / SPAWN_CHECK_INTERVAL))
+TICKS_PER_DAY = (CLOSING_HOUR - OPENING_HOUR) * CHECKS_PER_HOUR
+# Maksymalna liczba wierszy jednego przebiegu PersonalityNet
+CHUNK_ROWS = 1 << 18
+
+
+def load_chain(backend="numpy"):
+    """Łańcuch RetailNet -> PersonalityNet z interfejsem base_prob / final_prob."""
+    if backend == "numpy":
+        from numpy_engine import NumpyChain, ensure_weights
+        return NumpyChain.load(ensure_weights())
+    if backend == "torchscript":
+        from export_models import load_optimized_chain
+        return load_optimized_chain("torchscript")
+    from numpy_engine import load_torch_chain
+    return load_torch_chain()
+
+
+def catalog_arrays(products):
+    """Katalog jako tablice: kategorie (p, 3), isImpulse (p,), cena (p,), korekta ceny (p,)."""
+    categories = np.array([[p["cat1"], p["cat2"], p["cat3"]] for p in products], dtype=np.float32)
+    impulse = np.array([bool(p.get("isImpulse")) for p in products])
+    # NPCBuyer dolicza produkty z ceną 0 jako 1
+    price = np.array([p["price"] if p["price"] != 0 else 1.0 for p in products], dtype=np.float64)
+    ratio = np.array([price_ratio(p) for p in products], dtype=np.float32)
+    return categories, impulse, price, ratio
+
+
+def tick_hours():
+    """Godzina gry każdego sprawdzenia spawnera w ciągu dnia (TICKS_PER_DAY,)."""
+    return OPENING_HOUR + np.arange(TICKS_PER_DAY) * (SPAWN_CHECK_INTERVAL / REAL_SECONDS_PER_HOUR)
+
+
+def simulate_weather(rng, num_days):
+    """
+    Pogoda w chwili każdego sprawdzenia: opady (dni, ticki) jako 0/1 oraz temperatura (ticki,).
+    Opady przełączane są z szansą PRECIPITATION_TOGGLE_CHANCE co sekundę (jak Weather.advance).
+    """
+    toggles = rng.binomial(int(SPAWN_CHECK_INTERVAL), PRECIPITATION_TOGGLE_CHANCE, (num_days, TICKS_PER_DAY))
+    precipitation = (np.cumsum(toggles, axis=1) % 2).astype(np.float32)
+    temperature = np.array([temperature_at(hour) for hour in tick_hours()], dtype=np.float32)
+    return precipitation, temperature
+
+
+def make_shopping_lists(rng, num_npcs, impulse):
+    """
+    Listy zakupów wielu klientów naraz (jak store_model.make_shopping_list).
+
+    Zwraca:
+        np.ndarray: Indeksy produktów (n, MAX_IMPULSE_ITEMS + MAX_SHOPPING_LIST_ITEMS), -1 = puste miejsce.
+    """
+    num_products = len(impulse)
+    impulse_ids = np.flatnonzero(impulse)
+    slots = np.full((num_npcs, MAX_IMPULSE_ITEMS + MAX_SHOPPING_LIST_ITEMS), -1, dtype=np.int64)
+
+    # Produkty impulsowe (mogą się powtarzać)
+    if len(impulse_ids):
+        has_impulse = rng.random(num_npcs) <= IMPULSE_CHANCE
+        impulse_count = np.where(has_impulse, rng.integers(1, MAX_IMPULSE_ITEMS + 1, num_npcs), 0)
+        picks = impulse_ids[rng.integers(len(impulse_ids), size=(num_npcs, MAX_IMPULSE_ITEMS))]
+        slots[:, :MAX_IMPULSE_ITEMS] = np.where(np.arange(MAX_IMPULSE_ITEMS) < impulse_count[:, None], picks, -1)
+
+    # Losowania z całego sklepu - produkt już obecny na liście jest pomijany
+    draws = rng.integers(1, MAX_SHOPPING_LIST_ITEMS + 1, num_npcs)
+    picks = rng.integers(num_products, size=(num_npcs, MAX_SHOPPING_LIST_ITEMS))
+    for j in range(MAX_SHOPPING_LIST_ITEMS):
+        column = MAX_IMPULSE_ITEMS + j
+        duplicate = (slots[:, :column] == picks[:, j:j + 1]).any(axis=1)
+        slots[:, column] = np.where((j < draws) & ~duplicate, picks[:, j], -1)
+    return slots
+
+
+def base_prob_unique(engine, x):
+    """RetailNet tylko dla unikalnych wierszy (pogoda i kategorie powtarzają się między klientami)."""
+    if not len(x):
+        return np.zeros(0, dtype=np.float32)
+    unique_rows, inverse = np.unique(x, axis=0, return_inverse=True)
+    return engine.base_prob(unique_rows)[inverse.reshape(-1)]
+
+
+def simulate_days(engine, products, num_days, rng, hourly_chance=DEFAULT_SPAWN_CHANCE, npc_scale=1):
+    """
+    Symuluje num_days dni sklepu.
+
+    Argumenty:
+        engine: Łańcuch z metodami base_prob / final_prob (load_chain).
+        products (list): Katalog produktów (catalog.load_catalog), ceny mogą być zmienione.
+        num_days (int): Liczba dni.
+        rng (np.random.Generator): Generator liczb losowych.
+        hourly_chance (list): Szansa na klienta w jednym sprawdzeniu, per godzina od otwarcia.
+        npc_scale (int): Liczba niezależnych losowań na sprawdzenie (mnożnik ruchu).
+
+    Zwraca:
+        dict: Tablice per dzień ("npcs", "items", "purchases", "buyers", "revenue"),
+              per dzień i godzinę ("hourly_npcs", "hourly_revenue") oraz per produkt
+              ("product_offers", "product_sales").
+    """
+    categories, impulse, price, ratio = catalog_arrays(products)
+    hours = tick_hours()
+    hour_index = (np.floor(hours) - OPENING_HOUR).astype(np.int64)
+    num_hours = CLOSING_HOUR - OPENING_HOUR
+
+    precipitation, temperature = simulate_weather(rng, num_days)
+    chance = np.array([spawn_chance(hour, hourly_chance) for hour in hours])
+    spawned = rng.binomial(npc_scale, chance, (num_days, TICKS_PER_DAY))
+
+    # Klienci: dzień, sprawdzenie (tick), osobowość, lista zakupów
+    npc_day = np.repeat(np.arange(num_days), spawned.sum(axis=1))
+    npc_tick = np.repeat(np.tile(np.arange(TICKS_PER_DAY), num_days), spawned.reshape(-1))
+    num_npcs = len(npc_day)
+    impulsiveness = rng.random(num_npcs, dtype=np.float32)
+    generosity = rng.random(num_npcs, dtype=np.float32)
+    slots = make_shopping_lists(rng, num_npcs, impulse)
+
+    # Produkty z list zakupów (jeden wiersz na pozycję listy)
+    item_npc, item_slot = np.nonzero(slots >= 0)
+    item_product = slots[item_npc, item_slot]
+    day, tick = npc_day[item_npc], npc_tick[item_npc]
+
+    columns = {
+        "precpt": precipitation[day, tick],
+        "avg_temperature": temperature[tick],
+        "stock_hour6_22_cnt": np.ones(len(item_npc), dtype=np.float32),
+        "hours_stock_status": np.ones(len(item_npc), dtype=np.float32),
+        "first_category_id": categories[item_product, 0],
+        "second_category_id": categories[item_product, 1],
+        "third_category_id": categories[item_product, 2],
+    }
+    x = np.column_stack([columns[col] for col in FEATURE_COLUMNS]).astype(np.float32)
+    base = base_prob_unique(engine, x)
+
+    # Wejście PersonalityNet: [bazowe_prawd, impulsywność, szczodrość, czy_impulsowy]
+    p = np.column_stack([
+        base, impulsiveness[item_npc], generosity[item_npc], impulse[item_product],
+    ]).astype(np.float32)
+    final = np.zeros(len(p), dtype=np.float32)
+    for i in range(0, len(p), CHUNK_ROWS):
+        final[i:i + CHUNK_ROWS] = engine.final_prob(p[i:i + CHUNK_ROWS])
+    bought = final * ratio[item_product] > BUY_THRESHOLD
+
+    spent = np.where(bought, price[item_product], 0.0)
+    npc_spent = np.bincount(item_npc, weights=spent, minlength=num_npcs)
+    npc_hour = npc_day * num_hours + hour_index[npc_tick]
+    item_hour = npc_hour[item_npc]
+    return {
+        "npcs": spawned.sum(axis=1),
+        "items": np.bincount(day, minlength=num_days),
+        "purchases": np.bincount(day, weights=bought, minlength=num_days).astype(np.int64),
+        # Klienci, którzy coś kupili (idą do kasy)
+        "buyers": np.bincount(npc_day, weights=npc_spent > 0, minlength=num_days).astype(np.int64),
+        "revenue": np.bincount(npc_day, weights=npc_spent, minlength=num_days),
+        "hourly_npcs": np.bincount(npc_hour, minlength=num_days * num_hours).reshape(num_days, num_hours),
+        "hourly_revenue": np.bincount(item_hour, weights=spent,
+                                      minlength=num_days * num_hours).reshape(num_days, num_hours),
+        "product_offers": np.bincount(item_product, minlength=len(products)),
+        "product_sales": np.bincount(item_product, weights=bought, minlength=len(products)).astype(np.int64),
+    }
+
+
+def run_simulation(engine, products, num_days, seed=0, days_per_batch=500, **kwargs):
+    """Symulacja w paczkach dni (ograniczenie pamięci). Zwraca połączone wyniki simulate_days."""
+    rng = np.random.default_rng(seed)
+    parts = []
+    for start in range(0, num_days, days_per_batch):
+        parts.append(simulate_days(engine, products, min(days_per_batch, num_days - start), rng, **kwargs))
+    merged = {}
+    for key in parts[0]:
+        if key.startswith("product_"):
+            merged[key] = np.sum([part[key] for part in parts], axis=0)
+        else:
+            merged[key] = np.concatenate([part[key] for part in parts])
+    return merged
+
+
+def summarize(result, products):
+    """Statystyki wyników: średnie dzienne, rozkład przychodu, godziny i sprzedaż produktów."""
+    revenue = result["revenue"]
+    npcs = result["npcs"].sum()
+    items = result["items"].sum()
+    return {
+        "days": len(revenue),
+        "npcs_per_day": float(result["npcs"].mean()),
+        "items_per_day": float(result["items"].mean()),
+        "purchases_per_day": float(result["purchases"].mean()),
+        "buyer_rate": float(result["buyers"].sum() / npcs) if npcs else 0.0,
+        "purchase_rate": float(result["purchases"].sum() / items) if items else 0.0,
+        "revenue": {
+            "mean": float(revenue.mean()),
+            "std": float(revenue.std()),
+            "p5": float(np.percentile(revenue, 5)),
+            "p95": float(np.percentile(revenue, 95)),
+        },
+        "hourly": {
+            str(OPENING_HOUR + h): {"npcs": float(n), "revenue": float(r)}
+            for h, (n, r) in enumerate(zip(result["hourly_npcs"].mean(axis=0), result["hourly_revenue"].mean(axis=0)))
+        },
+        "products": {
+            p["productName"]: {
+                "price": p["price"],
+                "offers": int(offers),
+                "sales": int(sales),
+                "sell_through": float(sales / offers) if offers else 0.0,
+            }
+            for p, offers, sales in zip(products, result["product_offers"], result["product_sales"])
+        },
+    }
+
+
+def print_summary(summary, elapsed):
+    days = summary["days"]
+    print(f"Simulated {days} days in {elapsed:.2f}s ({days / elapsed * 60:,.0f} days/min)")
+    print(f"Per day: {summary['npcs_per_day']:.1f} NPCs, {summary['items_per_day']:.1f} items, "
+          f"{summary['purchases_per_day']:.1f} purchases | buyer rate {summary['buyer_rate']:.1%}, "
+          f"purchase rate {summary['purchase_rate']:.1%}")
+    revenue = summary["revenue"]
+    print(f"Revenue/day: mean {revenue['mean']:.2f}, std {revenue['std']:.2f}, "
+          f"p5 {revenue['p5']:.2f}, p95 {revenue['p95']:.2f}")
+    print(f"{'product':<20} {'price':>7} {'offers':>9} {'sales':>9} {'sell-through':>13}")
+    for name, row in summary["products"].items():
+        print(f"{name:<20} {row['price']:>7.2f} {row['offers']:>9} {row['sales']:>9} {row['sell_through']:>13.1%}")
+
+
+def parse_price(text):
+    """Parsuje nadpisanie ceny "NAZWA=CENA"."""
+    name, value = text.rsplit("=", 1)
+    return name, float(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate store days with batched RetailNet/PersonalityNet passes")
+    parser.add_argument("--days", type=int, default=1000)
+    parser.add_argument("--backend", choices=BACKENDS, default="numpy")
+    parser.add_argument("--catalog", default="product_catalog.json")
+    parser.add_argument("--price", type=parse_price, action="append", default=[],
+                        help="Override a product price, e.g. 'soda bottle=7.5'")
+    parser.add_argument("--spawn-chance", type=float, nargs="+", default=DEFAULT_SPAWN_CHANCE,
+                        help="Hourly spawn chance per check, from opening hour")
+    parser.add_argument("--npc-scale", type=int, default=1, help="Spawn rolls per check (traffic multiplier)")
+    parser.add_argument("--days-per-batch", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    products = load_catalog(args.catalog)
+    prices = dict(args.price)
+    unknown = set(prices) - {p["productName"] for p in products}
+    if unknown:
+        parser.error(f"Unknown products: {', '.join(sorted(unknown))}")
+    products = [{**p, "price": prices.get(p["productName"], p["price"])} for p in products]
+
+    engine = load_chain(args.backend)
+    start = time.perf_counter()
+    result = run_simulation(engine, products, args.days, args.seed, args.days_per_batch,
+                            hourly_chance=args.spawn_chance, npc_scale=args.npc_scale)
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(result, products)
+    print_summary(summary, elapsed)
+    with open(args.output, "w") as f:
+        json.dump({"args": {**vars(args), "price": prices}, "elapsed_s": elapsed, "summary": summary}, f, indent=2)
+    print(f"Saved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Model Sklepu
+------------
+Odwzorowanie logiki gry z Unity po stronie Pythona (narzędzia testowe i symulacje):
+
+- ClientSpawner: godziny otwarcia, szansa na pojawienie się klienta w każdym
+  sprawdzeniu (co 2 s), losowanie osobowości i listy zakupów.
+- WeatherManager: temperatura zależna od godziny i losowe opady.
+- NPCBuyer: ładunek JSON wysyłany do API oraz korekta ceny (basePrice / price).
+"""
+import math
+
+OPENING_HOUR = 8
+CLOSING_HOUR = 22
+
+# Wartości domyślne komponentów Unity
+DEFAULT_SPAWN_CHANCE = [0.5] * (CLOSING_HOUR - OPENING_HOUR)
+SPAWN_CHECK_INTERVAL = 2.0       # s (ClientSpawner.spawnCheckInterval)
+REAL_SECONDS_PER_HOUR = 10.0     # s (ClientSpawner.realSecondsPerHour)
+MAX_SHOPPING_LIST_ITEMS = 5
+MAX_IMPULSE_ITEMS = 2
+IMPULSE_CHANCE = 0.5
+
+MIN_TEMP_NIGHT = 10.0
+MAX_TEMP_DAY = 30.0
+PRECIPITATION_TOGGLE_CHANCE = 0.05   # na sekundę gry
+
+BUY_THRESHOLD = 0.5
+
+
+def spawn_chance(hour, hourly_chance=DEFAULT_SPAWN_CHANCE):
+    """Szansa na klienta w jednym sprawdzeniu dla podanej godziny (0 poza godzinami otwarcia)."""
+    index = math.floor(hour) - OPENING_HOUR
+    if index < 0 or index >= len(hourly_chance):
+        return 0.0
+    return hourly_chance[index]
+
+
+def temperature_at(hour):
+    """Temperatura (WeatherManager.UpdateTemperature): maksimum o 14:00."""
+    dist_from_peak = abs(hour - 14.0)
+    if dist_from_peak > 12:
+        dist_from_peak = 24 - dist_from_peak
+    t = min(1.0, max(0.0, 1.0 - dist_from_peak / 12.0))
+    return MIN_TEMP_NIGHT + (MAX_TEMP_DAY - MIN_TEMP_NIGHT) * t
+
+
+def price_ratio(product):
+    """Współczynnik korekty ceny z NPCBuyer: basePrice (lub price) / max(0.01, price)."""
+    base = product["basePrice"] if product.get("basePrice", 0) > 0 else product["price"]
+    return base / max(0.01, product["price"])
+
+
+class Weather:
+    """Pogoda aktualizowana co sekundę gry (temperatura z godziny, losowe przełączanie opadów)."""
+    def __init__(self, rng, precipitation=0.0):
+        self.rng = rng
+        self.precipitation = precipitation
+        self.temperature = temperature_at(OPENING_HOUR)
+
+    def advance(self, hour, game_seconds):
+        """Przesuwa pogodę o podaną liczbę sekund gry."""
+        self.temperature = temperature_at(hour)
+        toggles = self.rng.binomial(max(0, int(round(game_seconds))), PRECIPITATION_TOGGLE_CHANCE)
+        if toggles % 2:
+            self.precipitation = 1.0 - self.precipitation
+
+
+def make_shopping_list(rng, products):
+    """
+    Lista zakupów jak w ClientSpawner.SpawnClient: najpierw (z szansą IMPULSE_CHANCE)
+    1..MAX_IMPULSE_ITEMS produktów impulsowych, potem 1..MAX_SHOPPING_LIST_ITEMS
+    losowań z całego sklepu bez powtórzeń.
+    """
+    shopping_list = []
+    impulse_products = [p for p in products if p.get("isImpulse")]
+    if impulse_products and rng.random() <= IMPULSE_CHANCE:
+        for _ in range(rng.integers(1, MAX_IMPULSE_ITEMS + 1)):
+            shopping_list.append(impulse_products[rng.integers(len(impulse_products))])
+
+    for _ in range(rng.integers(1, MAX_SHOPPING_LIST_ITEMS + 1)):
+        product = products[rng.integers(len(products))]
+        if product not in shopping_list:
+            shopping_list.append(product)
+    return shopping_list
+
+
+def make_npc(rng, products):
+    """Nowy klient: cechy osobowości U(0, 1) i lista zakupów."""
+    return {
+        "impulsiveness": float(rng.random()),
+        "generosity": float(rng.random()),
+        "shopping_list": make_shopping_list(rng, products),
+    }
+
+
+def item_payload(product, npc, weather):
+    """Ładunek pojedynczego produktu (jak itemJson w NPCBuyer.AI_ProcessShoppingList)."""
+    return {
+        "precpt": weather.precipitation,
+        "avg_temperature": weather.temperature,
+        "stock_hour6_22_cnt": 1,
+        "hours_stock_status": 1,
+        "first_category_id": product["cat1"],
+        "second_category_id": product["cat2"],
+        "third_category_id": product["cat3"],
+        "impulsiveness": npc["impulsiveness"],
+        "generosity": npc["generosity"],
+        "is_impulse": 1 if product.get("isImpulse") else 0,
+    }
@@ -0,0 +1,399 @@
+"""
+Przeszukiwanie Hiperparametrów
+------------------------------
+Równoległe przeszukiwanie architektury i parametrów treningu RetailNet
+lub PersonalityNet: szerokości warstw ukrytych, learning rate, rozmiar
+paczki i liczba epok.
+
+- Próby (trials) uruchamiane są w puli procesów o rozmiarze
+  liczba rdzeni / --threads; każda próba ma ograniczoną liczbę wątków torch.
+- Przycinanie (pruning): po --warmup-epochs próba jest przerywana, gdy jej
+  strata walidacyjna jest gorsza od mediany strat zakończonych prób w tej samej epoce.
+- Dla ukończonych prób mierzone są dokładność walidacyjna (z najlepszej epoki),
+  liczba parametrów oraz opóźnienie inferencji (jeden wiersz - ścieżka /predict
+  - i paczka). Pomiar odbywa się po zakończeniu puli, kolejno, aby próby
+  nie zakłócały sobie czasów.
+- Ranking: najlepsza dokładność, a jako rekomendacja - najmniejszy (potem
+  najszybszy) model, którego dokładność mieści się w --tolerance od najlepszej.
+
+Przestrzeń przeszukiwania to JSON (tekst lub ścieżka do pliku) z listami wartości:
+    {"hidden": [[32, 16], [16, 8]], "lr": [0.001, 0.003], "batch_size": [64, 256], "epochs": [30]}
+
+Użycie:
+    python sweep.py personality
+    python sweep.py personality --space '{"hidden": [[8, 8], [4, 4]], "lr": [0.003]}' --trials 8
+    python sweep.py retail --data train.parquet --sample 200000 --threads 2
+"""
+import argparse
+import itertools
+import json
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+import torch.nn as nn
+from torch.utils.data import TensorDataset
+
+from checkpointing import evaluate, holdout_split
+from feature_cache import resolve_cache
+from network import (
+    DEFAULT_PERSONALITY_HIDDEN, DEFAULT_RETAIL_HIDDEN, FEATURE_COLUMNS, PERSONALITY_COLUMNS,
+    PersonalityNet, RetailNet
+)
+
+# Przestrzenie domyślne - pierwsza wartość "hidden" to obecna architektura
+DEFAULT_SPACES = {
+    "retail": {
+        "hidden": [list(DEFAULT_RETAIL_HIDDEN), [32, 32], [16, 16], [8, 8]],
+        "lr": [1e-3, 3e-3],
+        "batch_size": [512, 2048],
+        "epochs": [30],
+    },
+    "personality": {
+        "hidden": [list(DEFAULT_PERSONALITY_HIDDEN), [16, 8], [8, 8], [4, 4]],
+        "lr": [1e-3, 3e-3],
+        "batch_size": [64, 256],
+        "epochs": [30],
+    },
+}
+NETWORKS = {
+    "retail": (RetailNet, len(FEATURE_COLUMNS), "train.py"),
+    "personality": (PersonalityNet, len(PERSONALITY_COLUMNS), "train_personality.py"),
+}
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+LATENCY_BATCH_ROWS = 1024
+
+
+# ==============================
+# Przestrzeń przeszukiwania
+# ==============================
+def load_space(network, text=None):
+    """Przestrzeń z JSON (tekst lub plik); brakujące klucze z DEFAULT_SPACES."""
+    space = dict(DEFAULT_SPACES[network])
+    if text:
+        if os.path.exists(text):
+            with open(text) as f:
+                text = f.read()
+        overrides = json.loads(text)
+        unknown = set(overrides) - set(space)
+        if unknown:
+            raise ValueError(f"Unknown search space keys: {sorted(unknown)}")
+        space.update({key: value if isinstance(value, list) else [value] for key, value in overrides.items()})
+    return space
+
+
+def trial_grid(space, num_trials=None, seed=0):
+    """
+    Wszystkie kombinacje przestrzeni lub losowy podzbiór num_trials z nich.
+
+    Zwraca:
+        list: Słowniki parametrów prób (hidden jako krotka).
+    """
+    keys = list(space)
+    grid = [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+    for params in grid:
+        params["hidden"] = tuple(int(size) for size in params["hidden"])
+    if num_trials is not None and num_trials < len(grid):
+        order = np.random.default_rng(seed).permutation(len(grid))[:num_trials]
+        grid = [grid[i] for i in sorted(order)]
+    return grid
+
+
+# ==============================
+# Dane prób
+# ==============================
+def prepare_retail_data(args, directory):
+    """
+    Wczytuje dane RetailNet raz w procesie nadrzędnym i zapisuje tensory
+    (trening, walidacja) do pliku - procesy prób nie czytają parquet ponownie.
+    """
+    from train import hf_login, load_retail_dataset
+
+    if args.data.startswith("hf://") and not resolve_cache(args.data):
+        hf_login()
+    dataset = load_retail_dataset(args.data, argparse.Namespace(sample=args.sample, seed=args.seed, cache=True))
+    (x, y), (val_x, val_y) = holdout_split(dataset.features, dataset.targets, args.val_fraction, args.seed)
+    path = os.path.join(directory, "retail_sweep_data.pt")
+    torch.save({"x": x, "y": y, "val_x": val_x, "val_y": val_y}, path)
+    print(f"Retail data: {len(y)} train / {len(val_y)} validation rows")
+    return path
+
+
+@lru_cache(maxsize=2)
+def load_trial_data(network, source, samples, val_fraction, seed):
+    """
+    Tensory (x, y, val_x, val_y) próby, zapamiętywane w procesie roboczym
+    (kolejne próby w tym samym procesie nie wczytują ani nie generują ich ponownie).
+    """
+    if network == "retail":
+        data = torch.load(source, weights_only=True)
+        return data["x"], data["y"].reshape(-1, 1), data["val_x"], data["val_y"].reshape(-1, 1)
+    from train_personality import SyntheticPersonalityDataset
+
+    train = SyntheticPersonalityDataset(samples, seed=seed)
+    val = SyntheticPersonalityDataset(max(1, int(samples * val_fraction)), seed=[seed, 1])
+    return train.features, train.targets, val.features, val.targets
+
+
+# ==============================
+# Próba
+# ==============================
+def should_prune(curve, reference_curves, warmup_epochs, min_peers=2):
+    """
+    Reguła mediany: strata walidacyjna bieżącej epoki gorsza od mediany strat
+    wcześniejszych prób w tej samej epoce (po warmup_epochs, przy >= min_peers próbach).
+    """
+    epoch = len(curve) - 1
+    if epoch < warmup_epochs:
+        return False
+    peers = [reference[epoch] for reference in reference_curves if len(reference) > epoch]
+    return len(peers) >= min_peers and curve[-1] > statistics.median(peers)
+
+
+def _init_worker(threads):
+    """Inicjalizacja procesu puli: ograniczenie wątków torch oraz BLAS/OpenMP."""
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    torch.set_num_threads(threads)
+
+
+def run_trial(trial_id, params, settings, reference_curves):
+    """
+    Trenuje jedną konfigurację i ocenia ją po każdej epoce.
+
+    Argumenty:
+        params (dict): hidden, lr, batch_size, epochs.
+        settings (dict): network, source, samples, val_fraction, seed, warmup_epochs.
+        reference_curves (list): Krzywe strat walidacyjnych prób zakończonych
+                                 przed startem tej próby (do przycinania).
+
+    Zwraca:
+        dict: Parametry, status ("complete" / "pruned"), metryki najlepszej
+              epoki, krzywa strat i wagi najlepszej epoki (state_dict).
+    """
+    from train import make_batch_loader
+
+    start = time.perf_counter()
+    network = settings["network"]
+    x, y, val_x, val_y = load_trial_data(network, settings["source"], settings["samples"],
+                                         settings["val_fraction"], settings["seed"])
+    torch.manual_seed(settings["seed"])
+    model_class, input_size, _ = NETWORKS[network]
+    model = model_class(input_size, params["hidden"])
+    optimizer = torch.optim.Adam(model.parameters(), lr=params["lr"])
+    criterion = nn.BCEWithLogitsLoss()
+    loader = make_batch_loader(TensorDataset(x, y), params["batch_size"], pin_memory=False)
+    val_loader = make_batch_loader(TensorDataset(val_x, val_y), 8192, shuffle=False, pin_memory=False)
+
+    curve = []
+    best = {"val_loss": float("inf")}
+    status = "complete"
+    for epoch in range(params["epochs"]):
+        model.train()
+        for X_batch, y_batch in loader:
+            optimizer.zero_grad()
+            loss = criterion(model(X_batch), y_batch)
+            loss.backward()
+            optimizer.step()
+
+        val_loss, val_acc = evaluate(model, val_loader, criterion, torch.device("cpu"))
+        curve.append(val_loss)
+        if val_loss < best["val_loss"]:
+            best = {"val_loss": val_loss, "val_accuracy": val_acc, "best_epoch": epoch + 1,
+                    "state": {k: v.clone() for k, v in model.state_dict().items()}}
+        if should_prune(curve, reference_curves, settings["warmup_epochs"]):
+            status = "pruned"
+            break
+
+    return {
+        "trial": trial_id,
+        **params,
+        "status": status,
+        "epochs_run": len(curve),
+        "val_loss": best["val_loss"],
+        "val_accuracy": best["val_accuracy"],
+        "best_epoch": best["best_epoch"],
+        "params": sum(p.numel() for p in model.parameters()),
+        "train_time_s": time.perf_counter() - start,
+        "curve": curve,
+        "state": best["state"],
+    }
+
+
+@torch.inference_mode()
+def measure_latency(model, input_size, rows, repeats=200):
+    """Mediana czasu (µs) jednego przebiegu modelu dla paczki `rows` wierszy."""
+    model.eval()
+    x = torch.rand(rows, input_size)
+    for _ in range(10):
+        model(x)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model(x)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+# ==============================
+# Przebieg przeszukiwania
+# ==============================
+def run_sweep(trials, settings, workers, threads):
+    """
+    Uruchamia próby w puli procesów. Nowa próba startuje, gdy zwolni się miejsce,
+    i dostaje krzywe strat prób zakończonych do tej pory.
+
+    Zwraca:
+        list: Wyniki prób w kolejności zakończenia.
+    """
+    results = []
+    pending = list(enumerate(trials))
+    context = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(threads,)) as pool:
+        running = set()
+        while pending or running:
+            while pending and len(running) < workers:
+                trial_id, params = pending.pop(0)
+                curves = [result["curve"] for result in results]
+                running.add(pool.submit(run_trial, trial_id, params, settings, curves))
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                results.append(result)
+                print(f"[{len(results)}/{len(trials)}] trial {result['trial']} {_describe(result)}: "
+                      f"{result['status']} after {result['epochs_run']} epochs, "
+                      f"val_acc={result['val_accuracy']:.4f} ({result['train_time_s']:.1f}s)")
+    return results
+
+
+def add_latency(results, network, threads):
+    """Dodaje liczbę parametrów i opóźnienia inferencji ukończonym próbom (pomiar kolejny)."""
+    torch.set_num_threads(threads)
+    model_class, input_size, _ = NETWORKS[network]
+    for result in results:
+        state = result.pop("state")
+        if result["status"] != "complete":
+            continue
+        model = model_class(input_size, result["hidden"])
+        model.load_state_dict(state)
+        result["latency_us"] = measure_latency(model, input_size, 1)
+        result["batch_us_per_row"] = measure_latency(model, input_size, LATENCY_BATCH_ROWS, 50) / LATENCY_BATCH_ROWS
+
+
+def leaderboard(results, tolerance):
+    """
+    Ranking ukończonych prób (dokładność malejąco, potem liczba parametrów)
+    i rekomendacja: najmniejszy / najszybszy model w granicy tolerancji od najlepszego.
+
+    Zwraca:
+        tuple: (lista wyników w kolejności rankingu, rekomendowany wynik lub None)
+    """
+    complete = sorted((r for r in results if r["status"] == "complete"),
+                      key=lambda r: (-r["val_accuracy"], r["params"], r["latency_us"]))
+    if not complete:
+        return complete, None
+    threshold = complete[0]["val_accuracy"] - tolerance
+    recommended = min((r for r in complete if r["val_accuracy"] >= threshold),
+                      key=lambda r: (r["params"], r["latency_us"]))
+    return complete, recommended
+
+
+def _describe(result):
+    hidden = ",".join(map(str, result["hidden"]))
+    return f"hidden={hidden} lr={result['lr']:g} batch={result['batch_size']}"
+
+
+def train_command(network, result):
+    """Polecenie pełnego treningu rekomendowanej konfiguracji."""
+    script = NETWORKS[network][2]
+    hidden = ",".join(map(str, result["hidden"]))
+    return (f"python {script} --hidden {hidden} --lr {result['lr']:g} "
+            f"--batch-size {result['batch_size']} --epochs {result['best_epoch']}")
+
+
+def print_leaderboard(ranked, recommended, results):
+    print(f"\n{'#':>3} {'hidden':>8} {'lr':>8} {'batch':>6} {'epochs':>6} {'val_acc':>8} {'val_loss':>8} "
+          f"{'params':>7} {'lat µs':>7} {'µs/row':>7}")
+    for rank, r in enumerate(ranked, 1):
+        marker = " *" if r is recommended else ""
+        print(f"{rank:>3} {','.join(map(str, r['hidden'])):>8} {r['lr']:>8g} {r['batch_size']:>6} "
+              f"{r['best_epoch']:>6} {r['val_accuracy']:>8.4f} {r['val_loss']:>8.4f} {r['params']:>7} "
+              f"{r['latency_us']:>7.1f} {r['batch_us_per_row']:>7.3f}{marker}")
+    pruned = [r for r in results if r["status"] == "pruned"]
+    if pruned:
+        print(f"Pruned: {len(pruned)} trial(s) - " + "; ".join(_describe(r) for r in pruned))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter sweep for RetailNet / PersonalityNet")
+    parser.add_argument("network", choices=sorted(NETWORKS))
+    parser.add_argument("--space", default=None, help="Search space as JSON text or a .json file")
+    parser.add_argument("--trials", type=int, default=None, help="Random subset of the grid (default: all)")
+    parser.add_argument("--threads", type=int, default=1, help="Torch threads per trial")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel trials (default: cores / threads)")
+    parser.add_argument("--warmup-epochs", type=int, default=5, help="Epochs before a trial can be pruned")
+    parser.add_argument("--tolerance", type=float, default=0.005,
+                        help="Accuracy loss accepted for a smaller/faster recommended model")
+    parser.add_argument("--data", default=None,
+                        help="RetailNet parquet or feature cache directory (default: FreshRetailNet-50K)")
+    parser.add_argument("--sample", type=int, default=100000, help="RetailNet rows used (0 = all)")
+    parser.add_argument("--samples", type=int, default=10000, help="PersonalityNet synthetic samples")
+    parser.add_argument("--val-fraction", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Results file (default: sweep_<network>.json)")
+    args = parser.parse_args(argv)
+    if args.workers is None:
+        args.workers = max(1, (os.cpu_count() or 1) // args.threads)
+    args.output = args.output or f"sweep_{args.network}.json"
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    trials = trial_grid(load_space(args.network, args.space), args.trials, args.seed)
+    print(f"Sweeping {args.network}: {len(trials)} trials, {args.workers} worker(s) x {args.threads} thread(s)")
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = None
+        if args.network == "retail":
+            if args.data is None:
+                from retail_data import DATASET_URL
+                args.data = DATASET_URL
+            source = prepare_retail_data(args, directory)
+        settings = {
+            "network": args.network, "source": source, "samples": args.samples,
+            "val_fraction": args.val_fraction, "seed": args.seed, "warmup_epochs": args.warmup_epochs,
+        }
+        start = time.perf_counter()
+        results = run_sweep(trials, settings, args.workers, args.threads)
+        elapsed = time.perf_counter() - start
+
+    add_latency(results, args.network, args.threads)
+    ranked, recommended = leaderboard(results, args.tolerance)
+    print_leaderboard(ranked, recommended, results)
+    print(f"Sweep finished in {elapsed:.1f}s")
+    if recommended is not None:
+        print(f"Recommended (* - smallest within {args.tolerance} accuracy of the best): "
+              f"{train_command(args.network, recommended)}")
+
+    for result in results:
+        result["hidden"] = list(result["hidden"])
+    with open(args.output, "w") as f:
+        json.dump({
+            "args": vars(args),
+            "leaderboard": [r["trial"] for r in ranked],
+            "recommended": None if recommended is None else recommended["trial"],
+            "trials": sorted(results, key=lambda r: r["trial"]),
+        }, f, indent=2)
+    print(f"Saved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
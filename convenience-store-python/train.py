@@ -5,17 +5,62 @@ Skrypt odpowiedzialny za pobieranie danych zewnętrznych (Hugging Face),
 przetwarzanie ich i trening sieci RetailNet.
 Celem jest nauczenie modelu przewidywania, czy klient dokona zakupu
 na podstawie warunków pogodowych i stanu magazynowego.
+
+Tryb strumieniowy (--stream) czyta plik parquet paczkami rekordów
+(tylko potrzebne kolumny), tasuje w buforze o ograniczonym rozmiarze
+i pozwala trenować na całym zbiorze przy stałym zużyciu pamięci:
+    python train.py --data train.parquet --stream --fraction 0.5
+
+Lokalny cache cech (feature_cache.py) - bez sieci i bez przeliczania cech;
+używany automatycznie, gdy jego źródło zgadza się z --data:
+    python feature_cache.py build
+    python train.py --stream
+
+Trening równoległy na wielu rdzeniach CPU (distributed.py):
+    python train.py --data train.parquet --stream --workers 4
+    python train.py --data train.parquet --scaling 1,2,4
+
+Checkpointy, wznawianie, wczesne zatrzymanie i dostrajanie (checkpointing.py):
+    python train.py --resume
+    python train.py --early-stopping 10 --val-fraction 0.1
+    python train.py --data new_data.parquet --warm-start --lr 1e-4 --epochs 20
 """
+import argparse
+import os
+import time
+
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import (
+    Dataset, DataLoader, IterableDataset, TensorDataset, BatchSampler, RandomSampler, SequentialSampler,
+    DistributedSampler, get_worker_info
+)
+from torch.nn.parallel import DistributedDataParallel
 import pandas as pd
 import numpy as np
-from huggingface_hub import login
+import pyarrow as pa
 
-# Logowanie do HuggingFace (wymagane do pobrania prywatnych datasetów, jeśli takie są)
-login("tutaj wpisac klucz API do HuggingFace")
+from checkpointing import (
+    EarlyStopping, add_checkpoint_args, evaluate, holdout_split, load_checkpoint, load_weights, save_checkpoint
+)
+from distributed import all_reduce_sum, join_context, launch, parse_worker_counts, scaling_report, unwrap
+from feature_cache import iter_cache_arrays, open_cache, resolve_cache
+from network import DEFAULT_RETAIL_HIDDEN, parse_hidden_sizes
+from retail_data import (
+    DATASET_URL, TARGET_SOURCE_COLUMN, iter_parquet_arrays, sample_rows, shuffle_buffer, table_to_arrays
+)
+from training_metrics import EpochProfiler, add_profiling_args, format_metrics, record_metrics
+
+
+def hf_login():
+    """
+    Logowanie do HuggingFace (wymagane do pobrania prywatnych datasetów, jeśli takie są).
+    Wywoływane tylko dla ścieżek hf:// - trening z lokalnego pliku działa bez sieci.
+    Token można podać w zmiennej środowiskowej HF_TOKEN.
+    """
+    from huggingface_hub import login
+    login(os.environ.get("HF_TOKEN", "tutaj wpisac klucz API do HuggingFace"))
 
 FEATURE_COLUMNS = [
     "precpt",
@@ -32,8 +77,64 @@ FEATURE_COLUMNS = [
 # --------------------------------------------------------
 class RetailDataset(Dataset):
     """
-    Klasa Dataset dla PyTorch, owijająca ramkę danych Pandas.
-    Przygotowuje wektory cech oraz etykiety (target).
+    Klasa Dataset dla PyTorch, budowana z ramki danych Pandas.
+    Cechy (wraz z uśrednieniem kolumn listowych) oraz etykiety (target)
+    są przeliczane raz, do ciągłych tensorów float32.
+    Indeks może być liczbą lub listą/tensorem indeksów - wtedy zwracana
+    jest cała paczka (używane z BatchSampler, bez sklejania pojedynczych próbek).
+    """
+    def __init__(self, dataframe, feature_columns):
+        self.feature_columns = [c for c in feature_columns if c in dataframe.columns]
+        table = pa.Table.from_pandas(
+            dataframe[self.feature_columns + [TARGET_SOURCE_COLUMN]], preserve_index=False
+        )
+        # Braki danych -> 0, etykieta binarna: 1 jeśli kwota sprzedaży > 0
+        x, y = table_to_arrays(table, self.feature_columns)
+        self.features = torch.from_numpy(x)
+        self.targets = torch.from_numpy(y)
+
+    def __len__(self):
+        return len(self.targets)
+
+    def __getitem__(self, idx):
+        """Zwraca próbkę lub paczkę próbek (features, target)."""
+        return self.features[idx], self.targets[idx]
+
+class CachedRetailDataset(Dataset):
+    """
+    RetailDataset z lokalnego cache cech (feature_cache.py).
+    Tensory wskazują wprost na pliki mapowane w pamięci - bez kopiowania
+    i przeliczania cech; procesy treningowe współdzielą strony pliku.
+    Przy sample > 0 kopiowana jest tylko losowa próbka wierszy.
+    """
+    def __init__(self, cache_dir, sample=0, seed=0):
+        x, y, _ = open_cache(cache_dir)
+        rows = sample_rows(len(y), sample, seed)
+        if rows is not None:
+            x, y = x[rows], y[rows]
+        self.feature_columns = FEATURE_COLUMNS
+        self.features = torch.from_numpy(x)
+        self.targets = torch.from_numpy(y)
+
+    def __len__(self):
+        return len(self.targets)
+
+    def __getitem__(self, idx):
+        return self.features[idx], self.targets[idx]
+
+def make_batch_loader(dataset, batch_size, shuffle=True, pin_memory=True, rank=0, world_size=1):
+    """DataLoader podający całe paczki przez wycinanie tensorów (BatchSampler)."""
+    if world_size > 1:
+        base = DistributedSampler(dataset, num_replicas=world_size, rank=rank, shuffle=shuffle)
+    else:
+        base = RandomSampler(dataset) if shuffle else SequentialSampler(dataset)
+    sampler = BatchSampler(base, batch_size=batch_size, drop_last=False)
+    return DataLoader(dataset, sampler=sampler, batch_size=None, pin_memory=pin_memory)
+
+class LegacyRetailDataset(Dataset):
+    """
+    Poprzednia wersja RetailDataset (iloc na każdą próbkę).
+    Zachowana wyłącznie jako punkt odniesienia dla --benchmark.
     """
     def __init__(self, dataframe, feature_columns):
         self.feature_columns = [c for c in feature_columns if c in dataframe.columns]
@@ -56,80 +157,361 @@ class RetailDataset(Dataset):
         )
         return torch.from_numpy(feature_values), torch.tensor(row["target"], dtype=torch.long)
 
+class StreamingRetailDataset(IterableDataset):
+    """
+    Strumieniowy Dataset dla dużych plików parquet.
+    Zwraca gotowe paczki (features, target) o rozmiarze batch_size,
+    więc DataLoader powinien być tworzony z batch_size=None.
+
+    Argumenty:
+        path (str): Ścieżka pliku parquet (lokalna lub hf://).
+        cache_dir (str): Katalog cache cech (feature_cache.py) czytany zamiast pliku parquet.
+        fraction (float): Odsetek wierszy użytych w epoce (0, 1].
+        shuffle_buffer_size (int): Rozmiar bufora tasującego (w wierszach).
+        read_rows (int): Liczba wierszy czytanych naraz z pliku.
+    """
+    def __init__(self, path, feature_columns, batch_size=2048, fraction=1.0,
+                 shuffle_buffer_size=200_000, read_rows=65536, seed=0, rank=0, world_size=1, cache_dir=None):
+        self.path = path
+        self.cache_dir = cache_dir
+        self.feature_columns = list(feature_columns)
+        self.batch_size = batch_size
+        self.fraction = fraction
+        self.shuffle_buffer_size = shuffle_buffer_size
+        self.read_rows = read_rows
+        self.seed = seed
+        self.rank = rank
+        self.world_size = world_size
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        """Zmienia ziarno tasowania/próbkowania dla kolejnej epoki."""
+        self.epoch = epoch
+
+    def __iter__(self):
+        # Każdy proces (rank) i wątek DataLoadera czyta własne grupy wierszy
+        worker = get_worker_info()
+        worker_id, num_workers = (worker.id, worker.num_workers) if worker else (0, 1)
+        shard_index = self.rank * num_workers + worker_id
+        num_shards = self.world_size * num_workers
+        rng = np.random.default_rng((self.seed, self.epoch, shard_index))
+
+        if self.cache_dir is not None:
+            features, targets, _ = open_cache(self.cache_dir, mmap_mode="r")
+            chunks = iter_cache_arrays(
+                features, targets, batch_rows=self.read_rows, fraction=self.fraction,
+                shard_index=shard_index, num_shards=num_shards, rng=rng,
+            )
+        else:
+            chunks = iter_parquet_arrays(
+                self.path, self.feature_columns, batch_rows=self.read_rows, fraction=self.fraction,
+                shard_index=shard_index, num_shards=num_shards, rng=rng,
+            )
+        if self.shuffle_buffer_size > 0:
+            chunks = shuffle_buffer(chunks, self.shuffle_buffer_size, rng)
+
+        # Dzielenie przetasowanych paczek na paczki treningowe (resztę przenosimy dalej)
+        rest_x = np.empty((0, len(self.feature_columns)), dtype=np.float32)
+        rest_y = np.empty(0, dtype=np.float32)
+        for x, y in chunks:
+            x, y = np.concatenate([rest_x, x]), np.concatenate([rest_y, y])
+            full = len(y) - len(y) % self.batch_size
+            for start in range(0, full, self.batch_size):
+                end = start + self.batch_size
+                yield torch.from_numpy(x[start:end]), torch.from_numpy(y[start:end])
+            rest_x, rest_y = x[full:], y[full:]
+        if len(rest_y):
+            yield torch.from_numpy(rest_x), torch.from_numpy(rest_y)
+
 class RetailNet(nn.Module):
     """
     Definicja modelu używanego w treningu (musi być zgodna z network.py).
     """
-    def __init__(self, input_size):
+    def __init__(self, input_size, hidden_sizes=DEFAULT_RETAIL_HIDDEN):
         super().__init__()
-        self.fc1 = nn.Linear(input_size, 64)
-        self.fc2 = nn.Linear(64, 64)
-        self.fc3 = nn.Linear(64, 1)  # BUY / SKIP
+        hidden1, hidden2 = hidden_sizes
+        self.fc1 = nn.Linear(input_size, hidden1)
+        self.fc2 = nn.Linear(hidden1, hidden2)
+        self.fc3 = nn.Linear(hidden2, 1)  # BUY / SKIP
 
     def forward(self, x):
         x = F.relu(self.fc1(x))
         x = F.relu(self.fc2(x))
         return self.fc3(x)
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train RetailNet on FreshRetailNet-50K")
+    parser.add_argument("--data", default=DATASET_URL,
+                        help="Parquet path (local file or hf:// URL) or a feature_cache.py directory")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="Read the parquet file even if a matching feature cache exists")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream record batches instead of loading the whole file")
+    parser.add_argument("--fraction", type=float, default=1.0,
+                        help="Fraction of rows used per epoch in streaming mode")
+    parser.add_argument("--sample", type=int, default=10000,
+                        help="Rows sampled in in-memory mode (0 = all)")
+    parser.add_argument("--shuffle-buffer", type=int, default=200_000)
+    parser.add_argument("--read-rows", type=int, default=65536)
+    parser.add_argument("--num-workers", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=2048)
+    parser.add_argument("--epochs", type=int, default=250)
+    parser.add_argument("--lr", type=float, default=1e-3, help="Learning rate (use a lower one with --warm-start)")
+    parser.add_argument("--hidden", type=parse_hidden_sizes, default=DEFAULT_RETAIL_HIDDEN,
+                        help="Hidden layer widths, e.g. 64,64 (see sweep.py)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Data-parallel training processes (torch.distributed, gloo)")
+    parser.add_argument("--scaling", default=None,
+                        help="Report scaling efficiency for worker counts, e.g. 1,2,4 (no files saved)")
+    parser.add_argument("--no-save", dest="save", action="store_false",
+                        help="Do not write model and history files")
+    add_profiling_args(parser)
+    add_checkpoint_args(parser, "retail_checkpoint.pt", "retail_ai_full.pth")
+    parser.add_argument("--val-data", default=None,
+                        help="Validation parquet for --early-stopping (required with --stream)")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Only compare data pipeline throughput (legacy vs vectorized dataset)")
+    args = parser.parse_args(argv)
+    if args.early_stopping and args.stream and not args.val_data:
+        parser.error("--early-stopping with --stream needs a held-out --val-data file")
+    if args.resume and args.warm_start:
+        parser.error("--resume and --warm-start are mutually exclusive")
+    return args
+
+def load_retail_dataset(path, args):
+    """
+    RetailDataset z pliku parquet (tylko potrzebne kolumny, opcjonalne próbkowanie --sample)
+    albo CachedRetailDataset, gdy istnieje cache cech dla tego źródła.
+    """
+    cache_dir = resolve_cache(path) if args.cache else None
+    if cache_dir is not None:
+        print(f"Using feature cache {cache_dir}")
+        return CachedRetailDataset(cache_dir, args.sample, args.seed)
+    df = pd.read_parquet(path, columns=FEATURE_COLUMNS + [TARGET_SOURCE_COLUMN])
+
+    # Próbkowanie dla szybszego treningu (opcjonalne; te same wiersze co z cache cech)
+    rows = sample_rows(len(df), args.sample, args.seed)
+    if rows is not None:
+        df = df.iloc[rows]
+    return RetailDataset(df, FEATURE_COLUMNS)
+
+def build_dataloader(args, rank=0, world_size=1):
+    """
+    Tworzy DataLoader w trybie pamięciowym lub strumieniowym.
+    Przy world_size > 1 każdy proces dostaje własny fragment danych
+    (grupy wierszy w strumieniu, DistributedSampler w trybie pamięciowym).
+
+    Zwraca:
+        tuple: (DataLoader treningowy, DataLoader walidacyjny lub None).
+               Walidacja (--early-stopping) to plik --val-data albo odłożona
+               część danych (--val-fraction); każdy proces ocenia cały zbiór.
+    """
+    val_loader = None
+    if args.early_stopping and args.val_data:
+        val_dataset = load_retail_dataset(args.val_data, args)
+        val_loader = make_batch_loader(val_dataset, args.batch_size, shuffle=False, pin_memory=False)
+
+    if args.stream:
+        dataset = StreamingRetailDataset(
+            args.data, FEATURE_COLUMNS, batch_size=args.batch_size, fraction=args.fraction,
+            shuffle_buffer_size=args.shuffle_buffer, read_rows=args.read_rows, seed=args.seed,
+            rank=rank, world_size=world_size, cache_dir=resolve_cache(args.data) if args.cache else None,
+        )
+        return DataLoader(dataset, batch_size=None, num_workers=args.num_workers, pin_memory=True), val_loader
+
+    dataset = load_retail_dataset(args.data, args)
+    if args.early_stopping and val_loader is None:
+        # Ten sam podział we wszystkich procesach (stałe ziarno)
+        (dataset.features, dataset.targets), val = holdout_split(
+            dataset.features, dataset.targets, args.val_fraction, args.seed)
+        val_loader = make_batch_loader(TensorDataset(*val), args.batch_size, shuffle=False, pin_memory=False)
+    return make_batch_loader(dataset, args.batch_size, rank=rank, world_size=world_size), val_loader
+
+def benchmark_datasets(df, batch_size=2048, epochs=3):
+    """
+    Porównuje przepustowość potoku danych (próbki/s) starego i nowego RetailDataset.
+    Mierzony jest tylko odczyt paczek, bez obliczeń modelu.
+    """
+    def measure(loader):
+        start = time.perf_counter()
+        samples = 0
+        for _ in range(epochs):
+            for X_batch, _ in loader:
+                samples += X_batch.size(0)
+        return samples / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    legacy = LegacyRetailDataset(df, FEATURE_COLUMNS)
+    legacy_init = time.perf_counter() - start
+    legacy_rate = measure(DataLoader(legacy, batch_size=batch_size, shuffle=True))
+
+    start = time.perf_counter()
+    dataset = RetailDataset(df, FEATURE_COLUMNS)
+    vector_init = time.perf_counter() - start
+    vector_rate = measure(make_batch_loader(dataset, batch_size, pin_memory=False))
+
+    print(f"Rows: {len(df)} | batch size: {batch_size} | epochs: {epochs}")
+    print(f"Legacy (iloc per row): init {legacy_init * 1000:.1f} ms | {legacy_rate:,.0f} samples/s")
+    print(f"Vectorized (tensor slicing): init {vector_init * 1000:.1f} ms | {vector_rate:,.0f} samples/s")
+    print(f"Speedup: {vector_rate / legacy_rate:.1f}x")
+
+def main(argv=None):
     """Główna funkcja treningowa."""
+    args = parse_args(argv)
+
     print("\nLoading dataset...")
-    # Pobieranie datasetu z Hugging Face
-    df = pd.read_parquet("hf://datasets/Dingdong-Inc/FreshRetailNet-50K/data/train.parquet")
+    if args.data.startswith("hf://") and not (args.cache and resolve_cache(args.data)):
+        # Pobieranie datasetu z Hugging Face (cache cech nie wymaga sieci)
+        hf_login()
 
-    # Próbkowanie dla szybszego treningu (opcjonalne)
-    df = df.sample(10000)
+    if args.benchmark:
+        df = pd.read_parquet(args.data, columns=FEATURE_COLUMNS + [TARGET_SOURCE_COLUMN])
+        rows = sample_rows(len(df), args.sample, args.seed)
+        if rows is not None:
+            df = df.iloc[rows]
+        benchmark_datasets(df, args.batch_size)
+        return
 
-    dataset = RetailDataset(df, FEATURE_COLUMNS)
-    dataloader = DataLoader(
-        dataset,
-        batch_size=2048,
-        shuffle=True,
-        num_workers=0,
-        pin_memory=True
-    )
+    if args.scaling:
+        scaling_report(run, args, parse_worker_counts(args.scaling), "retail_scaling.json")
+        return
+
+    launch(run, args.workers, args)
 
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    print("Using device:", device)
+def run(rank, world_size, args):
+    """
+    Trening w jednym procesie. Przy world_size > 1 dane są dzielone między
+    procesy, a gradienty synchronizowane przez DistributedDataParallel;
+    tylko proces rank 0 wypisuje postęp i zapisuje pliki.
+
+    Zwraca:
+        dict: Przepustowość treningu (samples_per_sec) i czas epoki.
+    """
+    is_main = rank == 0
+    dataloader, val_loader = build_dataloader(args, rank, world_size)
 
-    model = RetailNet(len(FEATURE_COLUMNS)).to(device)
-    optimizer = torch.optim.Adam(model.parameters(), lr=1e-3)
+    # Tryb rozproszony działa na CPU (gloo)
+    use_cuda = torch.cuda.is_available() and world_size == 1
+    device = torch.device("cuda" if use_cuda else "cpu")
+    if is_main:
+        print("Using device:", device, f"| workers: {world_size}")
+
+    torch.manual_seed(args.seed)
+    model = RetailNet(len(FEATURE_COLUMNS), args.hidden).to(device)
+    if args.warm_start:
+        # Dostrajanie istniejącego modelu zamiast losowej inicjalizacji
+        load_weights(model, args.warm_start, device)
+        if is_main:
+            print(f"Warm start from {args.warm_start}")
+    optimizer = torch.optim.Adam(model.parameters(), lr=args.lr)
     criterion = nn.BCEWithLogitsLoss()
+    early_stopping = EarlyStopping(args.early_stopping, args.min_delta) if val_loader is not None else None
 
-    NUM_EPOCHS = 250
+    NUM_EPOCHS = args.epochs
 
-    
+    start_epoch = 0
     history = {"loss": [], "accuracy": []}
+    if args.resume:
+        if os.path.exists(args.checkpoint):
+            start_epoch, history = load_checkpoint(args.checkpoint, model, optimizer, device, early_stopping)
+            if is_main:
+                print(f"Resumed from {args.checkpoint} after epoch {start_epoch}")
+        elif is_main:
+            print(f"Checkpoint {args.checkpoint} not found, training from scratch")
+    if world_size > 1:
+        model = DistributedDataParallel(model)
+    profiler = EpochProfiler(
+        enabled=args.profile, device=device,
+        trace_steps=args.trace_steps if is_main else None,
+        trace_path=args.trace_path or "retail_trace.json",
+    )
+    train_time = 0.0
+    train_samples = 0
+    completed = start_epoch
     
     # Pętla treningowa
-    for epoch in range(NUM_EPOCHS):
+    for epoch in range(start_epoch, NUM_EPOCHS):
+        if isinstance(dataloader.dataset, StreamingRetailDataset):
+            dataloader.dataset.set_epoch(epoch)
+        if isinstance(getattr(dataloader.sampler, "sampler", None), DistributedSampler):
+            dataloader.sampler.sampler.set_epoch(epoch)
         model.train()
         total_loss = 0
         correct = 0
         total = 0
+        epoch_start = time.perf_counter()
+        profiler.start_epoch()
+
+        with join_context(model):
+            for X_batch, y_batch in profiler.iterate(dataloader):
+                X_batch = X_batch.to(device)
+                y_batch = y_batch.to(device).float().unsqueeze(1)
+
+                optimizer.zero_grad()
+                with profiler.phase("forward"):
+                    logits = model(X_batch)
+                    loss = criterion(logits, y_batch)
+                with profiler.phase("backward"):
+                    loss.backward()
+                with profiler.phase("optimizer"):
+                    optimizer.step()
+                profiler.step()
+
+                preds = (torch.sigmoid(logits) > 0.5).float()
+                total_loss += loss.item() * X_batch.size(0)
+                correct += (preds == y_batch).sum().item()
+                total += X_batch.size(0)
+
+        # Metryki sumowane ze wszystkich procesów
+        total_loss, correct, total = all_reduce_sum([total_loss, correct, total])
+        train_time += time.perf_counter() - epoch_start
+        train_samples += total
+        metrics = profiler.end_epoch(total)
 
-        for X_batch, y_batch in dataloader:
-            X_batch = X_batch.to(device)
-            y_batch = y_batch.to(device).float().unsqueeze(1)
-
-            optimizer.zero_grad()
-            logits = model(X_batch)
-            loss = criterion(logits, y_batch)
-            loss.backward()
-            optimizer.step()
-
-            preds = (torch.sigmoid(logits) > 0.5).float()
-            total_loss += loss.item() * X_batch.size(0)
-            correct += (preds == y_batch).sum().item()
-            total += X_batch.size(0)
-            
         epoch_loss = total_loss/total
         epoch_acc = correct/total
         history["loss"].append(epoch_loss)
         history["accuracy"].append(epoch_acc)
+        record_metrics(history, metrics)
+
+        # Walidacja na odłożonych danych (każdy proces liczy to samo, więc decyzja jest wspólna)
+        stop = False
+        val_info = ""
+        if early_stopping is not None:
+            val_loss, val_acc = evaluate(unwrap(model), val_loader, criterion, device)
+            history.setdefault("val_loss", []).append(val_loss)
+            history.setdefault("val_accuracy", []).append(val_acc)
+            stop = early_stopping.step(val_loss, unwrap(model), epoch + 1)
+            val_info = f" | val_loss={val_loss:.4f} | val_acc={val_acc:.4f}"
+        completed = epoch + 1
+
+        if is_main:
+            print(f"Epoch {epoch+1}: loss={epoch_loss:.4f} | acc={epoch_acc:.4f}{val_info}{format_metrics(metrics)}")
+            if args.save and args.checkpoint_every and completed % args.checkpoint_every == 0:
+                save_checkpoint(args.checkpoint, unwrap(model), optimizer, completed, history, early_stopping, args.seed)
+        if stop:
+            if is_main:
+                print(f"Early stopping after epoch {completed}: best val_loss={early_stopping.best_loss:.4f} "
+                      f"at epoch {early_stopping.best_epoch}")
+            break
+
+    profiler.close()
+
+    result = {
+        "samples_per_sec": train_samples / train_time if train_time else 0.0,
+        "epoch_time_s": train_time / max(1, completed - start_epoch),
+    }
+    if not is_main or not args.save:
+        return result
+
+    model = unwrap(model)
+    # Checkpoint końcowy (dalszy trening: --resume --epochs N), potem najlepsze wagi do zapisu modelu
+    save_checkpoint(args.checkpoint, model, optimizer, completed, history, early_stopping, args.seed)
+    print(f"Saved checkpoint to {args.checkpoint}")
+    if early_stopping is not None:
+        early_stopping.restore_best(model)
 
-        print(f"Epoch {epoch+1}: loss={epoch_loss:.4f} | acc={epoch_acc:.4f}")
-        
     # Zapis historii treningu
     import json
     with open("retail_history.json", "w") as f:
@@ -163,6 +545,7 @@ def main():
         prob = torch.sigmoid(logits).item()
         print(f"Sample test probability: {prob:.4f}")
         print("Prediction:", "BUY" if prob > 0.5 else "SKIP")
+    return result
 
 if __name__ == "__main__":
     main()
@@ -5,117 +5,337 @@ Skrypt odpowiedzialny za generowanie syntetycznych danych osobowościowych
 i trening sieci neuronowej PersonalityNet.
 Model uczy się korygować bazową chęć zakupu w oparciu o cechy psychologiczne:
 impulsywność, szczodrość oraz flagę produktu impulsowego.
+
+Checkpointy, wznawianie, wczesne zatrzymanie i dostrajanie (checkpointing.py):
+    python train_personality.py --resume
+    python train_personality.py --early-stopping 5
+    python train_personality.py --warm-start --lr 1e-4 --epochs 10
 """
+import argparse
+import os
+import time
+
 import torch
 import torch.nn as nn
 import torch.optim as optim
 import numpy as np
-from torch.utils.data import Dataset, DataLoader
-from network import PersonalityNet, PERSONALITY_COLUMNS, device
+from torch.utils.data import (
+    Dataset, DataLoader, IterableDataset, BatchSampler, RandomSampler, SequentialSampler, DistributedSampler,
+    get_worker_info
+)
+from torch.nn.parallel import DistributedDataParallel
+from checkpointing import (
+    EarlyStopping, add_checkpoint_args, checkpoint_seed, evaluate, load_checkpoint, load_weights, save_checkpoint
+)
+from distributed import all_reduce_sum, join_context, launch, parse_worker_counts, scaling_report, unwrap
+from training_metrics import EpochProfiler, add_profiling_args, format_metrics, record_metrics
+from network import PersonalityNet, PERSONALITY_COLUMNS, DEFAULT_PERSONALITY_HIDDEN, device, parse_hidden_sizes
+
+DECISION_THRESHOLD = 1.2
+NOISE_STD = 0.1
+
+def personality_score(base_buy_probs, impulsiveness, generosity, is_impulse):
+    """
+    Deterministyczna część reguły decyzyjnej (bez szumu), liczona wektorowo.
+    Zakup następuje, gdy score + szum > DECISION_THRESHOLD.
+    """
+    # Prosta logika symulująca decyzję
+    score = base_buy_probs * 2.0
+    # Produkty impulsowe trudniej kupić, chyba że jest się impulsywnym
+    score = score + np.where(is_impulse > 0.5, -1.0 + impulsiveness * 2.5, 0.0)
+    # Szczodrość lekko zwiększa szansę zakupu
+    return score + generosity * 0.3
+
+def generate_personality_batch(num_samples, rng):
+    """
+    Generuje paczkę syntetycznych próbek.
+
+    Argumenty:
+        num_samples (int): Liczba próbek.
+        rng (np.random.Generator): Generator liczb losowych (powtarzalność wyników).
+
+    Zwraca:
+        (np.ndarray, np.ndarray): Cechy (n, 4) w kolejności PERSONALITY_COLUMNS
+                                  oraz etykiety (n, 1), oba float32.
+    """
+    x = np.empty((num_samples, 4), dtype=np.float32)
+    x[:, 0] = rng.random(num_samples, dtype=np.float32)     # base_buy_prob
+    x[:, 1] = rng.random(num_samples, dtype=np.float32)     # impulsiveness
+    x[:, 2] = rng.random(num_samples, dtype=np.float32)     # generosity
+    x[:, 3] = rng.integers(0, 2, num_samples)               # is_impulse
+
+    score = personality_score(x[:, 0], x[:, 1], x[:, 2], x[:, 3])
+    # Szum losowy i próg decyzyjny
+    score += rng.normal(0, NOISE_STD, num_samples)
+    y = (score > DECISION_THRESHOLD).astype(np.float32).reshape(-1, 1)
+    return x, y
 
 class SyntheticPersonalityDataset(Dataset):
     """
     Syntetyczny zbiór danych do treningu sieci osobowości.
     Symuluje wpływ cech charakteru na decyzję zakupową.
+    Dane są generowane raz (wektorowo) i przechowywane jako tensory;
+    indeks może być listą indeksów (paczka przez BatchSampler).
     """
-    def __init__(self, num_samples=10000):
+    def __init__(self, num_samples=10000, seed=None):
         self.num_samples = num_samples
-        
-        # Generowanie losowych cech
-        self.base_buy_probs = np.random.rand(num_samples).astype(np.float32)
-        self.impulsiveness = np.random.rand(num_samples).astype(np.float32)
-        self.generosity = np.random.rand(num_samples).astype(np.float32)
-        self.is_impulse = np.random.randint(0, 2, num_samples).astype(np.float32)
-        
-        self.targets = []
-        for i in range(num_samples):
-            # Prosta logika symulująca decyzję
-            score = self.base_buy_probs[i] * 2.0
-            
-            # Produkty impulsowe trudniej kupić, chyba że jest się impulsywnym
-            if self.is_impulse[i] > 0.5:
-                score -= 1.0
-                score += self.impulsiveness[i] * 2.5
-            else:
-                score += 0.0
-            
-            # Szczodrość lekko zwiększa szansę zakupu
-            score += self.generosity[i] * 0.3
-            
-            # Szum losowy
-            score += np.random.normal(0, 0.1)
-            
-            # Próg decyzyjny
-            buy = 1 if score > 1.2 else 0
-            self.targets.append(buy)
-            
-        self.targets = np.array(self.targets, dtype=np.float32)
+        x, y = generate_personality_batch(num_samples, np.random.default_rng(seed))
+        self.features = torch.from_numpy(x)
+        self.targets = torch.from_numpy(y)
 
     def __len__(self):
         return self.num_samples
 
     def __getitem__(self, idx):
-        """Pobranie próbki wektora cech osobowościowych."""
-        x = np.array([
-            self.base_buy_probs[idx],
-            self.impulsiveness[idx],
-            self.generosity[idx],
-            self.is_impulse[idx]
-        ], dtype=np.float32)
-        
-        y = np.array([self.targets[idx]], dtype=np.float32)
-        
-        return torch.from_numpy(x), torch.from_numpy(y)
+        """Pobranie próbki (lub paczki) wektora cech osobowościowych."""
+        return self.features[idx], self.targets[idx]
+
+class SyntheticPersonalityStream(IterableDataset):
+    """
+    Strumień syntetycznych paczek generowanych w locie (stała pamięć).
+    Każda epoka (set_epoch) i każdy wątek DataLoadera mają własne ziarno,
+    więc dane są świeże w każdej epoce, a wyniki powtarzalne.
+    DataLoader należy tworzyć z batch_size=None.
+    """
+    def __init__(self, samples_per_epoch, batch_size=64, seed=0, rank=0, world_size=1):
+        self.samples_per_epoch = samples_per_epoch
+        self.batch_size = batch_size
+        self.seed = seed
+        self.rank = rank
+        self.world_size = world_size
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __iter__(self):
+        worker = get_worker_info()
+        worker_id, num_workers = (worker.id, worker.num_workers) if worker else (0, 1)
+        shard_index = self.rank * num_workers + worker_id
+        num_shards = self.world_size * num_workers
+        rng = np.random.default_rng((self.seed, self.epoch, shard_index))
+
+        # Podział próbek epoki między procesy i wątki
+        remaining = self.samples_per_epoch // num_shards
+        if shard_index < self.samples_per_epoch % num_shards:
+            remaining += 1
+        while remaining > 0:
+            n = min(self.batch_size, remaining)
+            x, y = generate_personality_batch(n, rng)
+            remaining -= n
+            yield torch.from_numpy(x), torch.from_numpy(y)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train PersonalityNet on synthetic data")
+    parser.add_argument("--samples", type=int, default=10000, help="Samples per epoch")
+    parser.add_argument("--stream", action="store_true",
+                        help="Generate batches on the fly (fresh sample every epoch, bounded memory)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--epochs", type=int, default=100)
+    parser.add_argument("--lr", type=float, default=0.001, help="Learning rate (use a lower one with --warm-start)")
+    parser.add_argument("--hidden", type=parse_hidden_sizes, default=DEFAULT_PERSONALITY_HIDDEN,
+                        help="Hidden layer widths, e.g. 32,16 (see sweep.py)")
+    parser.add_argument("--num-workers", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Data seed (random by default, stored in the checkpoint and reused by --resume)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Data-parallel training processes (torch.distributed, gloo)")
+    parser.add_argument("--scaling", default=None,
+                        help="Report scaling efficiency for worker counts, e.g. 1,2,4 (no files saved)")
+    parser.add_argument("--no-save", dest="save", action="store_false",
+                        help="Do not write model and history files")
+    add_profiling_args(parser)
+    add_checkpoint_args(parser, "personality_checkpoint.pt", "personality_model.pth")
+    args = parser.parse_args(argv)
+    if args.resume and args.warm_start:
+        parser.error("--resume and --warm-start are mutually exclusive")
+    if args.seed is None and args.resume:
+        # Wznowienie na tych samych danych - inaczej best_loss z checkpointu
+        # pochodzi z innego zbioru walidacyjnego niż kolejne epoki
+        args.seed = checkpoint_seed(args.checkpoint)
+        if args.seed is None and args.early_stopping and os.path.exists(args.checkpoint):
+            parser.error(f"{args.checkpoint} has no data seed; pass the original --seed to resume with --early-stopping")
+    if args.seed is None:
+        # Ziarno zapisywane w checkpoincie; wszystkie procesy (--workers) generują ten sam zbiór / rozłączne strumienie
+        args.seed = int(np.random.SeedSequence().entropy % 2**32)
+    return args
 
-def main():
+def build_dataloader(args, rank=0, world_size=1):
+    """
+    Tworzy DataLoader dla stałego zbioru lub strumienia syntetycznego.
+    Przy world_size > 1 każdy proces dostaje własny fragment danych.
+
+    Zwraca:
+        tuple: (DataLoader treningowy, DataLoader walidacyjny lub None).
+               Zbiór walidacyjny (--early-stopping) to osobno wygenerowane próbki
+               (samples * val_fraction) z niezależnego ziarna.
+    """
+    val_loader = None
+    if args.early_stopping:
+        val_dataset = SyntheticPersonalityDataset(max(1, int(args.samples * args.val_fraction)), seed=[args.seed, 1])
+        val_sampler = BatchSampler(SequentialSampler(val_dataset), batch_size=1024, drop_last=False)
+        val_loader = DataLoader(val_dataset, sampler=val_sampler, batch_size=None)
+
+    if args.stream:
+        dataset = SyntheticPersonalityStream(args.samples, batch_size=args.batch_size, seed=args.seed,
+                                             rank=rank, world_size=world_size)
+        return DataLoader(dataset, batch_size=None, num_workers=args.num_workers), val_loader
+
+    dataset = SyntheticPersonalityDataset(num_samples=args.samples, seed=args.seed)
+    if world_size > 1:
+        base = DistributedSampler(dataset, num_replicas=world_size, rank=rank, shuffle=True)
+    else:
+        base = RandomSampler(dataset)
+    sampler = BatchSampler(base, batch_size=args.batch_size, drop_last=False)
+    return DataLoader(dataset, sampler=sampler, batch_size=None, num_workers=args.num_workers), val_loader
+
+def main(argv=None):
     """Główna pętla treningowa."""
-    print("Generating synthetic data...")
-    dataset = SyntheticPersonalityDataset(num_samples=10000)
-    dataloader = DataLoader(dataset, batch_size=64, shuffle=True)
-    
-    model = PersonalityNet(len(PERSONALITY_COLUMNS)).to(device)
-    optimizer = optim.Adam(model.parameters(), lr=0.001)
+    args = parse_args(argv)
+
+    if args.scaling:
+        scaling_report(run, args, parse_worker_counts(args.scaling), "personality_scaling.json")
+        return
+
+    launch(run, args.workers, args)
+
+def run(rank, world_size, args):
+    """
+    Trening w jednym procesie (rank). Przy world_size > 1 gradienty są
+    synchronizowane przez DistributedDataParallel, a pliki zapisuje tylko rank 0.
+
+    Zwraca:
+        dict: Przepustowość treningu (samples_per_sec) i czas epoki.
+    """
+    is_main = rank == 0
+    torch.manual_seed(args.seed)
+
+    if is_main:
+        print("Generating synthetic data...")
+    dataloader, val_loader = build_dataloader(args, rank, world_size)
+
+    # Tryb rozproszony działa na CPU (gloo)
+    train_device = device if world_size == 1 else torch.device("cpu")
+    model = PersonalityNet(len(PERSONALITY_COLUMNS), args.hidden).to(train_device)
+    if args.warm_start:
+        # Dostrajanie istniejącego modelu zamiast losowej inicjalizacji
+        load_weights(model, args.warm_start, train_device)
+        if is_main:
+            print(f"Warm start from {args.warm_start}")
+    optimizer = optim.Adam(model.parameters(), lr=args.lr)
     criterion = nn.BCEWithLogitsLoss()
-    
-    
+    early_stopping = EarlyStopping(args.early_stopping, args.min_delta) if val_loader is not None else None
+
+    start_epoch = 0
     history = {"loss": [], "accuracy": []}
+    if args.resume:
+        if os.path.exists(args.checkpoint):
+            start_epoch, history = load_checkpoint(args.checkpoint, model, optimizer, train_device, early_stopping)
+            if is_main:
+                print(f"Resumed from {args.checkpoint} after epoch {start_epoch}")
+        elif is_main:
+            print(f"Checkpoint {args.checkpoint} not found, training from scratch")
+    if world_size > 1:
+        model = DistributedDataParallel(model)
+    profiler = EpochProfiler(
+        enabled=args.profile, device=train_device,
+        trace_steps=args.trace_steps if is_main else None,
+        trace_path=args.trace_path or "personality_trace.json",
+    )
+    train_time = 0.0
+    train_samples = 0
+    completed = start_epoch
     
-    print("Training PersonalityNet...")
-    for epoch in range(100):
+    if is_main:
+        print(f"Training PersonalityNet... (workers: {world_size})")
+    for epoch in range(start_epoch, args.epochs):
+        if isinstance(dataloader.dataset, SyntheticPersonalityStream):
+            dataloader.dataset.set_epoch(epoch)
+        if isinstance(getattr(dataloader.sampler, "sampler", None), DistributedSampler):
+            dataloader.sampler.sampler.set_epoch(epoch)
         model.train()
         total_loss = 0
         correct = 0
         total = 0
+        epoch_start = time.perf_counter()
+        profiler.start_epoch()
         
-        for X_batch, y_batch in dataloader:
-            X_batch = X_batch.to(device)
-            y_batch = y_batch.to(device)
-            
-            optimizer.zero_grad()
-            logits = model(X_batch)
-            loss = criterion(logits, y_batch)
-            loss.backward()
-            optimizer.step()
-            
-            preds = (torch.sigmoid(logits) > 0.5).float()
-            total_loss += loss.item() * X_batch.size(0)
-            correct += (preds == y_batch).sum().item()
-            total += X_batch.size(0)
+        with join_context(model):
+            for X_batch, y_batch in profiler.iterate(dataloader):
+                X_batch = X_batch.to(train_device)
+                y_batch = y_batch.to(train_device)
+
+                optimizer.zero_grad()
+                with profiler.phase("forward"):
+                    logits = model(X_batch)
+                    loss = criterion(logits, y_batch)
+                with profiler.phase("backward"):
+                    loss.backward()
+                with profiler.phase("optimizer"):
+                    optimizer.step()
+                profiler.step()
+
+                preds = (torch.sigmoid(logits) > 0.5).float()
+                total_loss += loss.item() * X_batch.size(0)
+                correct += (preds == y_batch).sum().item()
+                total += X_batch.size(0)
+
+        # Metryki sumowane ze wszystkich procesów
+        total_loss, correct, total = all_reduce_sum([total_loss, correct, total])
+        train_time += time.perf_counter() - epoch_start
+        train_samples += total
+        metrics = profiler.end_epoch(total)
             
         epoch_loss = total_loss/total
         epoch_acc = correct/total
         history["loss"].append(epoch_loss)
         history["accuracy"].append(epoch_acc)
+        record_metrics(history, metrics)
+        
+        # Walidacja na osobnym zbiorze (każdy proces liczy to samo, więc decyzja jest wspólna)
+        stop = False
+        val_info = ""
+        if early_stopping is not None:
+            val_loss, val_acc = evaluate(unwrap(model), val_loader, criterion, train_device)
+            history.setdefault("val_loss", []).append(val_loss)
+            history.setdefault("val_accuracy", []).append(val_acc)
+            stop = early_stopping.step(val_loss, unwrap(model), epoch + 1)
+            val_info = f", Val Loss = {val_loss:.4f}, Val Acc = {val_acc:.4f}"
+        completed = epoch + 1
         
-        print(f"Epoch {epoch+1}: Loss = {epoch_loss:.4f}, Acc = {epoch_acc:.4f}")
+        if is_main:
+            print(f"Epoch {epoch+1}: Loss = {epoch_loss:.4f}, Acc = {epoch_acc:.4f}{val_info}{format_metrics(metrics)}")
+            if args.save and args.checkpoint_every and completed % args.checkpoint_every == 0:
+                save_checkpoint(args.checkpoint, unwrap(model), optimizer, completed, history, early_stopping, args.seed)
+        if stop:
+            if is_main:
+                print(f"Early stopping after epoch {completed}: best val loss {early_stopping.best_loss:.4f} "
+                      f"at epoch {early_stopping.best_epoch}")
+            break
+
+    profiler.close()
+
+    result = {
+        "samples_per_sec": train_samples / train_time if train_time else 0.0,
+        "epoch_time_s": train_time / max(1, completed - start_epoch),
+    }
+    if not is_main or not args.save:
+        return result
+
+    # Checkpoint końcowy (dalszy trening: --resume --epochs N), potem najlepsze wagi do zapisu modelu
+    save_checkpoint(args.checkpoint, unwrap(model), optimizer, completed, history, early_stopping, args.seed)
+    print(f"Saved checkpoint to {args.checkpoint}")
+    if early_stopping is not None:
+        early_stopping.restore_best(unwrap(model))
         
     import json
     with open("personality_history.json", "w") as f:
         json.dump(history, f)
     print("Saved training history to personality_history.json")
         
-    torch.save(model.state_dict(), "personality_model.pth")
+    torch.save(unwrap(model).state_dict(), "personality_model.pth")
     print("Saved personality_model.pth")
+    return result
 
 if __name__ == "__main__":
     main()
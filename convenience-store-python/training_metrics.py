@@ -0,0 +1,188 @@
+"""
+Metryki Wydajności Treningu
+---------------------------
+Opcjonalna instrumentacja pętli treningowych (train.py, train_personality.py).
+
+Dla każdej epoki mierzone są: czas epoki, liczba próbek na sekundę,
+czas oczekiwania na DataLoader oraz czasy forward / backward / optimizer,
+a także szczytowe zużycie pamięci. Opcjonalnie zapisywany jest ślad
+torch.profiler (format Chrome trace) dla wybranego zakresu kroków.
+
+Wyłączony profiler nie mierzy niczego (puste konteksty), więc pętla
+treningowa działa bez narzutu.
+"""
+import contextlib
+import os
+import time
+
+import torch
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PHASES = ("data", "forward", "backward", "optimizer")
+HISTORY_KEYS = ("epoch_time_s", "samples_per_sec") + tuple(f"{p}_time_s" for p in PHASES) + ("peak_memory_mb",)
+
+
+def parse_step_range(text):
+    """Parsuje zakres kroków "START:END" (END wyłącznie)."""
+    start, end = (int(part) for part in text.split(":", 1))
+    if end <= start:
+        raise ValueError("trace step range must be START:END with END > START")
+    return start, end
+
+
+def peak_memory_mb(device):
+    """Szczytowa pamięć: zaalokowana na GPU lub maksymalny RSS procesu (CPU)."""
+    if device.type == "cuda":
+        return torch.cuda.max_memory_allocated(device) / 2**20
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux zwraca KB, macOS bajty
+    return rss / 2**20 if os.uname().sysname == "Darwin" else rss / 2**10
+
+
+class EpochProfiler:
+    """
+    Pomiar czasów faz treningu.
+
+    Argumenty:
+        enabled (bool): Czy mierzyć (False = brak narzutu).
+        device (torch.device): Urządzenie treningu (synchronizacja CUDA, pamięć).
+        trace_steps (tuple): Zakres globalnych kroków (start, end) dla torch.profiler.
+        trace_path (str): Plik śladu (Chrome trace JSON).
+    """
+    def __init__(self, enabled=False, device=torch.device("cpu"), trace_steps=None,
+                 trace_path="training_trace.json"):
+        self.enabled = enabled
+        self.device = device
+        self.trace_path = trace_path
+        self.step_count = 0
+        self._times = dict.fromkeys(PHASES, 0.0)
+        self._epoch_start = None
+        self._profiler = None
+
+        if trace_steps is not None:
+            start, end = trace_steps
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if device.type == "cuda":
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self._profiler = torch.profiler.profile(
+                activities=activities,
+                schedule=torch.profiler.schedule(wait=max(0, start - 1), warmup=min(1, start),
+                                                 active=end - start, repeat=1),
+                on_trace_ready=self._save_trace,
+                record_shapes=True,
+                profile_memory=True,
+            )
+            self._profiler.start()
+
+    def _save_trace(self, profiler):
+        profiler.export_chrome_trace(self.trace_path)
+        print(f"Saved profiler trace to {self.trace_path}")
+
+    def _sync(self):
+        if self.device.type == "cuda":
+            torch.cuda.synchronize(self.device)
+
+    def start_epoch(self):
+        if not self.enabled:
+            return
+        self._times = dict.fromkeys(PHASES, 0.0)
+        if self.device.type == "cuda":
+            torch.cuda.reset_peak_memory_stats(self.device)
+        self._epoch_start = time.perf_counter()
+
+    def iterate(self, dataloader):
+        """Iteruje po DataLoaderze, mierząc czas oczekiwania na paczkę."""
+        iterator = iter(dataloader)
+        while True:
+            start = time.perf_counter() if self.enabled else None
+            try:
+                batch = next(iterator)
+            except StopIteration:
+                return
+            if self.enabled:
+                self._times["data"] += time.perf_counter() - start
+            yield batch
+
+    @contextlib.contextmanager
+    def _timed(self, name):
+        self._sync()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._sync()
+            self._times[name] += time.perf_counter() - start
+
+    def phase(self, name):
+        """Kontekst mierzący fazę ("forward", "backward", "optimizer")."""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._timed(name)
+
+    def step(self):
+        """Koniec kroku treningowego (licznik kroków i harmonogram profilera)."""
+        self.step_count += 1
+        if self._profiler is not None:
+            self._profiler.step()
+
+    def end_epoch(self, samples):
+        """
+        Zwraca metryki epoki (puste, gdy instrumentacja jest wyłączona).
+
+        Argumenty:
+            samples (int): Liczba próbek przetworzonych w epoce.
+        """
+        if not self.enabled:
+            return {}
+        elapsed = time.perf_counter() - self._epoch_start
+        metrics = {
+            "epoch_time_s": elapsed,
+            "samples_per_sec": samples / elapsed if elapsed else 0.0,
+            **{f"{name}_time_s": value for name, value in self._times.items()},
+            "peak_memory_mb": peak_memory_mb(self.device),
+        }
+        return metrics
+
+    def close(self):
+        if self._profiler is not None:
+            self._profiler.stop()
+            self._profiler = None
+
+
+def record_metrics(history, metrics):
+    """
+    Dopisuje metryki epoki do historii (po dopisaniu history["loss"] tej epoki).
+    Serie HISTORY_KEYS mają zawsze długość history["loss"] - epoki bez
+    instrumentacji (np. sprzed --resume z --profile) mają wartość None.
+    """
+    epochs = len(history["loss"])
+    for key in HISTORY_KEYS:
+        if key not in metrics and key not in history:
+            continue
+        series = history.setdefault(key, [])
+        series.extend([None] * (epochs - 1 - len(series)))
+        series.append(metrics.get(key))
+
+
+def add_profiling_args(parser):
+    """Wspólne argumenty CLI instrumentacji."""
+    parser.add_argument("--profile", action="store_true",
+                        help="Record per-epoch timing, throughput and peak memory in the history file")
+    parser.add_argument("--trace-steps", type=parse_step_range, default=None,
+                        help="Capture a torch profiler trace for global steps START:END")
+    parser.add_argument("--trace-path", default=None, help="Chrome trace output file")
+
+
+def format_metrics(metrics):
+    """Krótki opis metryk epoki do wypisania w konsoli."""
+    if not metrics:
+        return ""
+    return (f" | {metrics['epoch_time_s']:.2f}s, {metrics['samples_per_sec']:,.0f} samples/s"
+            f" (data {metrics['data_time_s']:.2f}s, fwd {metrics['forward_time_s']:.2f}s,"
+            f" bwd {metrics['backward_time_s']:.2f}s, opt {metrics['optimizer_time_s']:.2f}s)")
@@ -1,57 +1,122 @@
 """
 Weryfikacja Łańcucha Decyzyjnego
 --------------------------------
-Skrypt testowy służący do manualnej weryfikacji poprawności działania
+Skrypt testowy służący do weryfikacji poprawności działania
 szeregowego połączenia modeli RetailNet i PersonalityNet.
-Uruchamia predefiniowane przypadki testowe (scenariusze), aby sprawdzić,
-czy model osobowości poprawnie modyfikuje decyzje zakupowe.
+Domyślnie sprawdza, czy model osobowości poprawnie modyfikuje decyzje
+zakupowe na siatce wejść (skrócona wersja decision_surface.py).
+
+Tryb --optimized porównuje artefakty z export_models.py (TorchScript, INT8)
+z modelami fp32 na dużej paczce losowych wejść: maksymalny dryf
+prawdopodobieństw, liczba zmian decyzji BUY/SKIP oraz zysk opóźnienia.
+    python verify_chain.py --optimized --samples 200000
 """
+import argparse
+import sys
+import time
+
 import torch
 import numpy as np
-from network import model, RetailNet, PersonalityNet, FEATURE_COLUMNS, PERSONALITY_COLUMNS, device
 
-def verify():
-    """Funkcja wykonująca testy weryfikacyjne."""
+def verify(grid=(51, 51, 51)):
+    """
+    Łańcuch na gęstej siatce zamiast ręcznie wybranych punktów (decision_surface.py):
+    zgodność PersonalityNet z regułą analityczną, błąd i monotoniczność.
+    """
+    from decision_surface import (DEFAULT_THRESHOLDS, judge, load_chain, personality_metrics,
+                                  personality_surface, print_checks)
+
     print("Loading models")
-    # Ładowanie modelu RetailNet (popyt ogólny)
-    retail_model = RetailNet(len(FEATURE_COLUMNS)).to(device)
-    retail_model.load_state_dict(torch.load("retail_ai_model.pth", map_location=device, weights_only=True))
-    retail_model.eval()
-
-    # Ładowanie modelu PersonalityNet (korekta osobowościowa)
-    personality_model = PersonalityNet(len(PERSONALITY_COLUMNS)).to(device)
-    personality_model.load_state_dict(torch.load("personality_model.pth", map_location=device, weights_only=True))
-    personality_model.eval()
-    
-    # Przypadek Testowy 1: Wysokie prawd. zakupu + Wysoka Impulsywność + Produkt Impulsowy -> Powinien kupić (BUY)
-    # --------------------------------------------------------------------------
-    print("\nTest 1: Strong BUY signal (High Base Prob + Impulsive + Impulse Item)")
-    # Symulujemy sytuację, gdzie RetailNet dał wysokie prawdopodobieństwo
-    base_prob = 0.8
-    impulsiveness = 0.9
-    generosity = 0.5
-    is_impulse = 1.0  # Produkt impulsowy (normalnie trudniejszy do kupienia, ale tu klient jest impulsywny)
-    
-    # Wejście: [bazowe_prawd, impulsywność, szczodrość, czy_impulsowy]
-    p_input = torch.tensor([[base_prob, impulsiveness, generosity, is_impulse]], dtype=torch.float32).to(device)
-    p_out = personality_model(p_input)
-    final_prob = torch.sigmoid(p_out).item()
-    print(f"Base Prob: {base_prob}, Impulsiveness: {impulsiveness}, IsImpulse: {is_impulse} -> Final Prob: {final_prob:.4f} (Expected > 0.5)")
-    
-    print("\nTest 2: Weak signal (Medium Base Prob + Low Impulsiveness + Impulse Item)")
-    # Przypadek Testowy 2: Średnie prawd. zakupu + Niska Impulsywność + Produkt Impulsowy -> Powinien pominąć (SKIP)
-    # --------------------------------------------------------------------------
-    base_prob = 0.4
-    impulsiveness = 0.1
-    generosity = 0.5
-    is_impulse = 1.0 # Produkt impulsowy, ale klient mało impulsywny
-    
-    p_input = torch.tensor([[base_prob, impulsiveness, generosity, is_impulse]], dtype=torch.float32).to(device)
-    p_out = personality_model(p_input)
-    final_prob = torch.sigmoid(p_out).item()
-    print(f"Base Prob: {base_prob}, Impulsiveness: {impulsiveness}, IsImpulse: {is_impulse} -> Final Prob: {final_prob:.4f} (Expected < 0.5)")
+    metrics = {"personality": personality_metrics(personality_surface(load_chain(), grid))}
+    checks = judge(metrics, DEFAULT_THRESHOLDS)
+    print_checks(checks)
+    failed = [c["check"] for c in checks if not c["passed"]]
+    if failed:
+        raise RuntimeError(f"checks failed: {', '.join(failed)} (details: python decision_surface.py)")
+
+def _median_time(fn, repeats):
+    """Mediana czasu wywołania (ms)."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000.0)
+    return float(np.median(times))
+
+def compare_optimized(variants, num_samples=200000, seed=0, repeats=20):
+    """
+    Porównuje zoptymalizowane łańcuchy z łańcuchem fp32.
+
+    Zwraca:
+        list: Raport per wariant (dryf, zmiany decyzji, opóźnienia i przyspieszenie).
+    """
+    from export_models import load_optimized_chain
+    from numpy_engine import load_torch_chain, sample_chain_inputs
+
+    x, traits = sample_chain_inputs(num_samples, seed)
+    reference = load_torch_chain()
+    base_ref, final_ref = reference.predict(x, traits)
+
+    chains = {"fp32": reference}
+    for variant in variants:
+        # Bez kontroli przy ładowaniu - ten raport właśnie ją pokazuje
+        chains[variant] = load_optimized_chain(variant, torch.device("cpu"), check=False)
+
+    rows = []
+    for name, chain in chains.items():
+        # Rozgrzewka (profilujący executor TorchScript optymalizuje graf po kilku wywołaniach)
+        for _ in range(3):
+            chain.predict(x[:1], traits[:1])
+            chain.predict(x, traits)
+        base, final = chain.predict(x, traits)
+        rows.append({
+            "variant": name,
+            "max_drift_base": float(np.max(np.abs(base - base_ref))),
+            "max_drift_final": float(np.max(np.abs(final - final_ref))),
+            "mean_drift_final": float(np.mean(np.abs(final - final_ref))),
+            "decision_flips": int(np.sum((final > 0.5) != (final_ref > 0.5))),
+            "batch_ms": _median_time(lambda: chain.predict(x, traits), max(3, repeats // 4)),
+            "single_ms": _median_time(lambda: chain.predict(x[:1], traits[:1]), repeats * 10),
+        })
+
+    fp32 = rows[0]
+    for row in rows:
+        row["batch_speedup"] = fp32["batch_ms"] / row["batch_ms"]
+        row["single_speedup"] = fp32["single_ms"] / row["single_ms"]
+    return rows
+
+def print_report(rows, num_samples):
+    print(f"\nOptimized artifacts vs fp32 on {num_samples} samples")
+    print(f"{'variant':<12} {'drift base':>11} {'drift final':>12} {'flips':>7} "
+          f"{'batch ms':>9} {'speedup':>8} {'single ms':>10} {'speedup':>8}")
+    for r in rows:
+        print(f"{r['variant']:<12} {r['max_drift_base']:>11.2e} {r['max_drift_final']:>12.2e} "
+              f"{r['decision_flips']:>7} {r['batch_ms']:>9.2f} {r['batch_speedup']:>7.2f}x "
+              f"{r['single_ms']:>10.3f} {r['single_speedup']:>7.2f}x")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify the RetailNet -> PersonalityNet chain")
+    parser.add_argument("--optimized", action="store_true",
+                        help="Compare export_models.py artifacts with the fp32 checkpoints")
+    parser.add_argument("--variants", nargs="+", default=["torchscript", "int8"])
+    parser.add_argument("--samples", type=int, default=200000)
+    parser.add_argument("--max-drift", type=float, default=0.02,
+                        help="Maximum allowed absolute drift of final_buy_prob")
+    parser.add_argument("--max-flip-rate", type=float, default=0.001,
+                        help="Maximum allowed fraction of BUY/SKIP decision flips")
+    args = parser.parse_args()
+
+    if args.optimized:
+        rows = compare_optimized(args.variants, args.samples)
+        print_report(rows, args.samples)
+        failed = [r["variant"] for r in rows
+                  if r["max_drift_final"] > args.max_drift or r["decision_flips"] > args.max_flip_rate * args.samples]
+        if failed:
+            print(f"\nParity FAILED for: {', '.join(failed)}")
+            sys.exit(1)
+        print("\nParity OK")
+        sys.exit(0)
+
     try:
         verify()
         print("\nVerification successful!")
@@ -0,0 +1,119 @@
+"""
+Binarny Protokół Przewidywań (WebSocket)
+----------------------------------------
+Stały układ rekordów przesyłanych kanałem /ws/predict (api.py, ws_client.py).
+
+Ramka binarna zawiera jeden lub więcej rekordów bez nagłówka (little-endian):
+
+Rekord żądania (44 bajty):
+    request_id          uint32   - nadawany przez klienta, zwracany w odpowiedzi
+    FEATURE_COLUMNS     4 x float32 (pogoda, stan magazynu) + 3 x int32 (kategorie)
+    impulsiveness       float32
+    generosity          float32
+    is_impulse          float32
+
+Rekord odpowiedzi (14 bajtów):
+    request_id          uint32
+    base_buy_prob       float32
+    final_buy_prob      float32
+    prediction          uint8    - 1 = kupi, 0 = nie kupi
+    status              uint8    - STATUS_OK / STATUS_INVALID / STATUS_NOT_READY
+
+Odpowiedzi mogą przychodzić w innych ramkach niż żądania (serwer łączy
+oczekujące ramki w jeden przebieg sieci) - klient dopasowuje je po request_id.
+Błędy całej ramki (np. zła długość) zwracane są jako ramka tekstowa JSON
+{"error": ..., "request_ids": [...]} - request_ids rekordów, które da się odczytać
+z ramki (frame_request_ids); bez tego pola błąd dotyczy całego połączenia.
+"""
+import numpy as np
+
+from features import FEATURE_COLUMNS
+
+TRAIT_COLUMNS = ["impulsiveness", "generosity", "is_impulse"]
+
+# Kolumny całkowitoliczbowe (identyfikatory kategorii), pozostałe to float32
+_INT_COLUMNS = {"first_category_id", "second_category_id", "third_category_id"}
+
+REQUEST_DTYPE = np.dtype(
+    [("request_id", "<u4")]
+    + [(col, "<i4" if col in _INT_COLUMNS else "<f4") for col in FEATURE_COLUMNS]
+    + [(col, "<f4") for col in TRAIT_COLUMNS]
+)
+RESPONSE_DTYPE = np.dtype([
+    ("request_id", "<u4"),
+    ("base_buy_prob", "<f4"),
+    ("final_buy_prob", "<f4"),
+    ("prediction", "u1"),
+    ("status", "u1"),
+])
+
+STATUS_OK = 0
+STATUS_INVALID = 1      # niepoprawne wartości (NaN/inf)
+STATUS_NOT_READY = 2    # modele jeszcze się ładują
+
+
+class FrameError(ValueError):
+    """Ramka, której nie da się zdekodować jako listy rekordów."""
+
+
+def encode_requests(request_ids, features, traits):
+    """
+    Pakuje paczkę żądań do ramki binarnej.
+
+    Argumenty:
+        request_ids (array): Identyfikatory (n,).
+        features (array): Cechy RetailNet w kolejności FEATURE_COLUMNS (n, 7).
+        traits (array): [impulsiveness, generosity, is_impulse] (n, 3).
+    """
+    features = np.asarray(features)
+    traits = np.asarray(traits)
+    records = np.empty(len(features), dtype=REQUEST_DTYPE)
+    records["request_id"] = request_ids
+    for i, col in enumerate(FEATURE_COLUMNS):
+        records[col] = features[:, i]
+    for i, col in enumerate(TRAIT_COLUMNS):
+        records[col] = traits[:, i]
+    return records.tobytes()
+
+
+def decode_requests(frame):
+    """
+    Dekoduje ramkę żądań.
+
+    Zwraca:
+        tuple: (request_ids uint32 (n,), x float32 (n, 7), traits float32 (n, 3))
+    """
+    if not frame or len(frame) % REQUEST_DTYPE.itemsize:
+        raise FrameError(f"Frame length {len(frame)} is not a multiple of {REQUEST_DTYPE.itemsize} bytes")
+    records = np.frombuffer(frame, dtype=REQUEST_DTYPE)
+    x = np.column_stack([records[col] for col in FEATURE_COLUMNS]).astype(np.float32)
+    traits = np.column_stack([records[col] for col in TRAIT_COLUMNS]).astype(np.float32)
+    return records["request_id"].copy(), x, traits
+
+
+def frame_request_ids(frame):
+    """
+    request_id rekordów ramki, także niepoprawnej (np. o złej długości):
+    pierwsze 4 bajty każdego rekordu obecne w ramce. Lista int (może być pusta).
+    """
+    step = REQUEST_DTYPE.itemsize
+    return [int.from_bytes(frame[offset:offset + 4], "little") for offset in range(0, len(frame) - 3, step)]
+
+
+def encode_responses(request_ids, base_buy_prob, final_buy_prob, status):
+    """Pakuje wyniki do ramki odpowiedzi (prediction = final_buy_prob > 0.5)."""
+    final_buy_prob = np.asarray(final_buy_prob, dtype=np.float32)
+    records = np.empty(len(request_ids), dtype=RESPONSE_DTYPE)
+    records["request_id"] = request_ids
+    records["base_buy_prob"] = base_buy_prob
+    records["final_buy_prob"] = final_buy_prob
+    records["prediction"] = final_buy_prob > 0.5
+    records["status"] = status
+    return records.tobytes()
+
+
+def decode_responses(frame):
+    """Dekoduje ramkę odpowiedzi do tablicy strukturalnej RESPONSE_DTYPE."""
+    if len(frame) % RESPONSE_DTYPE.itemsize:
+        raise FrameError(f"Frame length {len(frame)} is not a multiple of {RESPONSE_DTYPE.itemsize} bytes")
+    return np.frombuffer(frame, dtype=RESPONSE_DTYPE)
@@ -0,0 +1,251 @@
+"""
+Klient Kanału WebSocket
+-----------------------
+Referencyjny klient endpointu /ws/predict (ramki binarne, wire_protocol.py)
+oraz benchmark porównujący go ze ścieżką JSON/HTTP (/predict, /predict_batch).
+
+Klient wysyła ramki bez czekania na odpowiedzi (pipelining) i dopasowuje
+wyniki po request_id, więc wiele przewidywań jest w toku jednocześnie
+na jednym połączeniu.
+
+Wymaga pakietu websockets (również po stronie serwera uvicorn).
+
+Użycie:
+    python ws_client.py --rows 20000                       # uruchamia lokalny serwer
+    python ws_client.py --url http://127.0.0.1:8000 --frame-rows 5 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+import numpy as np
+import websockets
+
+from features import FEATURE_COLUMNS
+from load_test import LocalServer, _latency_summary
+from numpy_engine import sample_chain_inputs
+from wire_protocol import RESPONSE_DTYPE, encode_requests, decode_responses
+
+DEFAULT_OUTPUT = "ws_benchmark_results.json"
+
+
+class StreamClient:
+    """
+    Klient /ws/predict z wieloma żądaniami w toku.
+
+    Użycie:
+        async with StreamClient("ws://127.0.0.1:8000/ws/predict") as client:
+            results = await client.predict(x, traits)   # tablica RESPONSE_DTYPE
+    """
+    def __init__(self, url):
+        self.url = url
+        self._websocket = None
+        self._reader = None
+        self._next_id = 0
+        self._pending = {}  # request_id -> (wyniki wywołania, indeks, stan wywołania)
+
+    async def __aenter__(self):
+        # Bez kompresji - ramki binarne są już zwarte
+        self._websocket = await websockets.connect(self.url, compression=None, max_size=None)
+        self._reader = asyncio.create_task(self._read())
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._websocket.close()
+        await asyncio.gather(self._reader, return_exceptions=True)
+
+    async def _read(self):
+        try:
+            async for message in self._websocket:
+                if isinstance(message, str):
+                    error = json.loads(message)
+                    self._fail(RuntimeError(error.get("error", message)), error.get("request_ids"))
+                    continue
+                for record in decode_responses(message):
+                    results, index, call = self._pending.pop(int(record["request_id"]))
+                    results[index] = record
+                    call["remaining"] -= 1
+                    if call["remaining"] == 0 and not call["future"].done():
+                        call["future"].set_result(results)
+        except websockets.ConnectionClosed:
+            pass
+        self._fail_all(ConnectionError("WebSocket connection closed"))
+
+    def _fail(self, error, request_ids):
+        """
+        Odrzuca wywołania z żądaniami request_ids (błąd jednej ramki). Bez
+        identyfikatorów lub z nieznanym identyfikatorem odrzuca wszystkie.
+        """
+        if not request_ids or any(request_id not in self._pending for request_id in request_ids):
+            self._fail_all(error)
+            return
+        for request_id in request_ids:
+            if request_id not in self._pending:
+                continue  # pozostałe rekordy tego samego wywołania
+            _, _, call = self._pending[request_id]
+            for other_id in call["request_ids"]:
+                self._pending.pop(other_id, None)
+            if not call["future"].done():
+                call["future"].set_exception(error)
+
+    def _fail_all(self, error):
+        for _, _, call in self._pending.values():
+            if not call["future"].done():
+                call["future"].set_exception(error)
+        self._pending.clear()
+
+    async def predict(self, x, traits):
+        """
+        Wysyła paczkę wierszy jedną ramką i czeka na wszystkie wyniki.
+
+        Argumenty:
+            x (array): Cechy w kolejności FEATURE_COLUMNS (n, 7).
+            traits (array): [impulsiveness, generosity, is_impulse] (n, 3).
+
+        Zwraca:
+            np.ndarray: Rekordy RESPONSE_DTYPE w kolejności wejścia.
+        """
+        n = len(x)
+        request_ids = (self._next_id + np.arange(n)) % 2**32
+        self._next_id = int(request_ids[-1]) + 1
+        results = np.empty(n, dtype=RESPONSE_DTYPE)
+        call = {"remaining": n, "request_ids": request_ids.tolist(),
+                "future": asyncio.get_running_loop().create_future()}
+        for index, request_id in enumerate(request_ids.tolist()):
+            self._pending[request_id] = (results, index, call)
+        await self._websocket.send(encode_requests(request_ids, x, traits))
+        return await call["future"]
+
+
+# ==============================
+# Benchmark
+# ==============================
+def _frames(x, traits, frame_rows):
+    return [(x[i:i + frame_rows], traits[i:i + frame_rows]) for i in range(0, len(x), frame_rows)]
+
+
+def _payload(row, trait):
+    payload = dict(zip(FEATURE_COLUMNS, row.tolist()))
+    payload.update(impulsiveness=float(trait[0]), generosity=float(trait[1]), is_impulse=float(trait[2]))
+    return payload
+
+
+async def _timed_calls(calls, concurrency):
+    """Uruchamia wywołania z limitem współbieżności. Zwraca (wyniki, opóźnienia ms, czas s)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def run(call):
+        async with semaphore:
+            start = time.perf_counter()
+            result = await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+            return result
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(run(call) for call in calls))
+    return results, latencies, time.perf_counter() - start
+
+
+async def bench_http_single(base_url, x, traits, concurrency):
+    """Jeden wiersz na żądanie /predict (JSON)."""
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def call(i):
+            response = await client.post("/predict", json=_payload(x[i], traits[i]))
+            response.raise_for_status()
+            return [response.json()["final_buy_prob"]]
+        results, latencies, elapsed = await _timed_calls(
+            [lambda i=i: call(i) for i in range(len(x))], concurrency)
+    return np.concatenate(results), latencies, elapsed
+
+
+async def bench_http_batch(base_url, x, traits, concurrency, frame_rows):
+    """frame_rows wierszy na żądanie /predict_batch (JSON)."""
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def call(fx, ft):
+            items = [_payload(row, trait) for row, trait in zip(fx, ft)]
+            response = await client.post("/predict_batch", json={"items": items})
+            response.raise_for_status()
+            return [item["final_buy_prob"] for item in response.json()["results"]]
+        results, latencies, elapsed = await _timed_calls(
+            [lambda f=f: call(*f) for f in _frames(x, traits, frame_rows)], concurrency)
+    return np.concatenate(results), latencies, elapsed
+
+
+async def bench_websocket(base_url, x, traits, concurrency, frame_rows):
+    """frame_rows wierszy na ramkę, concurrency ramek w toku na jednym połączeniu."""
+    url = base_url.replace("http://", "ws://", 1).replace("https://", "wss://", 1) + "/ws/predict"
+    async with StreamClient(url) as client:
+        results, latencies, elapsed = await _timed_calls(
+            [lambda f=f: client.predict(*f) for f in _frames(x, traits, frame_rows)], concurrency)
+    results = np.concatenate(results)
+    if (results["status"] != 0).any():
+        raise RuntimeError(f"{int((results['status'] != 0).sum())} records failed")
+    return results["final_buy_prob"], latencies, elapsed
+
+
+async def run_benchmark(base_url, args):
+    x, traits = sample_chain_inputs(args.rows, args.seed)
+    benches = {
+        "http_predict": lambda: bench_http_single(base_url, x[:args.http_rows], traits[:args.http_rows],
+                                                  args.concurrency),
+        "http_predict_batch": lambda: bench_http_batch(base_url, x, traits, args.concurrency, args.frame_rows),
+        "websocket": lambda: bench_websocket(base_url, x, traits, args.concurrency, args.frame_rows),
+    }
+    report, probs = {}, {}
+    for name, bench in benches.items():
+        probs[name], latencies, elapsed = await bench()
+        report[name] = {
+            "rows": len(probs[name]),
+            "rows_per_sec": len(probs[name]) / elapsed,
+            "latency_ms": _latency_summary(latencies),
+        }
+    # Wszystkie ścieżki liczą te same wiersze (od początku) - wyniki muszą się zgadzać
+    for name, values in probs.items():
+        report[name]["max_abs_diff"] = float(np.abs(values - probs["websocket"][:len(values)]).max())
+    return report
+
+
+def print_report(report):
+    print(f"{'path':<20} {'rows':>8} {'rows/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, row in report.items():
+        latency = row["latency_ms"]
+        print(f"{name:<20} {row['rows']:>8} {row['rows_per_sec']:>10,.0f} {latency['p50']:>8.2f} {latency['p99']:>8.2f}")
+    print(f"Max |final_buy_prob| difference vs WebSocket: {max(row['max_abs_diff'] for row in report.values()):.2e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the binary WebSocket channel against JSON/HTTP")
+    parser.add_argument("--url", default=None, help="Use a running server instead of starting api:app")
+    parser.add_argument("--server-env", action="append", default=[], help="KEY=VALUE for the local server")
+    parser.add_argument("--server-workers", type=int, default=0, help="Start the local server with serve.py")
+    parser.add_argument("--rows", type=int, default=20000, help="Rows for /predict_batch and WebSocket")
+    parser.add_argument("--http-rows", type=int, default=2000,
+                        help="Rows for one-request-per-row /predict (slowest path)")
+    parser.add_argument("--frame-rows", type=int, default=5,
+                        help="Rows per frame / batch request (a shopping list)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests or frames in flight")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    if args.url:
+        report = asyncio.run(run_benchmark(args.url.rstrip("/"), args))
+    else:
+        server_env = dict(item.split("=", 1) for item in args.server_env)
+        with LocalServer(env=server_env, workers=args.server_workers) as server:
+            print(f"Server ready in {server.startup_s:.2f}s at {server.url}")
+            report = asyncio.run(run_benchmark(server.url, args))
+
+    print_report(report)
+    with open(args.output, "w") as f:
+        json.dump({"args": vars(args), "results": report}, f, indent=2)
+    print(f"Saved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
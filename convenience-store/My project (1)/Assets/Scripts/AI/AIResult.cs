@@ -3,6 +3,7 @@
  * -----------------------
  * Klasa pomocnicza (DTO) służąca do deserializacji odpowiedzi JSON
  * otrzymanej z serwera Python. Zawiera ostateczną decyzję i prawdopodobieństwo zakupu.
+ * AIBatchResult opakowuje odpowiedź endpointu /predict_batch (lista wyników).
  */
 using System.Collections;
 using System.Collections.Generic;
@@ -11,6 +12,15 @@ using UnityEngine;
 [System.Serializable]
 public class AIResult
 {
+    public int index;
     public float final_buy_prob;
     public int prediction;
+    public string error; // Wypełnione tylko gdy serwer odrzucił element paczki
+}
+
+[System.Serializable]
+public class AIBatchResult
+{
+    public AIResult[] results;
+    public int errors;
 }
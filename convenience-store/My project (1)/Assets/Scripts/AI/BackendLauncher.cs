@@ -4,8 +4,12 @@
  * Skrypt automatycznie uruchamiający serwer Python przy starcie gry w Unity.
  * Sprawdza, czy port jest zajęty, ustala ścieżkę do środowiska wirtualnego (.venv)
  * i zarządza procesem systemowym serwera.
+ * Po uruchomieniu odpytuje endpoint /ready, aż modele zostaną załadowane
+ * i rozgrzane (flaga IsReady), oraz loguje czas zimnego startu.
  */
 using UnityEngine;
+using UnityEngine.Networking;
+using System.Collections;
 using System.Diagnostics;
 using System.IO;
 using System.Net.Sockets;
@@ -14,6 +18,13 @@ public class BackendLauncher : MonoBehaviour
 {
     private static Process pythonProcess;
 
+    private const string ReadyUrl = "http://127.0.0.1:8000/ready";
+    private const float ReadyPollInterval = 0.25f;
+    private const float ReadyTimeout = 120f;
+
+    // true, gdy serwer zgłosił gotowość (modele załadowane i rozgrzane)
+    public static bool IsReady { get; private set; }
+
     [RuntimeInitializeOnLoadMethod(RuntimeInitializeLoadType.AfterSceneLoad)]
     static void Initialize()
     {
@@ -21,18 +32,56 @@ public class BackendLauncher : MonoBehaviour
         if (pythonProcess != null && !pythonProcess.HasExited) return;
 
         // Sprawdź czy port 8000 jest już zajęty (np. przez ręczne uruchomienie)
-        if (IsPortOccupied(8000))
+        bool external = IsPortOccupied(8000);
+        if (external)
         {
             UnityEngine.Debug.Log("[BackendLauncher] Port 8000 is already in use. Assuming server is running externally.");
-            return;
         }
 
-        // Utwórz GameObject do obsługi OnApplicationQuit dla sprzątania
+        // Utwórz GameObject do obsługi OnApplicationQuit dla sprzątania oraz odpytywania /ready
         GameObject go = new GameObject("BackendLauncher");
         DontDestroyOnLoad(go);
         go.AddComponent<BackendLauncher>();
         
-        StartServer();
+        if (!external) StartServer();
+    }
+
+    void Start()
+    {
+        StartCoroutine(WaitForReady());
+    }
+
+    // Odpytuje /ready aż serwer zgłosi gotowość (zamiast ponawiania żądań przez NPC)
+    IEnumerator WaitForReady()
+    {
+        IsReady = false;
+        Stopwatch stopwatch = Stopwatch.StartNew();
+
+        while (stopwatch.Elapsed.TotalSeconds < ReadyTimeout)
+        {
+            if (pythonProcess != null && pythonProcess.HasExited)
+            {
+                UnityEngine.Debug.LogError($"[BackendLauncher] Python server exited with code {pythonProcess.ExitCode} before becoming ready.");
+                yield break;
+            }
+
+            using (UnityWebRequest req = UnityWebRequest.Get(ReadyUrl))
+            {
+                req.timeout = 2;
+                yield return req.SendWebRequest();
+
+                if (req.result == UnityWebRequest.Result.Success)
+                {
+                    IsReady = true;
+                    UnityEngine.Debug.Log($"[BackendLauncher] Server ready after {stopwatch.Elapsed.TotalSeconds:F2}s: {req.downloadHandler.text}");
+                    yield break;
+                }
+            }
+
+            yield return new WaitForSeconds(ReadyPollInterval);
+        }
+
+        UnityEngine.Debug.LogError($"[BackendLauncher] Server not ready after {ReadyTimeout}s.");
     }
 
     // Sprawdza czy dany port TCP jest nasłuchiwany
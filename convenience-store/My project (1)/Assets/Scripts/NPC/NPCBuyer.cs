@@ -197,20 +197,24 @@ public class NPCBuyer : MonoBehaviour
         }
     }
 
-    // Predykcja sieci wysyłana w tle podczas gdy npc idzie do sklepu
+    // Predykcja sieci wysyłana w tle podczas gdy npc idzie do sklepu.
+    // Cała lista zakupów jest oceniana jednym żądaniem /predict_batch.
     IEnumerator AI_ProcessShoppingList()
     {
+        List<Product> items = new List<Product>();
+        List<string> itemJsons = new List<string>();
+
         foreach (var item in shoppingList)
         {
             if (item == null) continue;
 
             Debug.Log("AI checking product: " + item.productName);
 
-             // Przygotowanie JSONa dla API
-            string json = $@"
+            // Przygotowanie JSONa pojedynczego produktu dla API
+            string itemJson = $@"
             {{
-                ""precpt"": {(WeatherManager.Instance != null ? WeatherManager.Instance.CurrentPrecipitation : 0)},
-                ""avg_temperature"": {(WeatherManager.Instance != null ? WeatherManager.Instance.CurrentTemperature : 20)},
+                ""precpt"": {(WeatherManager.Instance != null ? WeatherManager.Instance.CurrentPrecipitation : 0).ToString(CultureInfo.InvariantCulture)},
+                ""avg_temperature"": {(WeatherManager.Instance != null ? WeatherManager.Instance.CurrentTemperature : 20).ToString(CultureInfo.InvariantCulture)},
                 ""stock_hour6_22_cnt"": 1,
                 ""hours_stock_status"": 1,
                 ""first_category_id"": {item.cat1},
@@ -220,30 +224,61 @@ public class NPCBuyer : MonoBehaviour
                 ""generosity"": {generosity.ToString(CultureInfo.InvariantCulture)},
                 ""is_impulse"": {(item.isImpulse ? 1 : 0)}
             }}";
-            
-            Debug.Log($"[Client -> Server] JSON: {json}");
 
-            bool requestSuccess = false;
-            int retryCount = 0;
-            const int maxRetries = 10;
+            items.Add(item);
+            itemJsons.Add(itemJson);
+        }
 
-            // Pętla retry w przypadku błędu połączenia
-            while (!requestSuccess && retryCount < maxRetries)
-            {
-                UnityWebRequest req = new UnityWebRequest("http://127.0.0.1:8000/predict", "POST");
-                byte[] body = Encoding.UTF8.GetBytes(json);
+        if (items.Count == 0)
+        {
+            aiFinished = true;
+            yield break;
+        }
 
-                req.uploadHandler = new UploadHandlerRaw(body);
-                req.downloadHandler = new DownloadHandlerBuffer();
-                req.SetRequestHeader("Content-Type", "application/json");
+        // Czekaj aż backend zgłosi gotowość (/ready) zamiast ponawiać nieudane żądania
+        const float maxReadyWait = 60f;
+        float readyWait = 0f;
+        while (!BackendLauncher.IsReady && readyWait < maxReadyWait)
+        {
+            readyWait += Time.deltaTime;
+            yield return null;
+        }
+
+        string json = "{\"items\": [" + string.Join(",", itemJsons) + "]}";
+        Debug.Log($"[Client -> Server] JSON: {json}");
+
+        bool requestSuccess = false;
+        int retryCount = 0;
+        const int maxRetries = 10;
+
+        // Pętla retry w przypadku błędu połączenia
+        while (!requestSuccess && retryCount < maxRetries)
+        {
+            UnityWebRequest req = new UnityWebRequest("http://127.0.0.1:8000/predict_batch", "POST");
+            byte[] body = Encoding.UTF8.GetBytes(json);
 
-                yield return req.SendWebRequest();
+            req.uploadHandler = new UploadHandlerRaw(body);
+            req.downloadHandler = new DownloadHandlerBuffer();
+            req.SetRequestHeader("Content-Type", "application/json");
 
-                if (req.result == UnityWebRequest.Result.Success)
+            yield return req.SendWebRequest();
+
+            if (req.result == UnityWebRequest.Result.Success)
+            {
+                requestSuccess = true;
+                Debug.Log($"[Server -> Client] Response: {req.downloadHandler.text}");
+                AIBatchResult batch = JsonUtility.FromJson<AIBatchResult>(req.downloadHandler.text);
+
+                foreach (AIResult result in batch.results)
                 {
-                    requestSuccess = true;
-                    Debug.Log($"[Server -> Client] Response: {req.downloadHandler.text}");
-                    AIResult result = JsonUtility.FromJson<AIResult>(req.downloadHandler.text);
+                    Product item = items[result.index];
+
+                    if (!string.IsNullOrEmpty(result.error))
+                    {
+                        Debug.LogError($"AI error for {item.productName}: {result.error}");
+                        aiDecisions[item.productName] = false;
+                        continue;
+                    }
 
                     // Skalowanie prawdopodobieństwa w zależności od zmiany ceny
                     float baseP = (item.basePrice > 0) ? item.basePrice : item.price;
@@ -261,18 +296,18 @@ public class NPCBuyer : MonoBehaviour
 
                     Debug.Log($"AI: {item.productName} → {buy}");
                 }
-                else
+            }
+            else
+            {
+                retryCount++;
+                Debug.LogWarning($"[NPCBuyer] Request failed: {req.error}. Retrying {retryCount}/{maxRetries} in 1s...");
+                yield return new WaitForSeconds(1.0f);
+
+                if (retryCount >= maxRetries)
                 {
-                    retryCount++;
-                    Debug.LogWarning($"[NPCBuyer] Request failed: {req.error}. Retrying {retryCount}/{maxRetries} in 1s...");
-                    yield return new WaitForSeconds(1.0f);
-                    
-                    if (retryCount >= maxRetries)
-                    {
-                         Debug.LogError($"AI error after {maxRetries} attempts: {req.error}");
-                         Debug.LogError($"Server response: {req.downloadHandler.text}");
-                         aiDecisions[item.productName] = false;
-                    }
+                     Debug.LogError($"AI error after {maxRetries} attempts: {req.error}");
+                     Debug.LogError($"Server response: {req.downloadHandler.text}");
+                     foreach (var item in items) aiDecisions[item.productName] = false;
                 }
             }
         }